@@ -40,6 +40,10 @@ class Settings:
     # AI-Einstellungen
     confidence_threshold: float = float(os.getenv("CONFIDENCE_THRESHOLD", "0.75"))
 
+    # SSE-Stream des Job-Fortschritts (GET /api/v1/jobs/{id}/stream)
+    job_stream_poll_interval: float = float(os.getenv("JOB_STREAM_POLL_INTERVAL", "0.5"))
+    job_stream_timeout: int = int(os.getenv("JOB_STREAM_TIMEOUT", "900"))
+
     # Deduplizierung
     dedup_ttl_seconds: int = int(os.getenv("DEDUP_TTL_SECONDS", "900"))
 
@@ -49,6 +53,35 @@ class Settings:
     max_chunk_size: int = int(os.getenv("MAX_CHUNK_SIZE", "10000"))
     max_ingest_text_length: int = int(os.getenv("MAX_INGEST_TEXT_LENGTH", "500000"))
 
+    # Batch-Embedding: Texte pro /api/embed-Request (Ingest)
+    embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    # Parallele Embedding-Requests je Ingest (an OLLAMA_NUM_PARALLEL ausrichten)
+    ingest_embed_concurrency: int = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+
+    # Ollama: Modelle nach dem letzten Aufruf so lange geladen halten
+    ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # Warm-up beim Start: Modelle laden, /ready erst danach 200 (MODEL_WARMUP=false: sofort bereit)
+    model_warmup: bool = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+    model_warmup_timeout: float = float(os.getenv("MODEL_WARMUP_TIMEOUT", "600"))
+    model_warmup_retry_interval: int = int(os.getenv("MODEL_WARMUP_RETRY_INTERVAL", "10"))
+
+    # Embedding-Cache: LRU-Eintraege im Prozess (0 = aus), TTL, optional geteilt ueber Redis
+    embed_cache_size: int = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+    embed_cache_ttl: int = int(os.getenv("EMBED_CACHE_TTL", "3600"))
+    embed_cache_redis: bool = os.getenv("EMBED_CACHE_REDIS", "false").lower() == "true"
+
+    # Gefilterte Suche: HNSW-Iterative-Scan (pgvector >= 0.8), damit Filter nicht
+    # weniger als top_k Treffer liefern — relaxed_order, strict_order oder off
+    rag_iterative_scan: str = os.getenv("RAG_ITERATIVE_SCAN", "relaxed_order")
+    # hnsw.ef_search je Abfrage (0 = Server-Standard 40; mindestens top_k)
+    rag_ef_search: int = int(os.getenv("RAG_EF_SEARCH", "0"))
+    # Hybride Suche: Kandidaten je Trefferliste (Volltext, Vektor) und RRF-Konstante k
+    rag_hybrid_candidates: int = int(os.getenv("RAG_HYBRID_CANDIDATES", "40"))
+    rag_rrf_k: int = int(os.getenv("RAG_RRF_K", "60"))
+    # Standardparameter fuer den Neuaufbau des HNSW-Index (python -m app.manage reindex)
+    hnsw_m: int = int(os.getenv("HNSW_M", "16"))
+    hnsw_ef_construction: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+
     # Embedding-Validierung
     expected_embedding_dimensions: int = int(os.getenv("EXPECTED_EMBEDDING_DIMENSIONS", "768"))
 
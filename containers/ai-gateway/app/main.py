@@ -5,16 +5,19 @@ Zentrale API fuer alle AI-Operationen in der Managed Control Platform.
 Endpoints:
     POST /api/v1/analyze          — Alert empfangen, AI-Analyse starten
     POST /api/v1/embed            — Embedding erstellen und in pgvector speichern
-    GET  /api/v1/search           — RAG-Wissensbasis durchsuchen
+    GET  /api/v1/search           — RAG-Wissensbasis durchsuchen (optional gefiltert)
     POST /api/v1/ingest           — Dokument fuer RAG aufnehmen (Chunking + Embedding)
     GET  /api/v1/jobs             — Alle Jobs auflisten
     GET  /api/v1/jobs/{job_id}    — Job-Status abfragen
     GET  /api/v1/models           — Verfuegbare Modelle anzeigen
     DELETE /api/v1/knowledge/{id} — RAG-Eintrag loeschen
     GET  /health                  — Health-Check aller Abhaengigkeiten
+    GET  /ready                   — Bereit, sobald Primaer- und Embedding-Modell geladen sind
     GET  /metrics                 — Prometheus-Metriken
 """
 
+import asyncio
+import hashlib
 import json
 import logging
 import time
@@ -25,27 +28,34 @@ from typing import Optional
 
 import httpx
 import redis
+import redis.asyncio as aioredis
 from fastapi import FastAPI, Header, HTTPException
 from prometheus_client import Counter, Gauge, Histogram, generate_latest
-from starlette.responses import Response
+from starlette.responses import Response, StreamingResponse
 
 from app.config import settings
 from app.models.schemas import (
     AnalyzeRequest,
     AnalyzeResponse,
+    ChunkFailure,
     EmbedRequest,
     EmbedResponse,
     HealthResponse,
+    IngestProgress,
     IngestRequest,
     IngestResponse,
     JobListResponse,
     JobStatus,
     ModelInfo,
+    ReadinessResponse,
     SearchResponse,
     SearchResult,
 )
+from app.services.embedding_cache import embedding_cache
+from app.services.job_queue import MAX_INDEX_SCAN, job_queue
 from app.services.ollama_client import ollama_client
 from app.services.rag_service import rag_service
+from app.services.redis_pool import FairConnectionPool
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("mcp-ai-gateway")
@@ -62,29 +72,32 @@ ANALYSIS_DURATION = Histogram(
     "mcp_analysis_duration_seconds", "Analyse-Dauer in Sekunden",
     buckets=[0.5, 1, 2, 5, 10, 30, 60, 120],
 )
-QUEUE_LENGTH = Gauge("mcp_queue_length", "Aktuelle Queue-Laenge")
+QUEUE_LENGTH = Gauge("mcp_queue_length", "Aktuelle Queue-Laenge je Prioritaet", ["priority"])
+MODEL_LOAD_SECONDS = Gauge("mcp_model_load_seconds", "Ladezeit beim Warm-up je Modell", ["model"])
+MODELS_READY = Gauge("mcp_models_ready", "1, sobald der Warm-up abgeschlossen ist")
 
 _start_time = time.time()
 
-# Redis Connection Pool (statt einzelner Verbindung)
-_redis_pool: redis.ConnectionPool | None = None
+# Async Redis Connection Pool (blockiert die Event-Loop nicht; Lifecycle im lifespan)
+_redis_pool: FairConnectionPool | None = None
 
 
-def get_redis() -> redis.Redis:
-    """Redis-Verbindung aus Connection-Pool herstellen."""
+def get_redis() -> aioredis.Redis:
+    """Async Redis-Client auf dem gemeinsamen Connection-Pool."""
     global _redis_pool
     if _redis_pool is None:
-        _redis_pool = redis.ConnectionPool(
+        _redis_pool = FairConnectionPool(
             host=settings.redis_queue_host,
             port=settings.redis_queue_port,
             password=settings.redis_queue_password or None,
             decode_responses=True,
             max_connections=settings.redis_pool_max,
+            timeout=5,
             socket_connect_timeout=5,
             socket_timeout=5,
             retry_on_timeout=True,
         )
-    return redis.Redis(connection_pool=_redis_pool)
+    return aioredis.Redis(connection_pool=_redis_pool)
 
 
 # Wiederverwendbarer HTTP-Client fuer Health-Checks
@@ -99,23 +112,67 @@ async def get_http_client() -> httpx.AsyncClient:
     return _http_client
 
 
+# Ladezeiten des Warm-ups; bereit, sobald beide Modelle geladen sind
+_model_load_times: dict[str, float] = {}
+_models_ready = False
+
+
+def _mark_models_ready() -> None:
+    global _models_ready
+    _models_ready = True
+    MODELS_READY.set(1)
+
+
+async def warm_up_models() -> None:
+    """Primaer- und Embedding-Modell laden, bis es gelingt (Ollama startet ggf. spaeter)."""
+    pending = {settings.default_model: False, settings.embedding_model: True}
+    while pending:
+        for model, embedding in list(pending.items()):
+            try:
+                seconds = await ollama_client.load_model(model, embedding=embedding)
+            except Exception as e:
+                logger.warning("Warm-up von %s fehlgeschlagen: %s — neuer Versuch in %ds",
+                               model, e, settings.model_warmup_retry_interval)
+                continue
+            _model_load_times[model] = seconds
+            MODEL_LOAD_SECONDS.labels(model=model).set(seconds)
+            logger.info("Modell %s geladen (%.1fs)", model, seconds)
+            del pending[model]
+        if pending:
+            await asyncio.sleep(settings.model_warmup_retry_interval)
+    _mark_models_ready()
+
+
 # ---------------------------------------------------------------------------
 # App Lifecycle
 # ---------------------------------------------------------------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: pgvector Pool initialisieren. Shutdown: Verbindungen schliessen."""
+    """Startup: Redis- und pgvector-Pool initialisieren. Shutdown: Verbindungen schliessen."""
     logger.info("MCP AI Gateway startet...")
+    try:
+        await get_redis().ping()
+        logger.info("Redis Connection-Pool initialisiert (max=%d)", settings.redis_pool_max)
+        if settings.embed_cache_redis:
+            embedding_cache.redis = get_redis()
+    except Exception as e:
+        logger.warning("Redis beim Start nicht erreichbar: %s", e)
     await rag_service.init_pool()
+    # Warm-up im Hintergrund: /health antwortet sofort, /ready erst nach dem Laden
+    warmup = asyncio.create_task(warm_up_models()) if settings.model_warmup else None
+    if warmup is None:
+        _mark_models_ready()
     yield
     logger.info("MCP AI Gateway faehrt herunter...")
+    if warmup:
+        warmup.cancel()
     # Graceful Shutdown: Alle Verbindungen schliessen
     await ollama_client.close()
     await rag_service.close()
     if _http_client and not _http_client.is_closed:
         await _http_client.aclose()
     if _redis_pool:
-        _redis_pool.disconnect()
+        await _redis_pool.disconnect()
     logger.info("Alle Verbindungen geschlossen")
 
 
@@ -141,6 +198,51 @@ def verify_token(authorization: Optional[str]) -> None:
         raise HTTPException(status_code=403, detail="Ungueltiger Token")
 
 
+# ---------------------------------------------------------------------------
+# Job-Hash → JobStatus
+# ---------------------------------------------------------------------------
+def job_status_from_hash(data: dict, job_id: str, description_limit: int | None = None) -> JobStatus:
+    """Redis-Job-Hash in ein JobStatus-Modell umwandeln."""
+    result = None
+    if data.get("result"):
+        try:
+            result = json.loads(data["result"])
+        except json.JSONDecodeError:
+            pass
+
+    progress = None
+    if data.get("type") == "ingest":
+        progress = IngestProgress(
+            chunks_total=int(data.get("chunks_total", 0)),
+            chunks_done=int(data.get("chunks_done", 0)),
+            chunks_created=int(data.get("chunks_created", 0)),
+            duplicates=int(data.get("duplicates", 0)),
+            chunks_failed=int(data.get("chunks_failed", 0)),
+            chunks_per_second=float(data.get("chunks_per_second", 0)),
+        )
+
+    return JobStatus(
+        id=data.get("id", job_id),
+        status=data.get("status", "unknown"),
+        type=data.get("type", "analyze"),
+        source=data.get("source", ""),
+        severity=data.get("severity", ""),
+        host=data.get("host", ""),
+        description=data.get("description", "")[:description_limit],
+        created_at=data.get("created_at", ""),
+        completed_at=data.get("completed_at", ""),
+        result=result,
+        model_used=data.get("model_used", ""),
+        processing_time_ms=int(data.get("processing_time_ms", 0)),
+        ttft_ms=int(data["ttft_ms"]) if data.get("ttft_ms") else None,
+        partial_response=data.get("partial_response", "") if description_limit is None else "",
+        ticket_id=data.get("ticket_id", ""),
+        cached_from=data.get("cached_from", ""),
+        triage=data.get("triage", ""),
+        progress=progress,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Health Check
 # ---------------------------------------------------------------------------
@@ -153,7 +255,7 @@ async def health():
     redis_status = "error"
     try:
         r = get_redis()
-        if r.ping():
+        if await r.ping():
             redis_status = "ok"
     except redis.ConnectionError as e:
         logger.warning("Health: Redis Verbindungsfehler: %s", e)
@@ -207,6 +309,28 @@ async def health():
     )
 
 
+# ---------------------------------------------------------------------------
+# GET /ready — Readiness (Modelle geladen)
+# ---------------------------------------------------------------------------
+@app.get("/ready", response_model=ReadinessResponse)
+async def ready():
+    """503, bis der Warm-up Primaer- und Embedding-Modell geladen hat.
+
+    Anders als /health prueft /ready keine Abhaengigkeiten, sondern nur, ob
+    der Gateway Anfragen ohne Modell-Ladezeit beantworten kann. Die Antwort
+    kommt aus dem Zustand des Warm-ups, ohne Aufruf an Ollama.
+    """
+    body = ReadinessResponse(
+        status="ready" if _models_ready else "warming_up",
+        models=_model_load_times,
+    )
+    return Response(
+        content=body.model_dump_json(),
+        media_type="application/json",
+        status_code=200 if _models_ready else 503,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Prometheus Metrics
 # ---------------------------------------------------------------------------
@@ -218,9 +342,9 @@ async def metrics():
     erreichbar (interne Netzwerke). Grafana scraped diesen Endpoint direkt.
     """
     try:
-        r = get_redis()
-        queue_len = r.llen("mcp:queue:analyze")
-        QUEUE_LENGTH.set(queue_len)
+        queue_lengths = await job_queue.queue_lengths(get_redis())
+        for priority, queue_len in queue_lengths.items():
+            QUEUE_LENGTH.labels(priority=priority).set(queue_len)
     except Exception:
         pass
 
@@ -244,17 +368,6 @@ async def analyze(
 
     r = get_redis()
 
-    # Deduplizierung (TTL aus Settings)
-    dedup_key = f"mcp:dedup:{request.source}:{request.host}:{request.description[:50]}"
-    if r.exists(dedup_key):
-        return AnalyzeResponse(
-            status="deduplicated",
-            job_id="",
-            message="Duplikat — bereits in den letzten 15 Minuten verarbeitet",
-        )
-
-    r.setex(dedup_key, settings.dedup_ttl_seconds, "1")
-
     # Job erstellen (UUID statt Timestamp fuer Eindeutigkeit)
     job_id = f"job_{uuid.uuid4().hex[:12]}_{request.source}"
     job_data = {
@@ -270,11 +383,14 @@ async def analyze(
         "crowdsec_alerts": request.crowdsec_alerts,
     }
 
-    r.hset(f"mcp:job:{job_id}", mapping=job_data)
-    r.lpush("mcp:queue:analyze", job_id)
-
-    # TTL als Sicherheitsnetz: falls Worker den Job nie abholt
-    r.expire(f"mcp:job:{job_id}", 86400)  # 24h fuer unbearbeitete Jobs
+    # Deduplizierung (TTL aus Settings) und Einreihen atomar in einem Round-Trip
+    dedup_key = f"mcp:dedup:{request.source}:{request.host}:{request.description[:50]}"
+    if not await job_queue.enqueue(r, job_id, job_data, dedup_key):
+        return AnalyzeResponse(
+            status="deduplicated",
+            job_id="",
+            message="Duplikat — bereits in den letzten 15 Minuten verarbeitet",
+        )
 
     return AnalyzeResponse(
         status="queued",
@@ -340,9 +456,22 @@ async def embed(
 async def search(
     query: str,
     top_k: int = 5,
+    mode: str = "vector",
+    source_type: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    host: Optional[str] = None,
+    severity: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
     authorization: Optional[str] = Header(None),
 ):
-    """RAG-Wissensbasis via Vektor-Aehnlichkeit durchsuchen."""
+    """RAG-Wissensbasis durchsuchen.
+
+    mode: vector (Cosine-Aehnlichkeit), hybrid (Volltext + Vektor per
+    Reciprocal Rank Fusion) oder lexical (nur Volltext, ohne Embedding).
+    Filter (in SQL angewendet): source_type (kommagetrennt), tenant_id,
+    host und severity (aus metadata), created_after/created_before (ISO 8601).
+    """
     verify_token(authorization)
     REQUESTS_TOTAL.labels(endpoint="search").inc()
     RAG_SEARCHES.inc()
@@ -352,17 +481,38 @@ async def search(
 
     if not query or len(query.strip()) == 0:
         raise HTTPException(status_code=422, detail="Query darf nicht leer sein")
+    if mode not in ("vector", "hybrid", "lexical"):
+        raise HTTPException(status_code=422, detail="mode muss vector, hybrid oder lexical sein")
+    if tenant_id:
+        try:
+            uuid.UUID(tenant_id)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="tenant_id muss eine UUID sein")
+
+    filters = {
+        "source_types": [t.strip() for t in (source_type or "").split(",") if t.strip()],
+        "tenant_id": tenant_id,
+        "host": host,
+        "severity": severity,
+        "created_after": created_after,
+        "created_before": created_before,
+    }
 
     try:
-        query_embedding = await ollama_client.embed(query)
-        if not query_embedding:
+        query_embedding = await ollama_client.embed(query) if mode != "lexical" else []
+        if mode == "vector" and not query_embedding:
             raise HTTPException(status_code=503, detail="Embedding-Service nicht verfuegbar")
 
-        results = await rag_service.search_similar(query_embedding, limit=top_k)
+        if mode == "vector":
+            results = await rag_service.search_similar(query_embedding, limit=top_k, **filters)
+        else:
+            # hybrid ohne Embedding (Ollama nicht erreichbar) faellt auf die Volltextsuche zurueck
+            results = await rag_service.search_hybrid(query, query_embedding or None, limit=top_k, **filters)
 
         return SearchResponse(
             status="ok",
             query=query,
+            mode=mode,
             results=[
                 SearchResult(
                     id=r["id"],
@@ -370,6 +520,8 @@ async def search(
                     similarity=r["similarity"],
                     source_type=r.get("source_type", ""),
                     metadata=r.get("metadata", {}),
+                    score=r.get("score"),
+                    lexical=r.get("lexical", False),
                 )
                 for r in results
             ],
@@ -388,45 +540,138 @@ async def search(
 @app.post("/api/v1/ingest", response_model=IngestResponse)
 async def ingest(
     request: IngestRequest,
+    background: bool = False,
     authorization: Optional[str] = Header(None),
 ):
-    """Dokument in Chunks aufteilen, Embeddings erstellen und in pgvector speichern."""
+    """Dokument in Chunks aufteilen, Embeddings erstellen und in pgvector speichern.
+
+    Mit background=true wird nur gechunkt und ein Ingest-Job fuer den Worker
+    eingereiht (info-Queue); die Antwort enthaelt die Job-ID.
+    """
     verify_token(authorization)
     REQUESTS_TOTAL.labels(endpoint="ingest").inc()
 
     chunks = _chunk_text(request.text, request.chunk_size, request.chunk_overlap)
-
-    stored_count = 0
-    for i, chunk in enumerate(chunks):
-        try:
-            embedding = await ollama_client.embed(chunk)
-            if embedding:
-                chunk_metadata = {
-                    **request.metadata,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                }
-                result = await rag_service.store_embedding(
-                    content=chunk,
-                    embedding=embedding,
-                    source_type=request.source_type,
-                    source_id=f"{request.source_id or 'doc'}_{i}",
-                    metadata=chunk_metadata,
-                )
-                if result:
-                    stored_count += 1
-                    EMBEDDINGS_STORED.inc()
-        except Exception as e:
-            logger.warning("Chunk %d/%d fehlgeschlagen: %s", i + 1, len(chunks), e)
+    if background:
+        return await _enqueue_ingest(request, chunks)
+
+    # Batches parallel einbetten (begrenzt auf INGEST_EMBED_CONCURRENCY Requests),
+    # jeder Batch wird gespeichert, sobald seine Embeddings vorliegen
+    slots = asyncio.Semaphore(max(1, settings.ingest_embed_concurrency))
+    batch_size = max(1, settings.embed_batch_size)
+    results = await asyncio.gather(*(
+        _ingest_batch(request, chunks, offset, slots)
+        for offset in range(0, len(chunks), batch_size)
+    ))
+
+    stored_count = sum(created for created, _, _ in results)
+    duplicates = sum(dup for _, dup, _ in results)
+    failed_chunks = sorted((f for _, _, failures in results for f in failures), key=lambda f: f.index)
+    if failed_chunks:
+        logger.warning("Ingest: %d/%d Chunks fehlgeschlagen", len(failed_chunks), len(chunks))
+
+    # Duplikate und leere Dokumente sind kein Fehler; gleiche Regel im Ingest-Job des Workers
+    if not failed_chunks:
+        status = "ok"
+    elif len(failed_chunks) == len(chunks):
+        status = "failed"
+    else:
+        status = "partial"
 
     return IngestResponse(
-        status="ok" if stored_count > 0 else "partial",
+        status=status,
         chunks_created=stored_count,
         source_type=request.source_type,
         source_id=request.source_id,
+        chunks_total=len(chunks),
+        duplicates=duplicates,
+        failed_chunks=failed_chunks,
     )
 
 
+async def _enqueue_ingest(request: IngestRequest, chunks: list[str]) -> IngestResponse:
+    """Ingest-Job anlegen; Einbetten und Speichern uebernimmt der Worker."""
+    r = get_redis()
+    job_id = f"ingest_{uuid.uuid4().hex[:12]}_{request.source_type}"
+    job_data = {
+        "id": job_id,
+        "type": "ingest",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "status": "pending",
+        "source": request.source_type,
+        "severity": "info",
+        "host": "",
+        "description": f"Ingest {request.source_id or 'doc'} ({len(request.text)} Zeichen)",
+        "source_id": request.source_id or "",
+        "metadata": json.dumps(request.metadata),
+        "chunks_total": str(len(chunks)),
+    }
+
+    text_hash = hashlib.sha256(request.text.encode("utf-8")).hexdigest()[:32]
+    dedup_key = f"mcp:dedup:ingest:{request.source_type}:{text_hash}"
+    if not await job_queue.enqueue_ingest(r, job_id, job_data, chunks, dedup_key):
+        return IngestResponse(
+            status="deduplicated",
+            chunks_created=0,
+            source_type=request.source_type,
+            source_id=request.source_id,
+            chunks_total=len(chunks),
+        )
+
+    return IngestResponse(
+        status="queued",
+        chunks_created=0,
+        source_type=request.source_type,
+        source_id=request.source_id,
+        chunks_total=len(chunks),
+        job_id=job_id,
+    )
+
+
+async def _ingest_batch(
+    request: IngestRequest,
+    chunks: list[str],
+    offset: int,
+    slots: asyncio.Semaphore,
+) -> tuple[int, int, list[ChunkFailure]]:
+    """Einen Batch ab `offset` einbetten und speichern → (neu, Duplikate, Fehler)."""
+    batch = chunks[offset:offset + max(1, settings.embed_batch_size)]
+    indexes = range(offset, offset + len(batch))
+    try:
+        async with slots:
+            embeddings = await ollama_client.embed_batch(batch)
+    except Exception as e:
+        return 0, 0, [ChunkFailure(index=i, error=f"Embedding fehlgeschlagen: {e}") for i in indexes]
+
+    failures = []
+    items = []
+    for i, chunk, embedding in zip(indexes, batch, embeddings):
+        if not embedding:
+            failures.append(ChunkFailure(index=i, error="Kein Embedding erhalten"))
+            continue
+        items.append({
+            "content": chunk,
+            "embedding": embedding,
+            "source_type": request.source_type,
+            "source_id": f"{request.source_id or 'doc'}_{i}",
+            "metadata": {**request.metadata, "chunk_index": i, "total_chunks": len(chunks)},
+        })
+    if not items:
+        return 0, 0, failures
+
+    ids = await rag_service.store_embeddings(items)
+    if ids is None:
+        failures.extend(
+            ChunkFailure(index=item["metadata"]["chunk_index"], error="Speicherung fehlgeschlagen")
+            for item in items
+        )
+        return 0, 0, failures
+
+    created = sum(1 for row_id in ids if row_id)
+    EMBEDDINGS_STORED.inc(created)
+    return created, len(ids) - created, failures
+
+
 def _chunk_text(text: str, chunk_size: int, overlap: int) -> list[str]:
     """Text in ueberlappende Chunks aufteilen (an Satz-/Wort-Grenzen)."""
     text = text.strip()
@@ -475,60 +720,54 @@ def _chunk_text(text: str, chunk_size: int, overlap: int) -> list[str]:
 async def list_jobs(
     offset: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    source: Optional[str] = None,
+    severity: Optional[str] = None,
+    host: Optional[str] = None,
     authorization: Optional[str] = Header(None),
 ):
-    """Alle Analyse-Jobs auflisten."""
+    """Analyse-Jobs (neueste zuerst) auflisten, optional gefiltert.
+
+    Zum Weiterblaettern next_cursor der vorherigen Antwort als cursor uebergeben.
+    """
     verify_token(authorization)
     REQUESTS_TOTAL.labels(endpoint="jobs").inc()
 
     # Input-Validierung
     offset = max(0, offset)
     limit = max(1, min(limit, 100))
+    if offset >= MAX_INDEX_SCAN:
+        # Der Index wird je Anfrage nur bis MAX_INDEX_SCAN Eintraege durchlaufen
+        raise HTTPException(
+            status_code=422,
+            detail=f"offset muss kleiner als {MAX_INDEX_SCAN} sein — zum Weiterblaettern next_cursor verwenden",
+        )
 
     r = get_redis()
     jobs = []
 
-    cursor = 0
-    all_keys = []
-    while True:
-        cursor, keys = r.scan(cursor=cursor, match="mcp:job:*", count=100)
-        all_keys.extend(keys)
-        if cursor == 0:
-            break
-
-    all_keys.sort(reverse=True)
-    total = len(all_keys)
-    page_keys = all_keys[offset:offset + limit]
+    try:
+        page_data, total, next_cursor = await job_queue.list_jobs(
+            r,
+            {"status": status, "source": source, "severity": severity, "host": host},
+            cursor=cursor,
+            offset=offset,
+            limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungueltiger Cursor")
 
-    for key in page_keys:
+    for data in page_data:
         try:
-            data = r.hgetall(key)
             if data:
-                result = None
-                if data.get("result"):
-                    try:
-                        result = json.loads(data["result"])
-                    except json.JSONDecodeError:
-                        pass
-
-                jobs.append(JobStatus(
-                    id=data.get("id", key.split(":")[-1]),
-                    status=data.get("status", "unknown"),
-                    source=data.get("source", ""),
-                    severity=data.get("severity", ""),
-                    host=data.get("host", ""),
-                    description=data.get("description", "")[:200],
-                    created_at=data.get("created_at", ""),
-                    completed_at=data.get("completed_at", ""),
-                    result=result,
-                    model_used=data.get("model_used", ""),
-                    processing_time_ms=int(data.get("processing_time_ms", 0)),
-                    ticket_id=data.get("ticket_id", ""),
-                ))
+                jobs.append(job_status_from_hash(data, data.get("id", ""), description_limit=200))
         except Exception as e:
-            logger.warning("Job-Daten fuer %s fehlerhaft: %s", key, e)
+            logger.warning("Job-Daten fuer %s fehlerhaft: %s", data.get("id"), e)
 
-    return JobListResponse(jobs=jobs, total=total, offset=offset, limit=limit)
+    return JobListResponse(
+        jobs=jobs, total=total, offset=offset, limit=limit, next_cursor=next_cursor,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -544,31 +783,75 @@ async def get_job(
     REQUESTS_TOTAL.labels(endpoint="job_detail").inc()
 
     r = get_redis()
-    data = r.hgetall(f"mcp:job:{job_id}")
+    data = await r.hgetall(f"mcp:job:{job_id}")
 
     if not data:
         raise HTTPException(status_code=404, detail=f"Job {job_id} nicht gefunden")
 
-    result = None
-    if data.get("result"):
-        try:
-            result = json.loads(data["result"])
-        except json.JSONDecodeError:
-            pass
+    return job_status_from_hash(data, job_id)
 
-    return JobStatus(
-        id=data.get("id", job_id),
-        status=data.get("status", "unknown"),
-        source=data.get("source", ""),
-        severity=data.get("severity", ""),
-        host=data.get("host", ""),
-        description=data.get("description", ""),
-        created_at=data.get("created_at", ""),
-        completed_at=data.get("completed_at", ""),
-        result=result,
-        model_used=data.get("model_used", ""),
-        processing_time_ms=int(data.get("processing_time_ms", 0)),
-        ticket_id=data.get("ticket_id", ""),
+
+# ---------------------------------------------------------------------------
+# GET /api/v1/jobs/{job_id}/stream — Job-Fortschritt als Server-Sent Events
+# ---------------------------------------------------------------------------
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/api/v1/jobs/{job_id}/stream")
+async def stream_job(
+    job_id: str,
+    authorization: Optional[str] = Header(None),
+):
+    """Analyse-Fortschritt eines Jobs als Server-Sent Events streamen.
+
+    Events: "progress" bei jeder Aenderung von status, partial_response,
+    ttft_ms oder chunks_done (Ingest-Jobs); abschliessend "done" mit dem vollstaendigen Job-Status bzw.
+    "timeout" nach JOB_STREAM_TIMEOUT Sekunden.
+    """
+    verify_token(authorization)
+    REQUESTS_TOTAL.labels(endpoint="job_stream").inc()
+
+    r = get_redis()
+    key = f"mcp:job:{job_id}"
+    if not await r.exists(key):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} nicht gefunden")
+
+    async def events():
+        last = None
+        last_sent = time.monotonic()
+        deadline = last_sent + settings.job_stream_timeout
+        while time.monotonic() < deadline:
+            status, partial, ttft_ms, chunks_done = await r.hmget(
+                key, "status", "partial_response", "ttft_ms", "chunks_done",
+            )
+            if status is None:
+                yield _sse("error", {"detail": f"Job {job_id} nicht mehr vorhanden"})
+                return
+            if status in ("completed", "failed"):
+                data = await r.hgetall(key)
+                yield _sse("done", job_status_from_hash(data, job_id).model_dump())
+                return
+            if (status, partial, ttft_ms, chunks_done) != last:
+                last = (status, partial, ttft_ms, chunks_done)
+                last_sent = time.monotonic()
+                yield _sse("progress", {
+                    "status": status,
+                    "partial_response": partial or "",
+                    "ttft_ms": int(ttft_ms) if ttft_ms else None,
+                    "chunks_done": int(chunks_done) if chunks_done else None,
+                })
+            elif time.monotonic() - last_sent > 15:
+                # Keep-Alive-Kommentar gegen Idle-Timeouts von Proxies
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(settings.job_stream_poll_interval)
+        yield _sse("timeout", {"detail": "Maximale Stream-Dauer erreicht"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -0,0 +1,120 @@
+"""MCP v7 — Verwaltungsbefehle fuer den pgvector-Index der RAG-Wissensbasis.
+
+Im Gateway-Container ausfuehren (DSN aus den PGVECTOR_*-Variablen):
+
+    python -m app.manage index-info
+    python -m app.manage reindex --m 24 --ef-construction 128
+    python -m app.manage ef-search 80
+
+reindex baut idx_embeddings_vector mit CREATE INDEX CONCURRENTLY neu auf
+(Suche und Schreibzugriffe laufen weiter), entfernt danach den alten Index
+und benennt den neuen um. ef-search setzt hnsw.ef_search als Standard fuer
+neue Sessions der Datenbank; pro Abfrage gilt zusaetzlich RAG_EF_SEARCH.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+import asyncpg
+
+from app.config import settings
+
+INDEX_NAME = "idx_embeddings_vector"
+_BUILD_NAME = f"{INDEX_NAME}_rebuild"
+
+
+async def index_info(conn: asyncpg.Connection) -> None:
+    """Definition, Groesse und Zeilenzahl des Vektor-Index ausgeben."""
+    row = await conn.fetchrow(
+        """
+        SELECT pg_get_indexdef(c.oid) AS definition,
+               pg_size_pretty(pg_relation_size(c.oid)) AS size,
+               i.indisvalid AS valid
+        FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+        WHERE c.relname = $1
+        """,
+        INDEX_NAME,
+    )
+    if row is None:
+        print(f"{INDEX_NAME} existiert nicht")
+        return
+    rows = await conn.fetchval("SELECT count(*) FROM embeddings")
+    ef_search = await conn.fetchval("SELECT current_setting('hnsw.ef_search')")
+    print(f"{row['definition']}")
+    print(f"Groesse: {row['size']}, gueltig: {row['valid']}, Zeilen: {rows}, hnsw.ef_search: {ef_search}")
+
+
+async def reindex(conn: asyncpg.Connection, m: int, ef_construction: int, workers: int, memory: str) -> None:
+    """HNSW-Index mit neuen Parametern nebenlaeufig neu aufbauen und austauschen."""
+    # Reste eines abgebrochenen Laufs (ungueltiger Index) entfernen
+    await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_BUILD_NAME}")
+    await conn.execute("SELECT set_config('maintenance_work_mem', $1, false)", memory)
+    await conn.execute("SELECT set_config('max_parallel_maintenance_workers', $1, false)", str(workers))
+
+    start = time.monotonic()
+    print(f"Baue {_BUILD_NAME} (m={m}, ef_construction={ef_construction}) ...")
+    await conn.execute(
+        f"CREATE INDEX CONCURRENTLY {_BUILD_NAME} ON embeddings "
+        f"USING hnsw (embedding vector_cosine_ops) WITH (m = {m}, ef_construction = {ef_construction})"
+    )
+    print(f"Index gebaut in {time.monotonic() - start:.1f}s — tausche {INDEX_NAME} aus")
+
+    await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+    await conn.execute(f"ALTER INDEX {_BUILD_NAME} RENAME TO {INDEX_NAME}")
+    await index_info(conn)
+
+
+async def set_ef_search(conn: asyncpg.Connection, ef_search: int) -> None:
+    """hnsw.ef_search als Datenbank-Standard fuer neue Sessions setzen."""
+    database = await conn.fetchval("SELECT current_database()")
+    await conn.execute(f'ALTER DATABASE "{database}" SET hnsw.ef_search = {ef_search}')
+    print(f"hnsw.ef_search = {ef_search} fuer neue Sessions von {database}")
+
+
+async def run(args: argparse.Namespace) -> int:
+    conn = await asyncpg.connect(args.dsn or settings.pgvector_dsn)
+    try:
+        if args.command == "index-info":
+            await index_info(conn)
+        elif args.command == "reindex":
+            await reindex(conn, args.m, args.ef_construction, args.workers, args.maintenance_work_mem)
+        elif args.command == "ef-search":
+            await set_ef_search(conn, args.value)
+    finally:
+        await conn.close()
+    return 0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default="", help="pgvector-DSN (Default: aus PGVECTOR_*)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("index-info", help="Definition und Groesse des Vektor-Index")
+
+    rebuild = commands.add_parser("reindex", help="HNSW-Index mit neuen Parametern neu aufbauen")
+    rebuild.add_argument("--m", type=int, default=settings.hnsw_m, help="Verbindungen pro Knoten (2-100)")
+    rebuild.add_argument("--ef-construction", type=int, default=settings.hnsw_ef_construction,
+                         help="Kandidatenliste beim Aufbau (>= 2*m)")
+    rebuild.add_argument("--workers", type=int, default=2, help="max_parallel_maintenance_workers")
+    rebuild.add_argument("--maintenance-work-mem", default="512MB",
+                         help="Speicher fuer den Aufbau (Graph sollte hineinpassen)")
+
+    ef = commands.add_parser("ef-search", help="hnsw.ef_search fuer neue Sessions setzen")
+    ef.add_argument("value", type=int)
+
+    args = parser.parse_args()
+    if args.command == "reindex":
+        if not 2 <= args.m <= 100:
+            parser.error("--m muss zwischen 2 und 100 liegen")
+        if args.ef_construction < 2 * args.m:
+            parser.error("--ef-construction muss mindestens 2*m sein")
+    if args.command == "ef-search" and not 1 <= args.value <= 1000:
+        parser.error("ef_search muss zwischen 1 und 1000 liegen")
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -42,9 +42,19 @@ class AnalyzeResponse(BaseModel):
 # ---------------------------------------------------------------------------
 # Jobs
 # ---------------------------------------------------------------------------
+class IngestProgress(BaseModel):
+    chunks_total: int = 0
+    chunks_done: int = 0
+    chunks_created: int = 0
+    duplicates: int = 0
+    chunks_failed: int = 0
+    chunks_per_second: float = 0.0
+
+
 class JobStatus(BaseModel):
     id: str
     status: str
+    type: str = "analyze"
     source: str = ""
     severity: str = ""
     host: str = ""
@@ -54,7 +64,16 @@ class JobStatus(BaseModel):
     result: dict[str, Any] | None = None
     model_used: str = ""
     processing_time_ms: int = 0
+    # Streaming: Zeit bis zum ersten Token und Zwischenstand waehrend der Analyse
+    ttft_ms: int | None = None
+    partial_response: str = ""
     ticket_id: str = ""
+    # Job, dessen Analyse uebernommen wurde (Ergebnis-Cache oder Vorab-Triage "reuse")
+    cached_from: str = ""
+    # Entscheidung der Vorab-Triage im Worker: full, reuse, summary (leer bei Cache-Treffer)
+    triage: str = ""
+    # Nur bei Ingest-Jobs
+    progress: IngestProgress | None = None
 
 
 class JobListResponse(BaseModel):
@@ -62,6 +81,8 @@ class JobListResponse(BaseModel):
     total: int
     offset: int
     limit: int
+    # Cursor fuer die naechste Seite (None = keine weiteren Jobs)
+    next_cursor: str | None = None
 
 
 # ---------------------------------------------------------------------------
@@ -91,11 +112,15 @@ class SearchResult(BaseModel):
     similarity: float
     source_type: str = ""
     metadata: dict[str, Any] = Field(default_factory=dict)
+    # Nur bei mode=hybrid/lexical: RRF-Score und ob der Eintrag ueber die Volltextsuche gefunden wurde
+    score: float | None = None
+    lexical: bool = False
 
 
 class SearchResponse(BaseModel):
     status: str
     query: str
+    mode: str = "vector"
     results: list[SearchResult]
     total: int
 
@@ -120,11 +145,21 @@ class IngestRequest(BaseModel):
         return v
 
 
+class ChunkFailure(BaseModel):
+    index: int
+    error: str
+
+
 class IngestResponse(BaseModel):
-    status: str
+    status: str  # ok | partial (einzelne Chunks fehlgeschlagen) | failed (alle) | queued | deduplicated
     chunks_created: int
     source_type: str
     source_id: str | None
+    chunks_total: int = 0
+    duplicates: int = 0
+    failed_chunks: list[ChunkFailure] = Field(default_factory=list)
+    # Nur bei background=true: Ingest-Job, Fortschritt ueber GET /api/v1/jobs/{job_id}
+    job_id: str | None = None
 
 
 # ---------------------------------------------------------------------------
@@ -139,6 +174,12 @@ class ModelInfo(BaseModel):
 # ---------------------------------------------------------------------------
 # Health
 # ---------------------------------------------------------------------------
+class ReadinessResponse(BaseModel):
+    status: str  # ready | warming_up
+    # Ladezeit je Modell in Sekunden (Warm-up beim Start)
+    models: dict[str, float] = Field(default_factory=dict)
+
+
 class HealthResponse(BaseModel):
     status: str
     redis: str
@@ -0,0 +1,217 @@
+"""MCP v7 — Job-Queue des AI Gateways (atomares Deduplizieren + Einreihen, Job-Index).
+
+Job-Index: Sorted Sets mit dem Erstellungszeitpunkt als Score
+    mcp:jobs:index                    — alle Jobs
+    mcp:jobs:index:source:<source>    — je Quelle
+    mcp:jobs:index:severity:<sev>     — je Schweregrad
+    mcp:jobs:index:host:<host>        — je Host
+    mcp:jobs:index:status:<status>    — je Status (vom Worker bei Statuswechsel gepflegt)
+
+GET /api/v1/jobs liest damit nur die angefragte Seite statt per SCAN den
+gesamten Keyspace. Eintraege abgelaufener Jobs werden beim Einreihen (nach
+JOB_RETENTION_SECONDS) bzw. beim Auflisten entfernt; der Worker kuerzt
+Status-Indizes beim Statuswechsel und alle Indizes periodisch im Reaper.
+"""
+
+import json
+import logging
+import time
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger("mcp-ai-gateway")
+
+# Prioritaets-Queues je Severity (Worker entnimmt gewichtet fair)
+QUEUE_PREFIX = "mcp:queue:analyze:"
+QUEUE_PRIORITIES = ("critical", "high", "warning", "info")
+
+# TTL als Sicherheitsnetz: falls Worker den Job nie abholt
+PENDING_JOB_TTL_SECONDS = 86400
+
+# Chunks asynchroner Ingest-Jobs (getrennt vom Job-Hash, damit Listen/Status klein bleiben)
+INGEST_PAYLOAD_PREFIX = "mcp:ingest:"
+
+JOB_INDEX_KEY = "mcp:jobs:index"
+JOB_INDEX_FILTERS = ("status", "source", "severity", "host")
+# 7 Tage Ergebnis-TTL + max. 24h Wartezeit in der Queue
+JOB_RETENTION_SECONDS = 8 * 86400
+# Obergrenze gepruefter Index-Eintraege pro Anfrage (bei Filtern)
+MAX_INDEX_SCAN = 1000
+
+# Dedup-Pruefung, Job-Hash, TTL, Einreihen und Index-Pflege in einem Round-Trip.
+# SET NX schliesst das Race-Fenster zwischen EXISTS und SETEX.
+# KEYS[1] = Dedup-Key, KEYS[2] = Job-Hash, KEYS[3] = Queue, KEYS[4..] = Index-Keys
+# ARGV[1] = Dedup-TTL, ARGV[2] = Job-TTL, ARGV[3] = Job-ID, ARGV[4] = Score,
+# ARGV[5] = Index-Aufbewahrung bis Score, ARGV[6..] = Feld/Wert-Paare
+_ENQUEUE_SCRIPT = """
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[2], unpack(ARGV, 6))
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('LPUSH', KEYS[3], ARGV[3])
+for i = 4, #KEYS do
+    redis.call('ZADD', KEYS[i], ARGV[4], ARGV[3])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', '(' .. ARGV[5])
+end
+return 1
+"""
+
+
+def queue_key(severity: str) -> str:
+    """Queue-Key fuer eine Severity (unbekannt → warning)."""
+    return f"{QUEUE_PREFIX}{severity if severity in QUEUE_PRIORITIES else 'warning'}"
+
+
+def index_key(field: str | None = None, value: str | None = None) -> str:
+    """Key des globalen Job-Index bzw. eines Filter-Index."""
+    return JOB_INDEX_KEY if field is None else f"{JOB_INDEX_KEY}:{field}:{value}"
+
+
+def encode_cursor(score: float, job_id: str) -> str:
+    return f"{score!r}:{job_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    """Cursor "<score>:<job_id>" zerlegen (ValueError bei ungueltigem Format)."""
+    score, sep, job_id = cursor.partition(":")
+    if not sep or not job_id:
+        raise ValueError("Ungueltiger Cursor")
+    return float(score), job_id
+
+
+class JobQueue:
+    """Analyse-Jobs atomar deduplizieren und in die Prioritaets-Queue einreihen."""
+
+    async def enqueue(
+        self,
+        r: aioredis.Redis,
+        job_id: str,
+        job_data: dict[str, str],
+        dedup_key: str,
+    ) -> bool:
+        """Job anlegen, einreihen und indexieren. False, wenn der Dedup-Key bereits existiert."""
+        fields = [item for pair in job_data.items() for item in pair]
+        score = time.time()
+        index_keys = [index_key()] + [
+            index_key(field, job_data.get(field, "")) for field in JOB_INDEX_FILTERS
+        ]
+        script = r.register_script(_ENQUEUE_SCRIPT)
+        queued = await script(
+            keys=[dedup_key, f"mcp:job:{job_id}", queue_key(job_data.get("severity", "")), *index_keys],
+            args=[
+                settings.dedup_ttl_seconds, PENDING_JOB_TTL_SECONDS, job_id,
+                score, score - JOB_RETENTION_SECONDS, *fields,
+            ],
+        )
+        return bool(queued)
+
+    async def enqueue_ingest(
+        self,
+        r: aioredis.Redis,
+        job_id: str,
+        job_data: dict[str, str],
+        chunks: list[str],
+        dedup_key: str,
+    ) -> bool:
+        """Ingest-Job einreihen; die Chunks liegen unter mcp:ingest:<job_id>.
+
+        Die Chunks werden vor dem Einreihen geschrieben, damit der Worker sie
+        immer vorfindet. False (und Chunks verworfen), wenn der Job ein Duplikat ist.
+        """
+        payload_key = f"{INGEST_PAYLOAD_PREFIX}{job_id}"
+        await r.set(payload_key, json.dumps(chunks, ensure_ascii=False), ex=PENDING_JOB_TTL_SECONDS)
+        if await self.enqueue(r, job_id, job_data, dedup_key):
+            return True
+        await r.delete(payload_key)
+        return False
+
+    async def list_jobs(
+        self,
+        r: aioredis.Redis,
+        filters: dict[str, str | None],
+        cursor: str | None = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> tuple[list[dict], int, str | None]:
+        """Jobs (neueste zuerst) ueber den Job-Index auflisten.
+
+        Bei mehreren Filtern wird der kleinste Filter-Index durchlaufen und
+        die uebrigen Filter werden auf den Job-Hashes geprueft. Rueckgabe:
+        (Job-Hashes der Seite, Groesse des durchlaufenen Index, naechster Cursor).
+        """
+        filters = {field: value for field, value in filters.items() if value}
+        keys = [index_key(field, value) for field, value in filters.items()] or [index_key()]
+
+        async with r.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.zcard(key)
+            sizes = await pipe.execute()
+        total, driver = min(zip(sizes, keys))
+
+        max_score, after_id = (float("inf"), None) if cursor is None else decode_cursor(cursor)
+        batch = min(max(limit * 2, 20), 200)
+        jobs: list[dict] = []
+        skipped = scanned = 0
+        last: tuple[float, str] | None = None
+        exhausted = False
+
+        while len(jobs) < limit and scanned < MAX_INDEX_SCAN:
+            entries = await r.zrevrangebyscore(
+                driver, max_score, "-inf", start=0, num=batch, withscores=True,
+            )
+            # Eintraege mit gleichem Score sind absteigend nach Job-ID sortiert —
+            # bereits gelieferte (>= after_id) ueberspringen
+            fresh = [
+                (job_id, score) for job_id, score in entries
+                if after_id is None or score != max_score or job_id < after_id
+            ]
+            if not fresh:
+                exhausted = True
+                break
+
+            async with r.pipeline(transaction=False) as pipe:
+                for job_id, _ in fresh:
+                    pipe.hgetall(f"mcp:job:{job_id}")
+                page_data = await pipe.execute()
+
+            stale = []
+            for (job_id, score), data in zip(fresh, page_data):
+                scanned += 1
+                last = (score, job_id)
+                if not data:
+                    stale.append(job_id)
+                elif all(data.get(field) == value for field, value in filters.items()):
+                    if skipped < offset:
+                        skipped += 1
+                    else:
+                        jobs.append(data)
+                        if len(jobs) == limit:
+                            break
+            if stale:
+                # Abgelaufene Jobs aus dem Index entfernen
+                async with r.pipeline(transaction=False) as pipe:
+                    for key in {driver, index_key()}:
+                        pipe.zrem(key, *stale)
+                    await pipe.execute()
+
+            max_score, after_id = last
+            if len(entries) < batch and last == fresh[-1][::-1]:
+                exhausted = True
+                break
+
+        next_cursor = encode_cursor(*last) if last and not exhausted else None
+        return jobs, total, next_cursor
+
+    async def queue_lengths(self, r: aioredis.Redis) -> dict[str, int]:
+        """Aktuelle Laenge aller Prioritaets-Queues (ein Round-Trip)."""
+        async with r.pipeline(transaction=False) as pipe:
+            for priority in QUEUE_PRIORITIES:
+                pipe.llen(queue_key(priority))
+            lengths = await pipe.execute()
+        return dict(zip(QUEUE_PRIORITIES, lengths))
+
+
+job_queue = JobQueue()
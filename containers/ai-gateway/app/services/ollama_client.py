@@ -7,6 +7,7 @@ import time
 import httpx
 
 from app.config import settings
+from app.services.embedding_cache import embedding_cache
 
 logger = logging.getLogger("mcp-ai-gateway")
 
@@ -32,6 +33,7 @@ class OllamaClient:
             "prompt": prompt,
             "stream": False,
             "options": {"temperature": temperature},
+            "keep_alive": settings.ollama_keep_alive,
         }
         if system:
             payload["system"] = system
@@ -57,28 +59,54 @@ class OllamaClient:
         return {}
 
     async def embed(self, text: str, model: str | None = None) -> list[float]:
-        """Embedding-Vektor generieren mit Retry-Logik (3 Versuche)."""
+        """Embedding-Vektor generieren mit Retry-Logik (3 Versuche), vorher im Cache nachsehen."""
+        model = model or settings.embedding_model
+        cached = await embedding_cache.get(model, text)
+        if cached is not None:
+            return cached
+        embeddings = await self._embed_request([text], model)
+        embedding = embeddings[0] if embeddings else []
+        await embedding_cache.put(model, text, embedding)
+        return embedding
+
+    async def embed_batch(self, texts: list[str], model: str | None = None) -> list[list[float]]:
+        """Embeddings fuer mehrere Texte (je EMBED_BATCH_SIZE Texte ein Request).
+
+        Die Rueckgabe ist positionsgleich zu `texts`; Texte eines endgueltig
+        fehlgeschlagenen Requests erhalten eine leere Liste.
+        """
+        batch_size = max(1, settings.embed_batch_size)
+        results: list[list[float]] = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            embeddings = await self._embed_request(batch, model)
+            if len(embeddings) != len(batch):
+                embeddings = [[] for _ in batch]
+            results.extend(embeddings)
+        return results
+
+    async def _embed_request(self, inputs: list[str], model: str | None = None) -> list[list[float]]:
+        """POST /api/embed (input als Liste) mit Retry-Logik (3 Versuche)."""
         model = model or settings.embedding_model
 
         for attempt in range(3):
             try:
                 resp = await self.client.post(
                     "/api/embed",
-                    json={"model": model, "input": text},
+                    json={"model": model, "input": inputs, "keep_alive": settings.ollama_keep_alive},
                 )
                 resp.raise_for_status()
                 data = resp.json()
-                embeddings = data.get("embeddings", [[]])
-                result = embeddings[0] if embeddings else []
+                embeddings = data.get("embeddings") or []
 
-                if result and settings.expected_embedding_dimensions:
-                    if len(result) != settings.expected_embedding_dimensions:
+                if embeddings and embeddings[0] and settings.expected_embedding_dimensions:
+                    if len(embeddings[0]) != settings.expected_embedding_dimensions:
                         logger.warning(
                             "Embedding-Dimension %d weicht von erwartet %d ab",
-                            len(result), settings.expected_embedding_dimensions,
+                            len(embeddings[0]), settings.expected_embedding_dimensions,
                         )
 
-                return result
+                return embeddings
             except (httpx.HTTPStatusError, httpx.ConnectError, httpx.ReadTimeout) as e:
                 wait = 2 ** (attempt + 1)
                 logger.warning(
@@ -102,6 +130,24 @@ class OllamaClient:
             logger.error("Modell-Liste fehlgeschlagen: %s", e)
             return []
 
+    async def load_model(self, model: str, embedding: bool = False) -> float:
+        """Modell in Ollama laden (ohne Generierung) und die Ladezeit in Sekunden liefern.
+
+        Ollama meldet die reine Ladezeit als load_duration (ns); fehlt sie, zaehlt
+        die Dauer des Aufrufs. Fehler werden an den Aufrufer weitergegeben.
+        """
+        if embedding:
+            path, payload = "/api/embed", {"model": model, "input": ["warm-up"]}
+        else:
+            path, payload = "/api/generate", {"model": model, "prompt": "", "stream": False}
+        payload["keep_alive"] = settings.ollama_keep_alive
+
+        start = time.monotonic()
+        resp = await self.client.post(path, json=payload, timeout=settings.model_warmup_timeout)
+        resp.raise_for_status()
+        load_duration = resp.json().get("load_duration")
+        return load_duration / 1e9 if load_duration else time.monotonic() - start
+
     async def health_check(self) -> bool:
         """Ollama-Erreichbarkeit pruefen."""
         try:
@@ -3,13 +3,171 @@
 import hashlib
 import json
 import logging
+from datetime import datetime, timezone
 
 import asyncpg
+import numpy as np
+from pgvector.asyncpg import register_vector
 
 from app.config import settings
 
 logger = logging.getLogger("mcp-ai-gateway")
 
+# SQL-Bausteine bis vor die Service-Klasse: gleicher Code in
+# containers/langchain-worker/app/services/pgvector_service.py
+# (Gateway und Worker bauen aus getrennten Kontexten) — Aenderungen in beiden Dateien vornehmen.
+
+# Bulk-Speicherung: COPY (Binaerprotokoll) in eine Staging-Tabelle pro Session,
+# danach ein mengenbasiertes INSERT ... ON CONFLICT in embeddings.
+_STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS embeddings_staging (
+        ord             INTEGER,
+        content         TEXT,
+        content_hash    VARCHAR(64),
+        embedding       vector,
+        source_type     VARCHAR(50),
+        source_id       VARCHAR(255),
+        metadata        TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+_STAGING_COLUMNS = ["ord", "content", "content_hash", "embedding", "source_type", "source_id", "metadata"]
+_MERGE_SQL = """
+    WITH inserted AS (
+        INSERT INTO embeddings
+            (content, content_hash, embedding, source_type, source_id, metadata)
+        SELECT content, content_hash, embedding, source_type, source_id, metadata::jsonb
+        FROM embeddings_staging
+        ORDER BY ord
+        ON CONFLICT (content_hash, source_type)
+            WHERE content_hash IS NOT NULL
+        DO NOTHING
+        RETURNING id, content_hash, source_type
+    )
+    SELECT s.ord, i.id
+    FROM embeddings_staging s
+    JOIN inserted i ON i.content_hash = s.content_hash AND i.source_type = s.source_type
+"""
+
+
+def _as_vector(values) -> np.ndarray:
+    """Embedding als big-endian float32 — das Wire-Format von pgvector (kein weiteres Kopieren im Codec)."""
+    return np.asarray(values, dtype=">f4")
+
+
+# 'simple' kennt keine Stoppwoerter — Fuellwoerter passen auf fast jede Zeile und
+# machen die ODER-Suche zum Tabellen-Scan mit Ranking; sie und Tokens unter 3 Zeichen
+# fallen daher weg
+_STOPWORDS = (
+    "and", "are", "but", "for", "from", "has", "have", "into", "not", "that", "the", "this",
+    "was", "were", "will", "with", "als", "auf", "aus", "bei", "das", "dem", "den", "der",
+    "des", "die", "ein", "eine", "einem", "einen", "einer", "fuer", "für", "ist", "mit",
+    "nach", "nicht", "oder", "sich", "sind", "und", "vom", "von", "wird", "wurde", "zum", "zur",
+)
+
+# Suchbegriffe ODER-verknuepft (sonst muesste eine Alert-Beschreibung komplett
+# vorkommen); 'simple' ohne Stemming, damit Hostnamen und Fehlercodes exakt bleiben
+_TSQUERY = f"""(
+    SELECT to_tsquery('simple', string_agg(quote_literal(word), ' | ')) AS query
+    FROM unnest(tsvector_to_array(to_tsvector('simple', $2))) AS word
+    WHERE length(word) >= 3 AND word <> ALL(ARRAY[{", ".join(f"'{w}'" for w in _STOPWORDS)}])
+) q"""
+
+
+def _hybrid_ctes(conditions: str, vector_param: str | None, min_rank: float | None = None) -> str:
+    """CTEs der hybriden Suche bis zur Reciprocal Rank Fusion (Tabelle `fused`).
+
+    Parameter: $2 Suchtext, $3 Kandidaten je Trefferliste, $4 RRF-Konstante k;
+    `vector_param` ist das Query-Embedding (None = nur Volltext). Mit `min_rank`
+    gilt ein Volltext-Treffer nur ab diesem ts_rank_cd als lexical.
+    """
+    and_conditions = f"AND {conditions}" if conditions else ""
+    ctes = f"""
+        WITH text_hits AS MATERIALIZED (
+            SELECT id, text_rank, row_number() OVER (ORDER BY text_rank DESC, id) AS rank
+            FROM (
+                SELECT e.id, ts_rank_cd(e.content_tsv, q.query) AS text_rank
+                FROM embeddings e, {_TSQUERY}
+                WHERE e.content_tsv @@ q.query {and_conditions}
+            ) matched
+            ORDER BY rank
+            LIMIT $3
+        )"""
+    lexical = "true" if min_rank is None else f"text_rank >= {float(min_rank)}"
+    hits = f"SELECT id, rank, {lexical} AS lexical FROM text_hits"
+    if vector_param:
+        where = f"WHERE {conditions}" if conditions else ""
+        ctes += f""",
+        vector_hits AS MATERIALIZED (
+            SELECT id, row_number() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT id, embedding <=> {vector_param} AS distance
+                FROM embeddings
+                {where}
+                ORDER BY distance
+                LIMIT $3
+            ) nearest
+        )"""
+        hits += " UNION ALL SELECT id, rank, false FROM vector_hits"
+    return ctes + f""",
+        fused AS (
+            SELECT id, sum(1.0 / ($4 + rank)) AS score, bool_or(lexical) AS lexical
+            FROM ({hits}) hits
+            GROUP BY id
+        )"""
+
+
+def _filter_clause(
+    args: list,
+    source_types: list[str] | None = None,
+    tenant_id: str | None = None,
+    host: str | None = None,
+    severity: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+) -> str:
+    """Metadaten-Filter als AND-verknuepfte Bedingung ("" = keine); Werte werden an `args` angehaengt."""
+    conditions = []
+
+    def param(value) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if source_types:
+        # idx_embeddings_source
+        conditions.append(f"source_type = ANY({param(list(source_types))}::varchar[])")
+    if tenant_id:
+        # idx_embeddings_tenant
+        conditions.append(f"tenant_id = {param(tenant_id)}::uuid")
+    if host:
+        conditions.append(f"metadata->>'host' = {param(host)}")
+    if severity:
+        conditions.append(f"metadata->>'severity' = {param(severity)}")
+    if created_after:
+        conditions.append(f"created_at >= {param(_as_utc(created_after))}")
+    if created_before:
+        conditions.append(f"created_at < {param(_as_utc(created_before))}")
+    return " AND ".join(conditions)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Zeitangaben ohne Zeitzone als UTC interpretieren (created_at ist TIMESTAMPTZ)."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# Standardwert von hnsw.ef_search im Server
+_HNSW_DEFAULT_EF_SEARCH = 40
+
+
+async def _configure_scan(conn: asyncpg.Connection, limit: int, filtered: bool) -> None:
+    """HNSW-Parameter fuer die laufende Transaktion setzen (set_config(..., true) = SET LOCAL)."""
+    if settings.rag_ef_search > 0 or limit > _HNSW_DEFAULT_EF_SEARCH:
+        # ef_search < limit wuerde die Trefferzahl begrenzen
+        await conn.execute(
+            "SELECT set_config('hnsw.ef_search', $1, true)", str(max(settings.rag_ef_search, limit)),
+        )
+    if filtered and settings.rag_iterative_scan in ("relaxed_order", "strict_order"):
+        await conn.execute("SELECT set_config('hnsw.iterative_scan', $1, true)", settings.rag_iterative_scan)
+
 
 class RAGService:
     """Asynchroner pgvector-Client fuer RAG-Operationen."""
@@ -17,6 +175,11 @@ class RAGService:
     def __init__(self):
         self.pool: asyncpg.Pool | None = None
 
+    @staticmethod
+    async def _init_connection(conn: asyncpg.Connection):
+        """Binaeren Codec fuer den vector-Typ registrieren (NumPy-Arrays statt Text)."""
+        await register_vector(conn)
+
     async def init_pool(self):
         """Connection-Pool initialisieren."""
         try:
@@ -25,6 +188,7 @@ class RAGService:
                 min_size=2,
                 max_size=10,
                 command_timeout=30,
+                init=self._init_connection,
             )
             logger.info("pgvector Connection-Pool initialisiert (min=2, max=10)")
         except Exception as e:
@@ -49,8 +213,21 @@ class RAGService:
         self,
         query_embedding: list[float],
         limit: int = 5,
+        *,
+        source_types: list[str] | None = None,
+        tenant_id: str | None = None,
+        host: str | None = None,
+        severity: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
     ) -> list[dict]:
-        """Aehnliche Embeddings via Cosine-Distance suchen."""
+        """Aehnliche Embeddings via Cosine-Distance suchen, optional nach Metadaten gefiltert.
+
+        Die Filter werden in SQL angewendet. Damit der HNSW-Index bei selektiven
+        Filtern nicht weniger als `limit` Treffer liefert, wird der Iterative Scan
+        (RAG_ITERATIVE_SCAN) fuer die Transaktion aktiviert; bei relaxed_order
+        sortiert die aeussere Abfrage die Kandidaten erneut nach Distanz.
+        """
         if not self.pool:
             return []
 
@@ -61,17 +238,29 @@ class RAGService:
                 len(query_embedding), settings.expected_embedding_dimensions,
             )
 
-        try:
-            embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-            query = """
+        args: list = [_as_vector(query_embedding), limit]
+        conditions = _filter_clause(
+            args, source_types, tenant_id, host, severity, created_after, created_before,
+        )
+        where = f"WHERE {conditions}" if conditions else ""
+        query = f"""
+            WITH candidates AS MATERIALIZED (
                 SELECT id, content, metadata, source_type, source_id,
-                       1 - (embedding <=> $1::vector) AS similarity
+                       embedding <=> $1 AS distance
                 FROM embeddings
-                ORDER BY embedding <=> $1::vector
+                {where}
+                ORDER BY distance
                 LIMIT $2
-            """
-            async with self.pool.acquire() as conn:
-                rows = await conn.fetch(query, embedding_str, limit)
+            )
+            SELECT id, content, metadata, source_type, source_id, 1 - distance AS similarity
+            FROM candidates
+            ORDER BY distance
+        """
+
+        try:
+            async with self.pool.acquire() as conn, conn.transaction():
+                await _configure_scan(conn, limit, bool(where))
+                rows = await conn.fetch(query, *args)
                 return [
                     {
                         "id": row["id"],
@@ -87,6 +276,68 @@ class RAGService:
             logger.error("RAG-Suche fehlgeschlagen: %s", e, exc_info=True)
             return []
 
+    async def search_hybrid(
+        self,
+        query_text: str,
+        query_embedding: list[float] | None,
+        limit: int = 5,
+        *,
+        source_types: list[str] | None = None,
+        tenant_id: str | None = None,
+        host: str | None = None,
+        severity: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+    ) -> list[dict]:
+        """Volltext- (tsvector/GIN) und Vektor-Suche per Reciprocal Rank Fusion kombinieren.
+
+        Beide Trefferlisten (je RAG_HYBRID_CANDIDATES) werden mit denselben
+        Filtern wie bei search_similar bestimmt; score ist die Summe von
+        1 / (RAG_RRF_K + Rang). Ohne `query_embedding` wird nur die
+        Volltextsuche verwendet (similarity = 0).
+        """
+        if not self.pool:
+            return []
+
+        candidates = max(limit, settings.rag_hybrid_candidates)
+        args: list = [limit, query_text, candidates, settings.rag_rrf_k]
+        vector_param = None
+        if query_embedding:
+            args.append(_as_vector(query_embedding))
+            vector_param = f"${len(args)}"
+        conditions = _filter_clause(
+            args, source_types, tenant_id, host, severity, created_after, created_before,
+        )
+        similarity = f"1 - (e.embedding <=> {vector_param})" if vector_param else "0.0"
+        query = _hybrid_ctes(conditions, vector_param) + f"""
+            SELECT e.id, e.content, e.metadata, e.source_type, e.source_id,
+                   {similarity} AS similarity, f.score, f.lexical
+            FROM fused f JOIN embeddings e ON e.id = f.id
+            ORDER BY f.score DESC
+            LIMIT $1
+        """
+
+        try:
+            async with self.pool.acquire() as conn, conn.transaction():
+                await _configure_scan(conn, candidates, bool(conditions))
+                rows = await conn.fetch(query, *args)
+                return [
+                    {
+                        "id": row["id"],
+                        "content": row["content"],
+                        "metadata": row["metadata"],
+                        "source_type": row["source_type"],
+                        "source_id": row["source_id"],
+                        "similarity": float(row["similarity"]),
+                        "score": float(row["score"]),
+                        "lexical": row["lexical"],
+                    }
+                    for row in rows
+                ]
+        except Exception as e:
+            logger.error("Hybride RAG-Suche fehlgeschlagen: %s", e, exc_info=True)
+            return []
+
     async def store_embedding(
         self,
         content: str,
@@ -102,13 +353,12 @@ class RAGService:
         content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
 
         try:
-            embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
             async with self.pool.acquire() as conn:
                 row_id = await conn.fetchval(
                     """
                     INSERT INTO embeddings
                         (content, content_hash, embedding, source_type, source_id, metadata)
-                    VALUES ($1, $2, $3::vector, $4, $5, $6::jsonb)
+                    VALUES ($1, $2, $3, $4, $5, $6::jsonb)
                     ON CONFLICT (content_hash, source_type)
                         WHERE content_hash IS NOT NULL
                     DO NOTHING
@@ -116,7 +366,7 @@ class RAGService:
                     """,
                     content,
                     content_hash,
-                    embedding_str,
+                    _as_vector(embedding),
                     source_type,
                     source_id,
                     json.dumps(metadata or {}),
@@ -128,6 +378,57 @@ class RAGService:
             logger.error("Embedding-Speicherung fehlgeschlagen: %s", e, exc_info=True)
             return None
 
+    async def store_embeddings(self, items: list[dict]) -> list[int | None] | None:
+        """Mehrere Embeddings per COPY + Merge speichern (Content-Hash-Deduplizierung).
+
+        `items` enthaelt je Eintrag content, embedding und optional source_type,
+        source_id, metadata. Rueckgabe positionsgleich zu `items`: neue ID oder
+        None (Duplikat, auch innerhalb des Batches); None bei Datenbankfehler.
+        """
+        if not self.pool:
+            return None
+        if not items:
+            return []
+
+        records = []
+        positions: list[int | None] = []
+        seen: set[tuple[str, str]] = set()
+        for item in items:
+            source_type = item.get("source_type") or "manual"
+            content_hash = hashlib.sha256(item["content"].encode("utf-8")).hexdigest()
+            if (content_hash, source_type) in seen:
+                positions.append(None)
+                continue
+            seen.add((content_hash, source_type))
+            positions.append(len(records))
+            records.append((
+                len(records),
+                item["content"],
+                content_hash,
+                _as_vector(item["embedding"]),
+                source_type,
+                item.get("source_id"),
+                json.dumps(item.get("metadata") or {}),
+            ))
+
+        try:
+            async with self.pool.acquire() as conn, conn.transaction():
+                await conn.execute(_STAGING_DDL)
+                await conn.copy_records_to_table(
+                    "embeddings_staging", records=records, columns=_STAGING_COLUMNS,
+                )
+                rows = await conn.fetch(_MERGE_SQL)
+        except Exception as e:
+            logger.error("Bulk-Speicherung von %d Embeddings fehlgeschlagen: %s", len(records), e, exc_info=True)
+            return None
+
+        ids = {row["ord"]: row["id"] for row in rows}
+        result = [None if pos is None else ids.get(pos) for pos in positions]
+        duplicates = result.count(None)
+        if duplicates:
+            logger.info("Bulk-Speicherung: %d/%d Duplikate uebersprungen", duplicates, len(items))
+        return result
+
     async def delete_embedding(self, embedding_id: int) -> bool:
         """Embedding aus pgvector loeschen."""
         if not self.pool:
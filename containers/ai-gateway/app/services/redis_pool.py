@@ -0,0 +1,48 @@
+"""MCP v7 — Fairer async Redis Connection-Pool fuer den AI Gateway."""
+
+import asyncio
+
+import redis.asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+
+class FairConnectionPool(aioredis.ConnectionPool):
+    """Connection-Pool, der bei Auslastung FIFO-fair auf freie Verbindungen wartet.
+
+    redis.asyncio.ConnectionPool wirft sofort "Too many connections", und
+    BlockingConnectionPool laesst neue Anfragen an Wartenden vorbeiziehen —
+    unter Last warten einzelne Requests dann Sekunden bis zum Timeout.
+    Ein vorgeschalteter asyncio.Semaphore vergibt die Verbindungen in
+    Ankunftsreihenfolge.
+    """
+
+    def __init__(self, *args, timeout: float = 5.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        # BoundedSemaphore: eine doppelte Freigabe wirft statt den Pool zu vergroessern
+        self._slots = asyncio.BoundedSemaphore(self.max_connections)
+        self._wait_timeout = timeout
+
+    async def get_connection(self, command_name, *keys, **options):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self._wait_timeout)
+        except asyncio.TimeoutError:
+            raise RedisConnectionError("Keine freie Redis-Verbindung im Pool") from None
+        # Wie die Basisklasse, aber ohne deren release() im Fehlerfall — der Slot
+        # wuerde sonst dort und hier ein zweites Mal freigegeben
+        try:
+            connection = self.get_available_connection()
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            await self.ensure_connection(connection)
+        except BaseException:
+            await self.release(connection)
+            raise
+        return connection
+
+    async def release(self, connection):
+        try:
+            await super().release(connection)
+        finally:
+            self._slots.release()
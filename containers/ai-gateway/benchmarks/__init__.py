@@ -0,0 +1 @@
+# MCP v7 — AI Gateway Benchmarks
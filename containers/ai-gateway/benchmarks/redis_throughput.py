@@ -0,0 +1,194 @@
+"""MCP v7 — Benchmark: POST /api/v1/analyze mit sync vs. async Redis.
+
+Vergleicht den frueheren Handler (synchroner redis-Client, 5 Round-Trips im
+async-Endpoint) mit dem aktuellen Gateway-Handler (redis.asyncio-Pool, ein
+Lua-Script) unter nebenlaeufiger Last. Beide Varianten laufen in derselben
+Event-Loop ueber httpx.ASGITransport — genau wie ein uvicorn-Worker.
+
+Ueber Loopback ist die Round-Trip-Zeit nahezu null; --rtt-ms schaltet einen
+TCP-Proxy (eigener Thread) mit kuenstlicher Latenz dazwischen, um das
+Docker-Netz zwischen mcp-ai-gateway und mcp-redis-queue nachzubilden.
+
+Aussagekraeftig ist vor allem req/s: Die Latenz der sync-Variante wirkt zu
+gut, weil der blockierte Event-Loop auch die Zeitmessung der wartenden Clients
+verzoegert — deren Wartezeit taucht in p50/p99 nicht auf.
+
+Nur gegen eine lokale Test-Instanz ausfuehren — die gewaehlte Datenbank
+(Default: 15) wird vor und nach jedem Lauf geleert:
+
+    docker run --rm -d -p 6379:6379 redis:7-alpine
+    cd containers/ai-gateway
+    python -m benchmarks.redis_throughput --requests 2000 --concurrency 50 --rtt-ms 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+import redis
+from fastapi import FastAPI
+
+# Auth fuer den Benchmark deaktivieren (Settings werden beim Import gelesen)
+os.environ["AI_GATEWAY_SECRET"] = ""
+
+from app import main  # noqa: E402
+from app.models.schemas import AnalyzeRequest  # noqa: E402
+from app.services.redis_pool import FairConnectionPool  # noqa: E402
+
+
+def start_latency_proxy(target_host: str, target_port: int, rtt_ms: float) -> int:
+    """TCP-Proxy mit kuenstlicher Round-Trip-Zeit in eigenem Thread starten, Port zurueckgeben."""
+    delay = rtt_ms / 2000
+    ready = threading.Event()
+    port_holder: list[int] = []
+
+    async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while data := await reader.read(65536):
+                await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(target_host, target_port)
+        await asyncio.gather(
+            pipe(client_reader, upstream_writer),
+            pipe(upstream_reader, client_writer),
+        )
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port_holder.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait()
+    return port_holder[0]
+
+
+def build_legacy_app(pool: redis.ConnectionPool) -> FastAPI:
+    """Frueheren analyze()-Handler mit synchronem Redis-Client nachbilden."""
+    legacy = FastAPI()
+
+    @legacy.post("/api/v1/analyze")
+    async def analyze(request: AnalyzeRequest):
+        r = redis.Redis(connection_pool=pool)
+        dedup_key = f"mcp:dedup:{request.source}:{request.host}:{request.description[:50]}"
+        if r.exists(dedup_key):
+            return {"status": "deduplicated", "job_id": ""}
+        r.setex(dedup_key, 900, "1")
+        job_id = f"job_{uuid.uuid4().hex[:12]}_{request.source}"
+        r.hset(f"mcp:job:{job_id}", mapping={
+            "id": job_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "status": "pending",
+            "source": request.source,
+            "severity": request.severity,
+            "host": request.host,
+            "description": request.description,
+            "metrics": json.dumps(request.metrics),
+            "logs": request.logs,
+            "crowdsec_alerts": request.crowdsec_alerts,
+        })
+        r.lpush("mcp:queue:analyze", job_id)
+        r.expire(f"mcp:job:{job_id}", 86400)
+        return {"status": "queued", "job_id": job_id}
+
+    return legacy
+
+
+async def run_load(app: FastAPI, requests: int, concurrency: int) -> dict:
+    """`requests` Alerts mit `concurrency` parallelen Clients senden."""
+    latencies: list[float] = []
+    counter = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def client_loop():
+            for i in counter:
+                payload = {
+                    "source": "bench",
+                    "severity": "warning",
+                    "host": f"host-{i % 50}",
+                    "description": f"Benchmark-Alert {i} {uuid.uuid4().hex}",
+                    "logs": "x" * 512,
+                }
+                start = time.perf_counter()
+                resp = await client.post("/api/v1/analyze", json=payload)
+                latencies.append(time.perf_counter() - start)
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def bench(args: argparse.Namespace) -> None:
+    host, port = args.host, args.port
+    if args.rtt_ms > 0:
+        host, port = "127.0.0.1", start_latency_proxy(args.host, args.port, args.rtt_ms)
+
+    pool_kwargs = {
+        "host": host,
+        "port": port,
+        "password": args.password or None,
+        "db": args.db,
+        "decode_responses": True,
+        "max_connections": args.pool_size,
+    }
+    sync_pool = redis.BlockingConnectionPool(**pool_kwargs)
+    main._redis_pool = FairConnectionPool(**pool_kwargs)
+    admin = redis.Redis(connection_pool=sync_pool)
+
+    results = {}
+    for name, app in (("sync (vorher)", build_legacy_app(sync_pool)), ("async (nachher)", main.app)):
+        admin.flushdb()
+        results[name] = await run_load(app, args.requests, args.concurrency)
+    admin.flushdb()
+
+    print(
+        f"\n{args.requests} Anfragen, {args.concurrency} parallel, "
+        f"Redis {args.host}:{args.port}/{args.db}, RTT +{args.rtt_ms} ms\n"
+    )
+    print(f"{'Variante':<18}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, res in results.items():
+        print(f"{name:<18}{res['rps']:>10.0f}{res['p50_ms']:>10.2f}{res['p99_ms']:>10.2f}")
+
+    await main._redis_pool.disconnect()
+    sync_pool.disconnect()
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("REDIS_QUEUE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("REDIS_QUEUE_PORT", "6379")))
+    parser.add_argument("--password", default=os.getenv("REDIS_QUEUE_PASSWORD", ""))
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=int(os.getenv("REDIS_POOL_MAX", "20")))
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Kuenstliche Netzwerk-Latenz pro Round-Trip")
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,6 +1,7 @@
 """MCP v7 — LangChain Worker Konfiguration (aus Environment-Variablen)."""
 
 import os
+import socket
 
 
 class Settings:
@@ -35,6 +36,15 @@ class Settings:
     ntfy_url: str = os.getenv("NTFY_URL", "http://ntfy:80")
     ntfy_max_message_length: int = int(os.getenv("NTFY_MAX_MSG_LEN", "4000"))
 
+    # Zuverlaessige Queue: Lease-Dauer, Reaper-Intervall, maximale Versuche
+    worker_id: str = os.getenv("WORKER_ID", socket.gethostname())
+    queue_visibility_timeout: int = int(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "300"))
+    queue_reaper_interval: int = int(os.getenv("QUEUE_REAPER_INTERVAL", "30"))
+    queue_max_attempts: int = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+    # Prioritaets-Queues: Gewichte fuer die faire Entnahme je Severity
+    queue_priority_weights: str = os.getenv("QUEUE_PRIORITY_WEIGHTS", "critical:8,high:4,warning:2,info:1")
+    queue_poll_interval: float = float(os.getenv("QUEUE_POLL_INTERVAL", "0.5"))
+
     # Redis-Retry-Konfiguration
     redis_max_connect_retries: int = int(os.getenv("REDIS_MAX_RETRIES", "30"))
     redis_reconnect_delay: int = int(os.getenv("REDIS_RECONNECT_DELAY", "2"))
@@ -42,9 +52,93 @@ class Settings:
     # Redis Queue Passwort
     redis_queue_password: str = os.getenv("REDIS_QUEUE_PASSWORD", "")
 
+    # Nebenlaeufigkeit: Jobs gleichzeitig in Bearbeitung pro Worker-Prozess
+    worker_concurrency: int = int(os.getenv("WORKER_CONCURRENCY", "4"))
+    # Backpressure: maximale parallele Anfragen an LLM bzw. Embedding-Modell
+    # (sollte OLLAMA_NUM_PARALLEL bzw. der LiteLLM-Kapazitaet entsprechen)
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+    embed_max_concurrency: int = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+    # Batch-Embedding: Texte pro /api/embed-Request (Ingest-Jobs)
+    embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    # Ingest-Jobs: Batches je Job gleichzeitig in Arbeit (kleiner als EMBED_MAX_CONCURRENCY
+    # halten, sonst warten Analyse-Jobs hinter ganzen Dokumenten)
+    ingest_max_batches: int = int(os.getenv("INGEST_MAX_BATCHES", "1"))
+
+    # Streaming: LLM-Antwort tokenweise lesen und Zwischenstand im Job-Hash
+    # (partial_response, ttft_ms) hoechstens alle LLM_STREAM_PROGRESS_INTERVAL Sekunden aktualisieren
+    llm_stream: bool = os.getenv("LLM_STREAM", "true").lower() == "true"
+    llm_stream_progress_interval: float = float(os.getenv("LLM_STREAM_PROGRESS_INTERVAL", "0.5"))
+    # Generierung abbrechen, sobald das JSON-Objekt mit allen erwarteten Schluesseln vollstaendig ist
+    llm_stop_on_json: bool = os.getenv("LLM_STOP_ON_JSON", "true").lower() == "true"
+    # Strukturierte Ausgabe: JSON-Schema aus dem FORMAT-Block des Prompts an das
+    # Modell uebergeben (Ollama "format" / OpenAI "response_format")
+    llm_structured_output: bool = os.getenv("LLM_STRUCTURED_OUTPUT", "false").lower() == "true"
+
+    # Prometheus-Metriken (0 = aus)
+    worker_metrics_port: int = int(os.getenv("WORKER_METRICS_PORT", "9101"))
+
+    # Embedding-Cache: LRU-Eintraege im Prozess (0 = aus), TTL, optional geteilt ueber Redis
+    embed_cache_size: int = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+    embed_cache_ttl: int = int(os.getenv("EMBED_CACHE_TTL", "3600"))
+    embed_cache_redis: bool = os.getenv("EMBED_CACHE_REDIS", "false").lower() == "true"
+
+    # Ergebnis-Cache: Analyse fuer gleichen Alert-Fingerprint RESULT_CACHE_TTL Sekunden
+    # wiederverwenden (0 = aus); optional auch ab einer Cosine-Aehnlichkeit der Beschreibung
+    # (RESULT_CACHE_SIMILARITY, 0 = aus) gegen die letzten Analysen desselben source/host/severity
+    result_cache_ttl: int = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+    result_cache_similarity: float = float(os.getenv("RESULT_CACHE_SIMILARITY", "0"))
+    result_cache_similar_candidates: int = int(os.getenv("RESULT_CACHE_SIMILAR_CANDIDATES", "50"))
+
+    # Vorab-Triage vor der vollen Analyse (TRIAGE_ENABLED, standardmaessig aus — eingeschaltet
+    # erhalten info-Alerts statt der LLM-Analyse eine Zusammenfassung und kein Ticket, auch wenn
+    # das LLM den Impact hoch bewertet haette). Severities, die immer voll analysiert werden bzw.
+    # nur eine Zusammenfassung erhalten (kommagetrennt), Quellen fuer die Zusammenfassung,
+    # Uebernahme der Analyse des naechsten RAG-Nachbarn ab dieser Aehnlichkeit (0 = aus),
+    # kleines Modell fuer die Zusammenfassung (leer = regelbasiert)
+    triage_enabled: bool = os.getenv("TRIAGE_ENABLED", "false").lower() == "true"
+    triage_full_severities: str = os.getenv("TRIAGE_FULL_SEVERITIES", "critical,high")
+    triage_summary_severities: str = os.getenv("TRIAGE_SUMMARY_SEVERITIES", "info")
+    triage_summary_sources: str = os.getenv("TRIAGE_SUMMARY_SOURCES", "")
+    triage_reuse_similarity: float = float(os.getenv("TRIAGE_REUSE_SIMILARITY", "0"))
+    triage_model: str = os.getenv("TRIAGE_MODEL", "")
+    # Angenommene Dauer einer vollen Analyse, bis eigene Messwerte vorliegen (Metrik der Einsparung)
+    triage_assumed_analysis_seconds: float = float(os.getenv("TRIAGE_ASSUMED_ANALYSIS_SECONDS", "20"))
+
     # RAG-Konfiguration
     rag_top_k: int = int(os.getenv("RAG_TOP_K", "5"))
     rag_similarity_threshold: float = float(os.getenv("RAG_SIMILARITY_THRESHOLD", "0.7"))
+    # Filter fuer den RAG-Kontext: Quelltypen (kommagetrennt, leer = alle), Mandant,
+    # maximales Alter in Tagen (0 = unbegrenzt)
+    rag_source_types: str = os.getenv("RAG_SOURCE_TYPES", "")
+    rag_tenant_id: str = os.getenv("RAG_TENANT_ID", "")
+    rag_max_age_days: int = int(os.getenv("RAG_MAX_AGE_DAYS", "0"))
+    # HNSW-Iterative-Scan bei gefilterter Suche (pgvector >= 0.8): relaxed_order, strict_order oder off
+    rag_iterative_scan: str = os.getenv("RAG_ITERATIVE_SCAN", "relaxed_order")
+    # hnsw.ef_search je Abfrage (0 = Server-Standard 40; mindestens top_k)
+    rag_ef_search: int = int(os.getenv("RAG_EF_SEARCH", "0"))
+    # Suchmodus fuer den RAG-Kontext: vector, hybrid (Volltext + Vektor per RRF) oder
+    # lexical (nur Volltext, spart das Embedding der Beschreibung)
+    rag_search_mode: str = os.getenv("RAG_SEARCH_MODE", "vector")
+    rag_hybrid_candidates: int = int(os.getenv("RAG_HYBRID_CANDIDATES", "40"))
+    rag_rrf_k: int = int(os.getenv("RAG_RRF_K", "60"))
+    # Volltext-Treffer umgehen die Aehnlichkeitsschwelle nur ab diesem ts_rank_cd
+    # (ein einzelnes Vorkommen eines Suchbegriffs ergibt etwa 0.1)
+    rag_lexical_min_rank: float = float(os.getenv("RAG_LEXICAL_MIN_RANK", "0.2"))
+
+    # Prompt-Budget: geschaetzte Tokens fuer den gesamten Prompt (0 = unbegrenzt);
+    # an das Kontextfenster des Modells abzueglich der Antwortlaenge anpassen
+    prompt_token_budget: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "3072"))
+    prompt_chars_per_token: float = float(os.getenv("PROMPT_CHARS_PER_TOKEN", "3.5"))
+
+    # Prompt-Layout: classic (ein Prompt, Alert-Daten oben) oder prefix (statischer
+    # System-Prompt, Alert-Daten zuletzt — Ollama kann den Prefix im KV-Cache wiederverwenden)
+    prompt_layout: str = os.getenv("PROMPT_LAYOUT", "prefix")
+    # Ollama: Modell nach dem letzten Aufruf so lange geladen halten; Warm-up beim Start
+    ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # Jobs erst annehmen, wenn beide Modelle geladen sind (hoechstens LLM_WARMUP_TIMEOUT Sekunden warten)
+    llm_warmup: bool = os.getenv("LLM_WARMUP", "true").lower() == "true"
+    llm_warmup_timeout: float = float(os.getenv("LLM_WARMUP_TIMEOUT", "600"))
+    llm_warmup_retry_interval: int = int(os.getenv("LLM_WARMUP_RETRY_INTERVAL", "10"))
 
     # Pfade
     prompt_file: str = os.getenv("PROMPT_FILE", "/app/config/prompts/alert-analysis.txt")
@@ -52,9 +146,8 @@ class Settings:
     @property
     def pgvector_dsn(self) -> str:
         return (
-            f"host={self.pgvector_host} port={self.pgvector_port} "
-            f"user={self.pgvector_user} password={self.pgvector_password} "
-            f"dbname={self.pgvector_db}"
+            f"postgresql://{self.pgvector_user}:{self.pgvector_password}"
+            f"@{self.pgvector_host}:{self.pgvector_port}/{self.pgvector_db}"
         )
 
 
@@ -0,0 +1,133 @@
+"""MCP v7 — Asynchrone Ingest-Jobs: vom Gateway gechunkte Dokumente einbetten und speichern.
+
+Der Gateway legt bei POST /api/v1/ingest?background=true einen Job mit
+type=ingest in der info-Queue an; die Chunks liegen unter mcp:ingest:<job_id>.
+Fortschritt (chunks_done, chunks_per_second, ...) wird nach jedem Batch in
+den Job-Hash geschrieben und ist ueber GET /api/v1/jobs/{job_id} sichtbar.
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.services.job_queue import job_queue
+from app.services.llm_client import llm_client
+from app.services.pgvector_service import pgvector_service
+
+logger = logging.getLogger("mcp-langchain-worker")
+
+INGEST_PAYLOAD_PREFIX = "mcp:ingest:"
+# Hoechstens so viele Einzelfehler im Ergebnis auffuehren
+MAX_REPORTED_FAILURES = 100
+
+
+async def process_ingest_job(r: aioredis.Redis, job_id: str, job_data: dict) -> None:
+    """Chunks eines Ingest-Jobs batchweise einbetten und per Bulk-Insert speichern."""
+    start_time = time.monotonic()
+    payload_key = f"{INGEST_PAYLOAD_PREFIX}{job_id}"
+    await job_queue.set_status(r, job_id, "processing")
+
+    payload = await r.get(payload_key)
+    if payload is None:
+        logger.warning("Ingest-Job %s: Chunks nicht mehr vorhanden", job_id)
+        await job_queue.set_status(r, job_id, "failed", {
+            "error": "Ingest-Daten nicht mehr vorhanden (abgelaufen?)",
+            "completed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        })
+        return
+
+    chunks: list[str] = json.loads(payload)
+    metadata = json.loads(job_data.get("metadata") or "{}")
+    source_type = job_data.get("source") or "document"
+    source_id = job_data.get("source_id") or "doc"
+    batch_size = max(1, settings.embed_batch_size)
+
+    progress = {"chunks_done": 0, "chunks_created": 0, "duplicates": 0, "chunks_failed": 0}
+    failures: list[dict] = []
+
+    def fail(indexes, error: str) -> None:
+        progress["chunks_failed"] += len(indexes)
+        failures.extend({"index": i, "error": error} for i in indexes[:MAX_REPORTED_FAILURES - len(failures)])
+
+    async def store_batch(indexes: list[int], batch: list[str]) -> None:
+        embeddings = await llm_client.embed_batch(batch)
+
+        items = []
+        for i, chunk, embedding in zip(indexes, batch, embeddings):
+            if not embedding:
+                fail([i], "Kein Embedding erhalten")
+                continue
+            items.append({
+                "content": chunk,
+                "embedding": embedding,
+                "source_type": source_type,
+                "source_id": f"{source_id}_{i}",
+                "metadata": {**metadata, "chunk_index": i, "total_chunks": len(chunks)},
+            })
+
+        if items:
+            ids = await pgvector_service.store_embeddings(items)
+            if ids is None:
+                fail([item["metadata"]["chunk_index"] for item in items], "Speicherung fehlgeschlagen")
+            else:
+                created = sum(1 for row_id in ids if row_id)
+                progress["chunks_created"] += created
+                progress["duplicates"] += len(ids) - created
+
+    async def run_batch(offset: int) -> None:
+        batch = chunks[offset:offset + batch_size]
+        indexes = list(range(offset, offset + len(batch)))
+        try:
+            await store_batch(indexes, batch)
+        except Exception as e:
+            logger.warning("Ingest-Job %s: Batch ab Chunk %d fehlgeschlagen: %s", job_id, offset, e)
+            fail(indexes, str(e)[:200])
+
+        progress["chunks_done"] += len(batch)
+        elapsed = max(time.monotonic() - start_time, 1e-6)
+        try:
+            await r.hset(f"mcp:job:{job_id}", mapping={
+                **{key: str(value) for key, value in progress.items()},
+                "chunks_per_second": f"{progress['chunks_done'] / elapsed:.2f}",
+            })
+        except Exception as e:
+            logger.warning("Ingest-Job %s: Fortschritt nicht gespeichert: %s", job_id, e)
+
+    # Eigenes Fenster statt eines Tasks je Batch: hoechstens INGEST_MAX_BATCHES Batches
+    # gleichzeitig, damit Embedding-Slots und DB-Pool fuer Analyse-Jobs frei bleiben
+    offsets = iter(range(0, len(chunks), batch_size))
+
+    async def drain() -> None:
+        for offset in offsets:
+            await run_batch(offset)
+
+    await asyncio.gather(*(drain() for _ in range(max(1, settings.ingest_max_batches))))
+
+    elapsed_ms = int((time.monotonic() - start_time) * 1000)
+    # Gleiche Regel wie POST /api/v1/ingest: Duplikate sind kein Fehler, "partial" steht nur
+    # im Ergebnis (die Job-Status kennen kein partial)
+    if not progress["chunks_failed"]:
+        outcome = "ok"
+    elif progress["chunks_failed"] == len(chunks):
+        outcome = "failed"
+    else:
+        outcome = "partial"
+    await job_queue.set_status(r, job_id, "failed" if outcome == "failed" else "completed", {
+        "result": json.dumps(
+            {"status": outcome, **progress, "failed_chunks": failures}, ensure_ascii=False,
+        ),
+        "processing_time_ms": str(elapsed_ms),
+        "completed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    })
+    await r.delete(payload_key)
+    await r.expire(f"mcp:job:{job_id}", 604800)
+
+    logger.info(
+        "Ingest-Job %s: %d/%d Chunks gespeichert, %d Duplikate, %d Fehler (%dms)",
+        job_id, progress["chunks_created"], len(chunks),
+        progress["duplicates"], progress["chunks_failed"], elapsed_ms,
+    )
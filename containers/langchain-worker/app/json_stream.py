@@ -0,0 +1,130 @@
+"""MCP v7 — JSON aus LLM-Text: inkrementelle Erkennung im Stream und billige Reparatur."""
+
+import json
+import re
+from collections.abc import Iterable
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class JsonObjectDetector:
+    """Erkennt das erste vollstaendige JSON-Objekt der obersten Ebene im Token-Stream.
+
+    Jedes Zeichen wird genau einmal betrachtet (Zustand: Klammertiefe,
+    String, Escape) — feed() kostet pro Fragment O(len(fragment)). Ein
+    balanciertes Objekt gilt erst als Ergebnis, wenn es sich parsen laesst
+    und alle erwarteten Schluessel enthaelt; sonst wird weitergesucht
+    (z.B. bei geschweiften Klammern im Fliesstext vor dem JSON). Bleibt eine
+    Klammer im Fliesstext offen, wird kein Objekt erkannt — die Generierung
+    laeuft dann wie ohne Detektor bis zum Ende.
+    """
+
+    def __init__(self, required_keys: Iterable[str] = ()):
+        self._required = frozenset(required_keys)
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = 0
+        self._in_string = False
+        self._escape = False
+        self.result: dict | None = None
+        # Ende des Objekts im bisherigen Text (Index nach der schliessenden Klammer)
+        self.end: int | None = None
+
+    def feed(self, fragment: str) -> dict | None:
+        """Fragment anhaengen; liefert das Objekt, sobald es vollstaendig ist."""
+        if self.result is not None:
+            return self.result
+        self._text += fragment
+        text = self._text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif self._depth == 0:
+                # Fliesstext ausserhalb des Objekts (auch Anfuehrungszeichen) ignorieren
+                continue
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    obj = self._validate(text[self._start:i + 1])
+                    if obj is not None:
+                        self.result = obj
+                        self.end = i + 1
+                        self._pos = i + 1
+                        return obj
+
+        self._pos = len(text)
+        return None
+
+    def _validate(self, candidate: str) -> dict | None:
+        try:
+            obj = json.loads(candidate)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(obj, dict) or not self._required.issubset(obj):
+            return None
+        return obj
+
+
+def repair_json(text: str) -> dict | None:
+    """Einmaliger Reparaturversuch fuer fast gueltiges JSON (ohne weiteren LLM-Aufruf).
+
+    Behandelt: Text vor/nach dem Objekt, Kommas vor schliessenden Klammern und abgeschnittene Ausgaben (offener
+    String, offene Klammern bei Erreichen von max_tokens).
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = text[start:]
+
+    stack: list[str] = []
+    in_string = escape = False
+    end = len(text)
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                end = i + 1
+                break
+
+    candidate = text[:end]
+    if stack:
+        # Abgeschnittene Ausgabe schliessen
+        if in_string:
+            candidate += '"'
+        candidate = candidate.rstrip().rstrip(",")
+        if candidate.endswith(":"):
+            candidate += " null"
+        candidate += "".join(reversed(stack))
+    candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+
+    try:
+        obj = json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
+    return obj if isinstance(obj, dict) else None
@@ -0,0 +1,55 @@
+"""MCP v7 — Prometheus-Metriken des Workers (HTTP-Endpoint auf WORKER_METRICS_PORT)."""
+
+import logging
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from app.config import settings
+
+logger = logging.getLogger("mcp-langchain-worker")
+
+# outcome: ok (direkt gueltig), repaired (nach Reparatur gueltig), failed (Fallback-Ergebnis)
+# mode: schema (LLM_STRUCTURED_OUTPUT) oder prompt (nur FORMAT-Block im Prompt)
+LLM_RESPONSES = Counter(
+    "mcp_worker_llm_responses_total",
+    "LLM-Antworten nach JSON-Parse-Ergebnis",
+    ["model", "mode", "outcome"],
+)
+
+# result: hit_memory, hit_redis, miss
+EMBEDDING_CACHE = Counter(
+    "mcp_worker_embedding_cache_total", "Embedding-Cache-Zugriffe nach Ergebnis", ["result"],
+)
+
+# result: hit_exact (Fingerprint), hit_similar (Embedding-Aehnlichkeit), miss
+RESULT_CACHE = Counter(
+    "mcp_worker_result_cache_total", "Ergebnis-Cache-Zugriffe fuer Alert-Analysen", ["result"],
+)
+
+# Vorab-Triage: decision full, reuse, summary; stage rules, neighbour, model
+TRIAGE = Counter(
+    "mcp_worker_triage_total", "Entscheidungen der Vorab-Triage", ["decision", "stage"],
+)
+# Geschaetzt: mittlere Dauer einer vollen LLM-Analyse abzueglich der Triage-Kosten
+TRIAGE_SAVED_SECONDS = Counter(
+    "mcp_worker_triage_saved_seconds_total", "Durch die Vorab-Triage eingesparte LLM-Zeit", ["decision"],
+)
+
+# Geschaetzte Prompt-Tokens je Analyse (nach Budgetierung)
+PROMPT_TOKENS = Histogram(
+    "mcp_worker_prompt_tokens", "Geschaetzte Tokens des Analyse-Prompts",
+    buckets=[256, 512, 1024, 1536, 2048, 3072, 4096, 6144, 8192, 16384],
+)
+
+# Warm-up beim Start: Ladezeit je Modell; WORKER_READY = 1, sobald alle Modelle geladen sind
+# (Jobs nimmt der Worker nach LLM_WARMUP_TIMEOUT auch ohne an)
+MODEL_LOAD_SECONDS = Gauge("mcp_worker_model_load_seconds", "Ladezeit beim Warm-up je Modell", ["model"])
+WORKER_READY = Gauge("mcp_worker_ready", "1, sobald die Modelle geladen sind und der Worker Jobs holt")
+
+
+def start_metrics_server() -> None:
+    """Metrik-Endpoint starten (WORKER_METRICS_PORT=0 deaktiviert ihn)."""
+    if not settings.worker_metrics_port:
+        return
+    start_http_server(settings.worker_metrics_port)
+    logger.info("Prometheus-Metriken auf Port %d", settings.worker_metrics_port)
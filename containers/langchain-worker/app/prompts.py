@@ -1,7 +1,20 @@
-"""MCP v7 — Prompt-Management: laedt und befuellt den Alert-Analyse-Prompt."""
+"""MCP v7 — Prompt-Management: laedt und befuellt den Alert-Analyse-Prompt.
 
+Die variablen Abschnitte (Beschreibung, Metriken, Logs, IDS-Daten, RAG) teilen
+sich ein Token-Budget (PROMPT_TOKEN_BUDGET abzueglich des festen Template-Texts).
+Tokens werden ueber Zeichen pro Token geschaetzt — fuer die Budgetierung genuegt
+das, ein Tokenizer des Modells steht im Worker nicht zur Verfuegung.
+
+PROMPT_LAYOUT=prefix teilt das Template fuer das Prefix-Caching von Ollama:
+Abschnitte ohne Platzhalter (Rolle, Aufgabe, FORMAT) bilden einen fuer alle
+Alerts identischen System-Prompt, die Alert-Daten folgen danach im Prompt.
+"""
+
+import json
 import logging
+import math
 import os
+import string
 import time
 
 from app.config import settings
@@ -11,6 +24,8 @@ logger = logging.getLogger("mcp-langchain-worker")
 # Cache fuer geladenen Prompt (einmalig geladen, danach gecacht).
 # Aenderungen an der Prompt-Datei erfordern einen Container-Restart.
 _prompt_template: str | None = None
+_format_example: dict | None = None
+_prompt_split: tuple[str, str] | None = None
 
 # Fallback-Prompt falls Datei nicht verfuegbar
 FALLBACK_PROMPT = """Du bist ein IT-Operations-Analyst fuer die Managed Control Platform (MCP).
@@ -74,31 +89,227 @@ def load_prompt_template() -> str:
     return _prompt_template
 
 
+def _parse_format_block(template: str) -> dict | None:
+    """JSON-Beispiel hinter "FORMAT: JSON" aus einem Template lesen ({{ }} maskiert)."""
+    _, marker, tail = template.partition("FORMAT: JSON")
+    start, end = tail.find("{{"), tail.rfind("}}")
+    if not marker or start < 0 or end < start:
+        return None
+    try:
+        example = json.loads(tail[start:end + 2].replace("{{", "{").replace("}}", "}"))
+    except json.JSONDecodeError:
+        return None
+    return example if isinstance(example, dict) else None
+
+
+def format_example() -> dict:
+    """Erwartetes Antwort-Objekt laut FORMAT-Block des Prompts (Fallback: eingebauter Prompt)."""
+    global _format_example
+    if _format_example is None:
+        example = _parse_format_block(load_prompt_template())
+        if example is None:
+            logger.warning("FORMAT-Block im Prompt nicht lesbar — verwende Format des Fallback-Prompts")
+            example = _parse_format_block(FALLBACK_PROMPT)
+        _format_example = example
+    return _format_example
+
+
+def format_keys() -> tuple[str, ...]:
+    """Schluessel, die das JSON-Objekt der Analyse enthalten muss."""
+    return tuple(format_example())
+
+
+def _schema_for(example) -> dict:
+    """JSON-Schema fuer einen Wert des FORMAT-Beispiels ("A|B|C" → enum)."""
+    if isinstance(example, dict):
+        return {
+            "type": "object",
+            "properties": {key: _schema_for(value) for key, value in example.items()},
+            "required": list(example),
+            "additionalProperties": False,
+        }
+    if isinstance(example, list):
+        return {"type": "array", "items": _schema_for(example[0]) if example else {"type": "string"}}
+    if isinstance(example, bool):
+        return {"type": "boolean"}
+    if isinstance(example, (int, float)):
+        return {"type": "number"}
+    if isinstance(example, str) and "|" in example:
+        return {"type": "string", "enum": example.split("|")}
+    return {"type": "string"}
+
+
+def format_schema() -> dict:
+    """JSON-Schema der Analyse-Antwort, abgeleitet aus dem FORMAT-Block des Prompts."""
+    return _schema_for(format_example())
+
+
+def estimate_tokens(text: str) -> int:
+    """Token-Anzahl eines Textes schaetzen (PROMPT_CHARS_PER_TOKEN)."""
+    return math.ceil(len(text) / settings.prompt_chars_per_token)
+
+
+# Anteile der Abschnitte am Budget; ungenutzte Anteile kleiner Abschnitte gehen an die uebrigen
+_SECTION_WEIGHTS = {"description": 2, "metrics": 1, "logs": 4, "crowdsec_alerts": 2, "rag_results": 3}
+
+
+def _allocate(budget: int, demands: dict[str, int]) -> dict[str, int]:
+    """Token-Budget nach _SECTION_WEIGHTS verteilen, hoechstens den Bedarf je Abschnitt."""
+    allocation = dict.fromkeys(demands, 0)
+    open_sections = {name for name, demand in demands.items() if demand > 0}
+    remaining = budget
+    while open_sections and remaining > 0:
+        total_weight = sum(_SECTION_WEIGHTS[name] for name in open_sections)
+        granted = 0
+        for name in sorted(open_sections):
+            share = max(1, remaining * _SECTION_WEIGHTS[name] // total_weight)
+            grant = min(share, demands[name] - allocation[name], remaining - granted)
+            allocation[name] += grant
+            granted += grant
+            if allocation[name] >= demands[name]:
+                open_sections.discard(name)
+        remaining -= granted
+        if not granted:
+            break
+    return allocation
+
+
+def compact_lines(text: str, max_tokens: int | None = None) -> str:
+    """Wiederholte Zeilen zusammenfassen und bei Bedarf nur das Ende behalten.
+
+    Gleiche Zeilen (ohne fuehrenden/abschliessenden Leerraum) erscheinen einmal
+    an der Stelle ihres letzten Auftretens, mit Anzahl. Passt der Text nicht in
+    `max_tokens`, bleiben die juengsten Zeilen erhalten.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    counts: dict[str, int] = {}
+    for line in lines:
+        counts[line] = counts.get(line, 0) + 1
+    last_index = {line: i for i, line in enumerate(lines)}
+    unique = [
+        f"{line} [{counts[line]}x]" if counts[line] > 1 else line
+        for i, line in enumerate(lines) if last_index[line] == i
+    ]
+
+    if max_tokens is None:
+        return "\n".join(unique)
+    kept: list[str] = []
+    used = 0
+    for line in reversed(unique):
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    if len(kept) < len(unique):
+        kept.insert(0, f"[... {len(unique) - len(kept)} aeltere Zeilen ausgelassen]")
+    return "\n".join(kept)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Text auf `max_tokens` kuerzen (Anfang bleibt erhalten)."""
+    max_chars = int(max_tokens * settings.prompt_chars_per_token)
+    return text if len(text) <= max_chars else text[:max(0, max_chars - 3)] + "..."
+
+
+def _format_rag(rag_results: list[dict], max_tokens: int | None = None) -> str:
+    """RAG-Eintraege nach Aehnlichkeit (bzw. RRF-Score) absteigend, solange das Budget reicht."""
+    ranked = sorted(rag_results, key=lambda r: (r.get("similarity", 0), r.get("score", 0)), reverse=True)
+    entries: list[str] = []
+    used = 0
+    for r in ranked:
+        sim = r.get("similarity", 0)
+        content = r.get("content", "")[:300]
+        if r.get("lexical") and not sim:
+            entry = f"  - [Volltext-Treffer] {content}"
+        else:
+            entry = f"  - [Aehnlichkeit: {sim:.2f}] {content}"
+        cost = estimate_tokens(entry) + 1
+        if max_tokens is not None and used + cost > max_tokens:
+            break
+        entries.append(entry)
+        used += cost
+    return "\n".join(entries) if entries else "Keine aehnlichen Incidents gefunden."
+
+
+def _compact_metrics(metrics: str, max_tokens: int) -> str:
+    """Metriken-JSON ohne Leerraum; wenn noetig gekuerzt."""
+    try:
+        metrics = json.dumps(json.loads(metrics), ensure_ascii=False, separators=(",", ":"))
+    except (TypeError, json.JSONDecodeError):
+        pass
+    return _truncate(metrics, max_tokens)
+
+
+def _has_placeholders(text: str) -> bool:
+    return any(field is not None for _, field, _, _ in string.Formatter().parse(text))
+
+
+def split_prompt_template() -> tuple[str, str]:
+    """Template in statischen System-Prompt und Alert-Teil (mit Platzhaltern) zerlegen.
+
+    Bloecke (durch Leerzeilen getrennt) ohne Platzhalter gehen in den
+    System-Prompt, in ihrer Reihenfolge; ein fuehrendes "SYSTEM:" entfaellt.
+    """
+    global _prompt_split
+    if _prompt_split is None:
+        static, variable = [], []
+        for block in load_prompt_template().strip().split("\n\n"):
+            if _has_placeholders(block):
+                variable.append(block)
+            else:
+                static.append(block.format())  # {{ }} demaskieren
+        system = "\n\n".join(static).removeprefix("SYSTEM:").strip()
+        _prompt_split = (system, "\n\n".join(variable))
+    return _prompt_split
+
+
+def system_prompt() -> str | None:
+    """Statischer System-Prompt bei PROMPT_LAYOUT=prefix, sonst None."""
+    return split_prompt_template()[0] if settings.prompt_layout == "prefix" else None
+
+
 def build_prompt(job_data: dict, rag_results: list[dict] | None = None) -> str:
-    """Prompt mit Job-Daten und RAG-Ergebnissen befuellen."""
+    """Prompt mit Job-Daten und RAG-Ergebnissen befuellen (Token-Budget: PROMPT_TOKEN_BUDGET, 0 = aus).
+
+    Bei PROMPT_LAYOUT=prefix nur der Alert-Teil; der Rest kommt aus system_prompt().
+    """
     template = load_prompt_template()
 
-    # RAG-Ergebnisse formatieren
-    rag_text = "Keine aehnlichen Incidents gefunden."
-    if rag_results:
-        entries = []
-        for r in rag_results:
-            sim = r.get("similarity", 0)
-            content = r.get("content", "")[:300]
-            entries.append(f"  - [Aehnlichkeit: {sim:.2f}] {content}")
-        rag_text = "\n".join(entries)
-
-    # Platzhalter befuellen
-    prompt = template.format(
-        alert_type=job_data.get("source", "unknown"),
-        source=job_data.get("source", "unknown"),
-        hostname=job_data.get("host", "unknown"),
-        severity=job_data.get("severity", "warning"),
-        timestamp=job_data.get("created_at", time.strftime("%Y-%m-%dT%H:%M:%SZ")),
-        description=job_data.get("description", "Keine Beschreibung"),
-        metrics=job_data.get("metrics", "{}"),
-        logs=job_data.get("logs", "keine"),
-        crowdsec_alerts=job_data.get("crowdsec_alerts", "keine"),
-        rag_results=rag_text,
-    )
-    return prompt
+    sections = {
+        "description": job_data.get("description", "Keine Beschreibung"),
+        "metrics": job_data.get("metrics", "{}"),
+        "logs": compact_lines(job_data.get("logs") or "") or "keine",
+        "crowdsec_alerts": compact_lines(job_data.get("crowdsec_alerts") or "") or "keine",
+        "rag_results": _format_rag(rag_results or []),
+    }
+
+    fields = {
+        "alert_type": job_data.get("source", "unknown"),
+        "source": job_data.get("source", "unknown"),
+        "hostname": job_data.get("host", "unknown"),
+        "severity": job_data.get("severity", "warning"),
+        "timestamp": job_data.get("created_at", time.strftime("%Y-%m-%dT%H:%M:%SZ")),
+    }
+
+    if settings.prompt_token_budget > 0:
+        fixed = estimate_tokens(template.format(**fields, **dict.fromkeys(sections, "")))
+        demands = {name: estimate_tokens(text) for name, text in sections.items()}
+        budget = max(0, settings.prompt_token_budget - fixed)
+        if sum(demands.values()) > budget:
+            allocation = _allocate(budget, demands)
+            sections["description"] = _truncate(sections["description"], allocation["description"])
+            sections["metrics"] = _compact_metrics(sections["metrics"], allocation["metrics"])
+            for name in ("logs", "crowdsec_alerts"):
+                if demands[name] > allocation[name]:
+                    sections[name] = compact_lines(sections[name], allocation[name]) or "keine"
+            sections["rag_results"] = _format_rag(rag_results or [], allocation["rag_results"])
+            logger.info(
+                "Prompt gekuerzt: %d geschaetzte Tokens in den Abschnitten, Budget %d",
+                sum(demands.values()), budget,
+            )
+
+    if settings.prompt_layout == "prefix":
+        return split_prompt_template()[1].format(**fields, **sections)
+    return template.format(**fields, **sections)
@@ -0,0 +1,91 @@
+"""MCP v7 — Embedding-Cache (In-Process-LRU mit TTL, optional Redis als geteilte Stufe).
+
+Alert-Beschreibungen wiederholen sich haeufig (gleiche Zabbix-Trigger-Texte) — der
+Cache vermeidet dann den Aufruf des Embedding-Modells. Schluessel ist der
+SHA-256 aus Modell und Text; leere Embeddings werden nicht gecacht.
+
+Gleicher Code in containers/ai-gateway/app/services/embedding_cache.py
+(nur Logger und Metrik-Import weichen ab) — Aenderungen in beiden Dateien vornehmen.
+"""
+
+import base64
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+import numpy as np
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.metrics import EMBEDDING_CACHE
+
+logger = logging.getLogger("mcp-langchain-worker")
+
+REDIS_PREFIX = "mcp:embcache:"
+
+
+class EmbeddingCache:
+    """LRU-Cache fuer Embeddings mit TTL; Redis-Stufe wird per `redis` aktiviert."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis: aioredis.Redis | None = None
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    async def get(self, model: str, text: str) -> list[float] | None:
+        if self.max_entries <= 0:
+            return None
+        key = self._key(model, text)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, embedding = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                EMBEDDING_CACHE.labels(result="hit_memory").inc()
+                return embedding
+            del self._entries[key]
+
+        if self.redis is not None:
+            try:
+                cached = await self.redis.get(f"{REDIS_PREFIX}{key}")
+            except Exception as e:
+                logger.debug("Embedding-Cache (Redis) nicht lesbar: %s", e)
+                cached = None
+            if cached:
+                embedding = np.frombuffer(base64.b64decode(cached), dtype="<f4").tolist()
+                self._remember(key, embedding)
+                EMBEDDING_CACHE.labels(result="hit_redis").inc()
+                return embedding
+
+        EMBEDDING_CACHE.labels(result="miss").inc()
+        return None
+
+    async def put(self, model: str, text: str, embedding: list[float]) -> None:
+        if self.max_entries <= 0 or not embedding:
+            return
+        key = self._key(model, text)
+        self._remember(key, embedding)
+
+        if self.redis is not None:
+            # float32 statt JSON: ~4 KB statt ~15 KB pro 768-dim Embedding
+            encoded = base64.b64encode(np.asarray(embedding, dtype="<f4").tobytes()).decode("ascii")
+            try:
+                await self.redis.set(f"{REDIS_PREFIX}{key}", encoded, ex=self.ttl_seconds)
+            except Exception as e:
+                logger.debug("Embedding-Cache (Redis) nicht schreibbar: %s", e)
+
+    def _remember(self, key: str, embedding: list[float]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+embedding_cache = EmbeddingCache(settings.embed_cache_size, settings.embed_cache_ttl)
@@ -0,0 +1,340 @@
+"""MCP v7 — Zuverlaessige Prioritaets-Job-Queue (LMOVE + Processing-Liste + Lease) fuer den Worker.
+
+Der Gateway reiht Jobs je nach Severity in mcp:queue:analyze:<severity> ein
+(critical, high, warning, info). Der Worker entnimmt sie gewichtet fair
+(Smooth Weighted Round-Robin ueber die nicht-leeren Queues, Gewichte aus
+QUEUE_PRIORITY_WEIGHTS): Bei Rueckstau in allen Queues erhaelt critical den
+groessten Anteil, ohne dass info-Jobs verhungern.
+
+Ablauf:
+    1. dequeue():   LMOVE mcp:queue:analyze:<severity> → mcp:queue:analyze:processing:<worker>
+                    und Lease mcp:lease:<job> mit QUEUE_VISIBILITY_TIMEOUT setzen
+    2. heartbeat(): Lease waehrend der Verarbeitung periodisch verlaengern
+    3. ack():       Job aus der Processing-Liste entfernen, Lease loeschen
+    4. reap():      Jobs ohne Lease (Worker abgestuerzt/haengt) zurueck in die Queue
+
+Ein Job gilt erst als verwaist, wenn er in zwei aufeinanderfolgenden
+Reaper-Laeufen ohne Lease gefunden wurde — so kollidiert der Reaper nicht
+mit einem Worker, der den Job gerade erst per LMOVE geholt hat.
+
+Statuswechsel laufen ueber set_status(), damit der Status-Index des Gateways
+(mcp:jobs:index:status:<status>, Score = Erstellungszeitpunkt) aktuell bleibt.
+"""
+
+import asyncio
+import logging
+import time
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+logger = logging.getLogger("mcp-langchain-worker")
+
+QUEUE_PREFIX = "mcp:queue:analyze:"
+PRIORITIES = ("critical", "high", "warning", "info")
+# Altbestand aus der Zeit vor den Prioritaets-Queues (wird mit Gewicht 1 abgearbeitet)
+LEGACY_QUEUE_KEY = "mcp:queue:analyze"
+PROCESSING_PREFIX = "mcp:queue:analyze:processing:"
+LEASE_PREFIX = "mcp:lease:"
+WORKERS_KEY = "mcp:workers"
+WORKER_ALIVE_PREFIX = "mcp:worker:"
+JOB_INDEX_KEY = "mcp:jobs:index"
+JOB_STATUSES = ("pending", "processing", "completed", "failed")
+# Wie im Gateway: 7 Tage Ergebnis-TTL + max. 24h Wartezeit in der Queue
+JOB_RETENTION_SECONDS = 8 * 86400
+# Reaper: Filter-Indizes (auch von Hosts/Quellen ohne neue Jobs) hoechstens so oft kuerzen
+INDEX_TRIM_INTERVAL = 3600
+
+# Gewichtete faire Auswahl (Smooth Weighted Round-Robin) ueber die nicht-leeren
+# Queues und LMOVE in einem Round-Trip. Der Zustand (current weights) liegt im
+# Worker und wird als ARGV uebergeben bzw. zurueckgegeben.
+# KEYS[1] = Processing-Liste, KEYS[2..n+1] = Queues
+# ARGV[1..n] = Gewichte, ARGV[n+1..2n] = aktuelle Gewichte
+_DEQUEUE_SCRIPT = """
+local n = #KEYS - 1
+local current = {}
+local total = 0
+local best = nil
+for i = 1, n do
+    current[i] = tonumber(ARGV[n + i])
+    if redis.call('LLEN', KEYS[i + 1]) > 0 then
+        local weight = tonumber(ARGV[i])
+        current[i] = current[i] + weight
+        total = total + weight
+        if best == nil or current[i] > current[best] then
+            best = i
+        end
+    end
+end
+if best == nil then
+    return nil
+end
+current[best] = current[best] - total
+local job_id = redis.call('LMOVE', KEYS[best + 1], KEYS[1], 'RIGHT', 'LEFT')
+return {job_id, unpack(current)}
+"""
+
+# Status setzen und den Job im Status-Index umhaengen (Score aus dem globalen
+# Index; Jobs von vor Einfuehrung des Index werden nicht nachgetragen).
+# KEYS[1] = Job-Hash, KEYS[2] = globaler Index, KEYS[3] = Ziel-Status-Index,
+# KEYS[4..] = alle Status-Indizes
+# ARGV[1] = Job-ID, ARGV[2] = Status, ARGV[3] = Index-Aufbewahrung bis Score,
+# ARGV[4..] = weitere Feld/Wert-Paare
+_STATUS_SCRIPT = """
+redis.call('HSET', KEYS[1], 'status', ARGV[2], unpack(ARGV, 4))
+local score = redis.call('ZSCORE', KEYS[2], ARGV[1])
+if score then
+    for i = 4, #KEYS do
+        redis.call('ZREM', KEYS[i], ARGV[1])
+    end
+    redis.call('ZADD', KEYS[3], score, ARGV[1])
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', '(' .. ARGV[3])
+return 1
+"""
+
+# Atomar: nur zurueckstellen, wenn weiterhin keine Lease existiert und der
+# Job noch in der Processing-Liste steht (verhindert doppelte Requeues).
+# Nach QUEUE_MAX_ATTEMPTS Versuchen wird der Job als fehlgeschlagen markiert.
+# KEYS[5] = globaler Index, KEYS[6..8] = Status-Index processing/pending/failed
+_REQUEUE_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return 0
+end
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 0 then
+    return 0
+end
+if redis.call('EXISTS', KEYS[4]) == 0 then
+    return 0
+end
+local score = redis.call('ZSCORE', KEYS[5], ARGV[1])
+if score then
+    redis.call('ZREM', KEYS[6], ARGV[1])
+end
+local attempts = redis.call('HINCRBY', KEYS[4], 'attempts', 1)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('HSET', KEYS[4], 'status', 'failed',
+               'error', 'Maximale Verarbeitungsversuche ueberschritten',
+               'completed_at', ARGV[3])
+    if score then
+        redis.call('ZADD', KEYS[8], score, ARGV[1])
+    end
+    return 2
+end
+redis.call('HSET', KEYS[4], 'status', 'pending')
+if score then
+    redis.call('ZADD', KEYS[7], score, ARGV[1])
+end
+redis.call('RPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+def parse_weights(spec: str) -> dict[str, int]:
+    """QUEUE_PRIORITY_WEIGHTS ("critical:8,high:4,...") in ein Dict umwandeln."""
+    weights = {"critical": 8, "high": 4, "warning": 2, "info": 1}
+    for item in spec.split(","):
+        name, _, value = item.partition(":")
+        name = name.strip()
+        if name not in weights:
+            continue
+        try:
+            weights[name] = max(1, int(value))
+        except ValueError:
+            logger.warning("Ungueltiges Queue-Gewicht ignoriert: %s", item)
+    return weights
+
+
+def queue_key(severity: str | None) -> str:
+    """Queue-Key fuer eine Severity (unbekannt → warning)."""
+    return f"{QUEUE_PREFIX}{severity if severity in PRIORITIES else 'warning'}"
+
+
+def status_index_key(status: str) -> str:
+    """Key des Status-Index im Job-Index des Gateways."""
+    return f"{JOB_INDEX_KEY}:status:{status}"
+
+
+class JobQueue:
+    """Zuverlaessige Prioritaets-Queue mit In-Flight-Tracking und Visibility-Timeout."""
+
+    def __init__(self):
+        self.worker_id = settings.worker_id
+        self.processing_key = f"{PROCESSING_PREFIX}{self.worker_id}"
+        self._suspects: set[tuple[str, str]] = set()
+        self._last_trim: float | None = None
+        weights = parse_weights(settings.queue_priority_weights)
+        self._queue_keys = [queue_key(p) for p in PRIORITIES] + [LEGACY_QUEUE_KEY]
+        self._weights = [weights[p] for p in PRIORITIES] + [1]
+        self._current = [0] * len(self._queue_keys)
+
+    async def register(self, r: aioredis.Redis) -> None:
+        """Worker registrieren und Alive-Key setzen."""
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.sadd(WORKERS_KEY, self.worker_id)
+            pipe.set(
+                f"{WORKER_ALIVE_PREFIX}{self.worker_id}", "1",
+                ex=settings.queue_visibility_timeout,
+            )
+            await pipe.execute()
+
+    async def dequeue(self, r: aioredis.Redis, timeout: int = 5) -> str | None:
+        """Naechsten Job gewichtet auswaehlen und atomar in die Processing-Liste verschieben.
+
+        Ueber mehrere Listen gibt es kein blockierendes LMOVE — bei leeren
+        Queues wird bis zu `timeout` Sekunden im QUEUE_POLL_INTERVAL gepollt.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            result = await r.eval(
+                _DEQUEUE_SCRIPT,
+                len(self._queue_keys) + 1,
+                self.processing_key,
+                *self._queue_keys,
+                *self._weights,
+                *self._current,
+            )
+            if result:
+                job_id, *current = result
+                self._current = [int(c) for c in current]
+                await r.set(f"{LEASE_PREFIX}{job_id}", self.worker_id, ex=settings.queue_visibility_timeout)
+                return job_id
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(settings.queue_poll_interval)
+
+    async def heartbeat(self, r: aioredis.Redis, job_id: str) -> None:
+        """Lease eines laufenden Jobs und Alive-Key des Workers verlaengern."""
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.expire(f"{LEASE_PREFIX}{job_id}", settings.queue_visibility_timeout)
+            pipe.set(
+                f"{WORKER_ALIVE_PREFIX}{self.worker_id}", "1",
+                ex=settings.queue_visibility_timeout,
+            )
+            await pipe.execute()
+
+    async def ack(self, r: aioredis.Redis, job_id: str) -> None:
+        """Job als erledigt markieren (aus Processing-Liste entfernen)."""
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key, 1, job_id)
+            pipe.delete(f"{LEASE_PREFIX}{job_id}")
+            removed, _ = await pipe.execute()
+        if not removed:
+            logger.warning("Job %s war nicht mehr in Bearbeitung (vom Reaper zurueckgestellt?)", job_id)
+
+    async def set_status(
+        self,
+        r: aioredis.Redis,
+        job_id: str,
+        status: str,
+        fields: dict[str, str] | None = None,
+    ) -> None:
+        """Job-Status (und weitere Felder) setzen und den Status-Index nachziehen."""
+        extra = [item for pair in (fields or {}).items() for item in pair]
+        await r.eval(
+            _STATUS_SCRIPT,
+            3 + len(JOB_STATUSES),
+            f"mcp:job:{job_id}",
+            JOB_INDEX_KEY,
+            status_index_key(status),
+            *(status_index_key(s) for s in JOB_STATUSES),
+            job_id,
+            status,
+            time.time() - JOB_RETENTION_SECONDS,
+            *extra,
+        )
+
+    async def recover(self, r: aioredis.Redis) -> int:
+        """Beim Start: Jobs aus der eigenen Processing-Liste (vorheriger Lauf) zurueckstellen."""
+        job_ids = await r.lrange(self.processing_key, 0, -1)
+        requeued = 0
+        for job_id in job_ids:
+            await r.delete(f"{LEASE_PREFIX}{job_id}")
+            if await self._requeue(r, self.processing_key, job_id) == 1:
+                requeued += 1
+        if job_ids:
+            logger.info("Recovery: %d/%d Jobs aus vorherigem Lauf zurueckgestellt", requeued, len(job_ids))
+        return requeued
+
+    async def reap(self, r: aioredis.Redis) -> int:
+        """Verwaiste Jobs aller Worker (ohne Lease) zurueck in die Queue stellen."""
+        requeued = 0
+        suspects: set[tuple[str, str]] = set()
+        for worker_id in await r.smembers(WORKERS_KEY):
+            processing_key = f"{PROCESSING_PREFIX}{worker_id}"
+            job_ids = await r.lrange(processing_key, 0, -1)
+
+            if not job_ids:
+                # Leere Liste eines nicht mehr lebenden Workers abmelden
+                if worker_id != self.worker_id and not await r.exists(f"{WORKER_ALIVE_PREFIX}{worker_id}"):
+                    await r.srem(WORKERS_KEY, worker_id)
+                continue
+
+            async with r.pipeline(transaction=False) as pipe:
+                for job_id in job_ids:
+                    pipe.exists(f"{LEASE_PREFIX}{job_id}")
+                leases = await pipe.execute()
+
+            for job_id, has_lease in zip(job_ids, leases):
+                if has_lease:
+                    continue
+                key = (processing_key, job_id)
+                if key not in self._suspects:
+                    suspects.add(key)
+                    continue
+                result = await self._requeue(r, processing_key, job_id)
+                if result == 1:
+                    requeued += 1
+                    logger.warning("Reaper: Job %s von Worker %s zurueckgestellt", job_id, worker_id)
+                elif result == 2:
+                    logger.error("Reaper: Job %s nach %d Versuchen aufgegeben", job_id, settings.queue_max_attempts)
+
+        self._suspects = suspects
+        return requeued
+
+    async def trim_indexes(self, r: aioredis.Redis) -> int:
+        """Abgelaufene Eintraege aus allen Job-Indizes entfernen (hoechstens alle INDEX_TRIM_INTERVAL s).
+
+        Der Gateway kuerzt nur die Indizes, in die er gerade einreiht — Indizes
+        von Hosts oder Quellen, die keine Alerts mehr senden, wuerden sonst nie
+        kleiner. Leere Sorted Sets loescht Redis selbst.
+        """
+        if self._last_trim is not None and time.monotonic() - self._last_trim < INDEX_TRIM_INTERVAL:
+            return 0
+        self._last_trim = time.monotonic()
+        cutoff = f"({time.time() - JOB_RETENTION_SECONDS}"
+        removed = 0
+        keys = [JOB_INDEX_KEY]
+        async for key in r.scan_iter(match=f"{JOB_INDEX_KEY}:*", count=500, _type="zset"):
+            keys.append(key)
+        for offset in range(0, len(keys), 100):
+            async with r.pipeline(transaction=False) as pipe:
+                for key in keys[offset:offset + 100]:
+                    pipe.zremrangebyscore(key, "-inf", cutoff)
+                removed += sum(await pipe.execute())
+        if removed:
+            logger.info("Job-Index: %d abgelaufene Eintraege aus %d Indizes entfernt", removed, len(keys))
+        return removed
+
+    async def _requeue(self, r: aioredis.Redis, processing_key: str, job_id: str) -> int:
+        """Requeue-Script ausfuehren (0 = nichts, 1 = zurueckgestellt, 2 = aufgegeben)."""
+        severity = await r.hget(f"mcp:job:{job_id}", "severity")
+        return await r.eval(
+            _REQUEUE_SCRIPT,
+            8,
+            processing_key,
+            queue_key(severity),
+            f"{LEASE_PREFIX}{job_id}",
+            f"mcp:job:{job_id}",
+            JOB_INDEX_KEY,
+            status_index_key("processing"),
+            status_index_key("pending"),
+            status_index_key("failed"),
+            job_id,
+            settings.queue_max_attempts,
+            time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        )
+
+
+job_queue = JobQueue()
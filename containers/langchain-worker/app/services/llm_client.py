@@ -1,46 +1,191 @@
-"""MCP v7 — LLM Client mit LiteLLM-First und Ollama-Fallback."""
+"""MCP v7 — Async LLM Client mit LiteLLM-First und Ollama-Fallback."""
 
+import asyncio
+import json
 import logging
 import time
+from collections.abc import Awaitable, Callable, Sequence
 
 import httpx
 
 from app.config import settings
+from app.json_stream import JsonObjectDetector
+from app.metrics import MODEL_LOAD_SECONDS
+from app.services.embedding_cache import embedding_cache
 
 logger = logging.getLogger("mcp-langchain-worker")
 
+# Fortschritts-Callback: (bisheriger Antworttext, Time-to-first-Token in ms)
+ProgressCallback = Callable[[str, int], Awaitable[None]]
+
+
+class _StreamCollector:
+    """Token-Fragmente sammeln, TTFT messen und Fortschritt gedrosselt melden.
+
+    Mit `json_keys` wird der Stream auf ein vollstaendiges JSON-Objekt mit
+    diesen Schluesseln geprueft; add() liefert dann True (Generierung beenden).
+    """
+
+    def __init__(
+        self,
+        start: float,
+        on_progress: ProgressCallback | None,
+        json_keys: Sequence[str] | None = None,
+    ):
+        self._start = start
+        self._on_progress = on_progress
+        self._detector = JsonObjectDetector(json_keys) if json_keys is not None else None
+        self._parts: list[str] = []
+        self._last_report = 0.0
+        self._reported = 0
+        self.ttft_ms: int | None = None
+
+    @property
+    def text(self) -> str:
+        text = "".join(self._parts)
+        if self._detector and self._detector.end is not None:
+            # Nachlaufende Fragmente hinter dem Objekt verwerfen
+            return text[:self._detector.end]
+        return text
+
+    @property
+    def parsed(self) -> dict | None:
+        """Vollstaendiges JSON-Objekt (nur bei vorzeitigem Ende)."""
+        return self._detector.result if self._detector else None
+
+    async def add(self, fragment: str) -> bool:
+        if not fragment:
+            return False
+        self._parts.append(fragment)
+        now = time.monotonic()
+        done = self._detector is not None and self._detector.feed(fragment) is not None
+        if self.ttft_ms is None:
+            self.ttft_ms = int((now - self._start) * 1000)
+        elif now - self._last_report < settings.llm_stream_progress_interval and not done:
+            return False
+        self._last_report = now
+        await self._report()
+        return done
+
+    async def flush(self):
+        """Abschliessenden Stand melden (letzte Fragmente seit dem letzten Report)."""
+        if len(self._parts) > self._reported:
+            await self._report()
+
+    async def _report(self):
+        self._reported = len(self._parts)
+        if self._on_progress:
+            await self._on_progress(self.text, self.ttft_ms or 0)
+
 
 class LLMClient:
-    """Synchroner LLM-Client: versucht LiteLLM, faellt auf Ollama zurueck."""
+    """Asynchroner LLM-Client: versucht LiteLLM, faellt auf Ollama zurueck.
+
+    Parallele Anfragen werden ueber Semaphoren auf die Kapazitaet von
+    LLM und Embedding-Modell begrenzt (Backpressure).
+    """
 
     def __init__(self):
-        self._litellm_client = httpx.Client(
+        self._llm_slots = asyncio.Semaphore(max(1, settings.llm_max_concurrency))
+        self._embed_slots = asyncio.Semaphore(max(1, settings.embed_max_concurrency))
+        self._litellm_client = httpx.AsyncClient(
             base_url=settings.litellm_host,
             timeout=120.0,
         )
-        self._ollama_client = httpx.Client(
+        self._ollama_client = httpx.AsyncClient(
             base_url=settings.ollama_host,
             timeout=120.0,
         )
-        self._embed_client = httpx.Client(
+        self._embed_client = httpx.AsyncClient(
             base_url=settings.ollama_host,
             timeout=30.0,
         )
 
-    def generate(self, prompt: str, system: str | None = None) -> dict:
-        """LLM-Anfrage mit LiteLLM-First, Ollama-Fallback."""
+    async def generate(
+        self,
+        prompt: str,
+        system: str | None = None,
+        on_progress: ProgressCallback | None = None,
+        json_keys: Sequence[str] | None = None,
+        json_schema: dict | None = None,
+        model: str | None = None,
+    ) -> dict:
+        """LLM-Anfrage mit LiteLLM-First, Ollama-Fallback.
+
+        Wartet, solange bereits llm_max_concurrency Anfragen laufen. Mit
+        LLM_STREAM wird die Antwort tokenweise gelesen und `on_progress`
+        mit dem bisherigen Text aufgerufen (erstes Token sofort, danach
+        gedrosselt). Mit `json_keys` (und LLM_STOP_ON_JSON) wird die
+        Generierung abgebrochen, sobald ein JSON-Objekt mit diesen
+        Schluesseln vollstaendig ist — das Ergebnis enthaelt es als "parsed".
+        Ein `json_schema` beschraenkt die Ausgabe des Modells auf dieses
+        Schema (strukturierte Ausgabe). `model` ersetzt PRIMARY_MODEL (z.B.
+        ein kleines Modell fuer die Vorab-Triage).
+        """
+        if not settings.llm_stop_on_json:
+            json_keys = None
+        async with self._llm_slots:
+            return await self._generate(prompt, system, on_progress, json_keys, json_schema, model)
+
+    async def _generate(
+        self,
+        prompt: str,
+        system: str | None = None,
+        on_progress: ProgressCallback | None = None,
+        json_keys: Sequence[str] | None = None,
+        json_schema: dict | None = None,
+        model: str | None = None,
+    ) -> dict:
         # Versuch 1: LiteLLM (OpenAI-kompatibles Format)
         try:
-            result = self._call_litellm(prompt, system)
+            result = await self._call_litellm(prompt, system, on_progress, json_keys, json_schema, model)
             if result:
                 return result
         except Exception as e:
             logger.warning("LiteLLM nicht erreichbar, Fallback auf Ollama: %s", e)
 
         # Versuch 2: Ollama direkt
-        return self._call_ollama(prompt, system)
+        return await self._call_ollama(prompt, system, on_progress, json_keys, json_schema, model)
+
+    async def _read_litellm_stream(self, payload: dict, collector: _StreamCollector) -> str:
+        """Server-Sent Events von /chat/completions lesen, Modellnamen zurueckgeben."""
+        model = payload["model"]
+        async with self._litellm_client.stream("POST", "/chat/completions", json=payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                model = chunk.get("model") or model
+                choices = chunk.get("choices") or [{}]
+                if await collector.add((choices[0].get("delta") or {}).get("content") or ""):
+                    # Verlassen des Streams schliesst die Verbindung → Generierung endet
+                    break
+        return model
 
-    def _call_litellm(self, prompt: str, system: str | None = None) -> dict | None:
+    async def _read_ollama_stream(self, payload: dict, collector: _StreamCollector):
+        """NDJSON-Stream von /api/generate lesen."""
+        async with self._ollama_client.stream("POST", "/api/generate", json=payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if await collector.add(chunk.get("response", "")) or chunk.get("done"):
+                    break
+
+    async def _call_litellm(
+        self,
+        prompt: str,
+        system: str | None = None,
+        on_progress: ProgressCallback | None = None,
+        json_keys: Sequence[str] | None = None,
+        json_schema: dict | None = None,
+        model: str | None = None,
+    ) -> dict | None:
         """LLM-Aufruf ueber LiteLLM (OpenAI-kompatibles API) mit Retry."""
         messages = []
         if system:
@@ -50,15 +195,31 @@ class LLMClient:
         for attempt in range(2):
             try:
                 start = time.monotonic()
-                resp = self._litellm_client.post(
-                    "/chat/completions",
-                    json={
-                        "model": settings.primary_model,
-                        "messages": messages,
-                        "temperature": 0.1,
-                        "max_tokens": 2048,
-                    },
-                )
+                payload = {
+                    "model": model or settings.primary_model,
+                    "messages": messages,
+                    "temperature": 0.1,
+                    "max_tokens": 2048,
+                }
+                if json_schema:
+                    payload["response_format"] = {
+                        "type": "json_schema",
+                        "json_schema": {"name": "alert_analysis", "schema": json_schema, "strict": True},
+                    }
+                if settings.llm_stream:
+                    collector = _StreamCollector(start, on_progress, json_keys)
+                    used = await self._read_litellm_stream({**payload, "stream": True}, collector)
+                    await collector.flush()
+                    return {
+                        "response": collector.text,
+                        "parsed": collector.parsed,
+                        "model": used,
+                        "latency_ms": int((time.monotonic() - start) * 1000),
+                        "ttft_ms": collector.ttft_ms,
+                        "via": "litellm",
+                    }
+
+                resp = await self._litellm_client.post("/chat/completions", json=payload)
                 resp.raise_for_status()
                 data = resp.json()
                 elapsed_ms = int((time.monotonic() - start) * 1000)
@@ -66,40 +227,64 @@ class LLMClient:
                 content = data["choices"][0]["message"]["content"]
                 return {
                     "response": content,
-                    "model": data.get("model", settings.primary_model),
+                    "model": data.get("model", payload["model"]),
                     "latency_ms": elapsed_ms,
                     "via": "litellm",
                 }
             except Exception as e:
                 if attempt == 0:
                     logger.warning("LiteLLM Versuch 1 fehlgeschlagen: %s — Retry", e)
-                    time.sleep(2)
+                    await asyncio.sleep(2)
                 else:
                     raise
         return None
 
-    def _call_ollama(self, prompt: str, system: str | None = None) -> dict:
+    async def _call_ollama(
+        self,
+        prompt: str,
+        system: str | None = None,
+        on_progress: ProgressCallback | None = None,
+        json_keys: Sequence[str] | None = None,
+        json_schema: dict | None = None,
+        model: str | None = None,
+    ) -> dict:
         """Direkter LLM-Aufruf an Ollama (Fallback)."""
         payload = {
-            "model": settings.primary_model,
+            "model": model or settings.primary_model,
             "prompt": prompt,
-            "stream": False,
+            "stream": settings.llm_stream,
             "options": {"temperature": 0.1, "num_predict": 2048},
+            "keep_alive": settings.ollama_keep_alive,
         }
         if system:
             payload["system"] = system
+        if json_schema:
+            payload["format"] = json_schema
 
         for attempt in range(3):
             try:
                 start = time.monotonic()
-                resp = self._ollama_client.post("/api/generate", json=payload)
+                if settings.llm_stream:
+                    collector = _StreamCollector(start, on_progress, json_keys)
+                    await self._read_ollama_stream(payload, collector)
+                    await collector.flush()
+                    return {
+                        "response": collector.text,
+                        "parsed": collector.parsed,
+                        "model": payload["model"],
+                        "latency_ms": int((time.monotonic() - start) * 1000),
+                        "ttft_ms": collector.ttft_ms,
+                        "via": "ollama",
+                    }
+
+                resp = await self._ollama_client.post("/api/generate", json=payload)
                 resp.raise_for_status()
                 data = resp.json()
                 elapsed_ms = int((time.monotonic() - start) * 1000)
 
                 return {
                     "response": data.get("response", ""),
-                    "model": settings.primary_model,
+                    "model": payload["model"],
                     "latency_ms": elapsed_ms,
                     "via": "ollama",
                 }
@@ -111,34 +296,128 @@ class LLMClient:
                 )
                 if attempt == 2:
                     raise
-                time.sleep(wait)
-        return {"response": "", "model": settings.primary_model, "latency_ms": 0, "via": "error"}
+                await asyncio.sleep(wait)
+        return {"response": "", "model": payload["model"], "latency_ms": 0, "via": "error"}
+
+    async def load_model(
+        self,
+        model: str,
+        embedding: bool = False,
+        system: str | None = None,
+        timeout: float | None = None,
+    ) -> float:
+        """Modell in Ollama laden (keep_alive) und die Ladezeit in Sekunden liefern.
+
+        Mit `system` wird ein Token generiert, damit der System-Prompt bereits im
+        KV-Cache liegt; sonst laedt ein leerer Prompt nur das Modell. Ollama meldet
+        die reine Ladezeit als load_duration (ns). Fehler gehen an den Aufrufer.
+        `timeout` begrenzt den Aufruf (Default: LLM_WARMUP_TIMEOUT).
+        """
+        if embedding:
+            client, path = self._embed_client, "/api/embed"
+            payload = {"model": model, "input": ["warm-up"]}
+        else:
+            client, path = self._ollama_client, "/api/generate"
+            payload = {
+                "model": model,
+                "prompt": "OK" if system else "",
+                "stream": False,
+                "options": {"temperature": 0.1, "num_predict": 1},
+            }
+            if system:
+                payload["system"] = system
+        payload["keep_alive"] = settings.ollama_keep_alive
+
+        start = time.monotonic()
+        resp = await client.post(path, json=payload, timeout=timeout or settings.llm_warmup_timeout)
+        resp.raise_for_status()
+        load_duration = resp.json().get("load_duration")
+        return load_duration / 1e9 if load_duration else time.monotonic() - start
 
-    def close(self):
+    async def warm_up(self, system: str | None = None) -> bool:
+        """Primaer-, Embedding- und ggf. Triage-Modell laden, bis es gelingt oder LLM_WARMUP_TIMEOUT ablaeuft.
+
+        Jeder Ladeaufruf erhaelt nur die bis zur Frist verbleibende Zeit als Timeout.
+        """
+        deadline = time.monotonic() + settings.llm_warmup_timeout
+        pending = {settings.primary_model: False, settings.embedding_model: True}
+        if settings.triage_model:
+            pending.setdefault(settings.triage_model, False)
+        while pending:
+            for model, embedding in list(pending.items()):
+                try:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    prefix = system if model == settings.primary_model else None
+                    seconds = await self.load_model(model, embedding, prefix, timeout=remaining)
+                except Exception as e:
+                    logger.warning("Warm-up von %s fehlgeschlagen: %s", model, e)
+                    continue
+                MODEL_LOAD_SECONDS.labels(model=model).set(seconds)
+                logger.info("Modell %s geladen (%.1fs, keep_alive %s)", model, seconds, settings.ollama_keep_alive)
+                del pending[model]
+            if pending:
+                if time.monotonic() + settings.llm_warmup_retry_interval > deadline:
+                    return False
+                await asyncio.sleep(settings.llm_warmup_retry_interval)
+        return True
+
+    async def close(self):
         """Alle HTTP-Clients schliessen."""
-        self._litellm_client.close()
-        self._ollama_client.close()
-        self._embed_client.close()
+        await self._litellm_client.aclose()
+        await self._ollama_client.aclose()
+        await self._embed_client.aclose()
+
+    async def embed(self, text: str) -> list[float]:
+        """Embedding-Vektor generieren via Ollama (begrenzt auf embed_max_concurrency), mit Cache."""
+        cached = await embedding_cache.get(settings.embedding_model, text)
+        if cached is not None:
+            return cached
+        embeddings = await self.embed_batch([text])
+        embedding = embeddings[0] if embeddings else []
+        await embedding_cache.put(settings.embedding_model, text, embedding)
+        return embedding
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embeddings fuer mehrere Texte (je EMBED_BATCH_SIZE Texte ein Request).
 
-    def embed(self, text: str) -> list[float]:
-        """Embedding-Vektor generieren via Ollama mit Retry."""
+        Positionsgleich zu `texts`; Texte eines endgueltig fehlgeschlagenen
+        Requests erhalten eine leere Liste.
+        """
+        batch_size = max(1, settings.embed_batch_size)
+        results: list[list[float]] = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            async with self._embed_slots:
+                embeddings = await self._embed(batch)
+            if len(embeddings) != len(batch):
+                embeddings = [[] for _ in batch]
+            results.extend(embeddings)
+        return results
+
+    async def _embed(self, inputs: list[str]) -> list[list[float]]:
+        """Embedding-Vektoren generieren via Ollama (input als Liste) mit Retry."""
         for attempt in range(3):
             try:
-                resp = self._embed_client.post(
+                resp = await self._embed_client.post(
                     "/api/embed",
-                    json={"model": settings.embedding_model, "input": text},
+                    json={
+                        "model": settings.embedding_model,
+                        "input": inputs,
+                        "keep_alive": settings.ollama_keep_alive,
+                    },
                 )
                 resp.raise_for_status()
                 data = resp.json()
-                embeddings = data.get("embeddings", [[]])
-                return embeddings[0] if embeddings else []
+                return data.get("embeddings") or []
             except Exception as e:
                 wait = 2 ** (attempt + 1)
                 logger.warning("Embedding Versuch %d fehlgeschlagen: %s", attempt + 1, e)
                 if attempt == 2:
                     logger.error("Embedding endgueltig fehlgeschlagen nach 3 Versuchen")
                     return []
-                time.sleep(wait)
+                await asyncio.sleep(wait)
         return []
 
 
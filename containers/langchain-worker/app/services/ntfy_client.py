@@ -1,7 +1,7 @@
-"""MCP v7 — ntfy Push-Notification Client mit Retry."""
+"""MCP v7 — Async ntfy Push-Notification Client mit Retry."""
 
+import asyncio
 import logging
-import time
 
 import httpx
 
@@ -28,16 +28,16 @@ class NtfyClient:
     """Push-Benachrichtigungen ueber ntfy senden mit Retry-Logik."""
 
     def __init__(self):
-        self._client = httpx.Client(
+        self._client = httpx.AsyncClient(
             base_url=settings.ntfy_url,
             timeout=10.0,
         )
 
-    def close(self):
+    async def close(self):
         """HTTP-Client schliessen."""
-        self._client.close()
+        await self._client.aclose()
 
-    def send_notification(
+    async def send_notification(
         self,
         title: str,
         message: str,
@@ -61,7 +61,7 @@ class NtfyClient:
 
         for attempt in range(2):
             try:
-                resp = self._client.post(
+                resp = await self._client.post(
                     "/mcp-alerts",
                     content=message[:max_len],
                     headers=headers,
@@ -72,7 +72,7 @@ class NtfyClient:
             except Exception as e:
                 if attempt == 0:
                     logger.warning("ntfy Versuch 1 fehlgeschlagen: %s — Retry", e)
-                    time.sleep(2)
+                    await asyncio.sleep(2)
                 else:
                     logger.error("ntfy-Benachrichtigung endgueltig fehlgeschlagen: %s", e)
                     return False
@@ -1,125 +1,363 @@
-"""MCP v7 — pgvector RAG-Service (synchron, fuer den Worker) mit Connection-Pooling."""
+"""MCP v7 — pgvector RAG-Service (async, fuer den Worker) mit Connection-Pooling."""
 
 import hashlib
 import json
 import logging
+from datetime import datetime, timezone
 
-import psycopg2
-import psycopg2.pool
-from pgvector.psycopg2 import register_vector
+import asyncpg
+import numpy as np
+from pgvector.asyncpg import register_vector
 
 from app.config import settings
 
 logger = logging.getLogger("mcp-langchain-worker")
 
+# SQL-Bausteine bis vor die Service-Klasse: gleicher Code in
+# containers/ai-gateway/app/services/rag_service.py
+# (Gateway und Worker bauen aus getrennten Kontexten) — Aenderungen in beiden Dateien vornehmen.
+
+# Bulk-Speicherung: COPY (Binaerprotokoll) in eine Staging-Tabelle pro Session,
+# danach ein mengenbasiertes INSERT ... ON CONFLICT in embeddings.
+_STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS embeddings_staging (
+        ord             INTEGER,
+        content         TEXT,
+        content_hash    VARCHAR(64),
+        embedding       vector,
+        source_type     VARCHAR(50),
+        source_id       VARCHAR(255),
+        metadata        TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+_STAGING_COLUMNS = ["ord", "content", "content_hash", "embedding", "source_type", "source_id", "metadata"]
+_MERGE_SQL = """
+    WITH inserted AS (
+        INSERT INTO embeddings
+            (content, content_hash, embedding, source_type, source_id, metadata)
+        SELECT content, content_hash, embedding, source_type, source_id, metadata::jsonb
+        FROM embeddings_staging
+        ORDER BY ord
+        ON CONFLICT (content_hash, source_type)
+            WHERE content_hash IS NOT NULL
+        DO NOTHING
+        RETURNING id, content_hash, source_type
+    )
+    SELECT s.ord, i.id
+    FROM embeddings_staging s
+    JOIN inserted i ON i.content_hash = s.content_hash AND i.source_type = s.source_type
+"""
+
+
+def _as_vector(values) -> np.ndarray:
+    """Embedding als big-endian float32 — das Wire-Format von pgvector (kein weiteres Kopieren im Codec)."""
+    return np.asarray(values, dtype=">f4")
+
+
+# 'simple' kennt keine Stoppwoerter — Fuellwoerter passen auf fast jede Zeile und
+# machen die ODER-Suche zum Tabellen-Scan mit Ranking; sie und Tokens unter 3 Zeichen
+# fallen daher weg
+_STOPWORDS = (
+    "and", "are", "but", "for", "from", "has", "have", "into", "not", "that", "the", "this",
+    "was", "were", "will", "with", "als", "auf", "aus", "bei", "das", "dem", "den", "der",
+    "des", "die", "ein", "eine", "einem", "einen", "einer", "fuer", "für", "ist", "mit",
+    "nach", "nicht", "oder", "sich", "sind", "und", "vom", "von", "wird", "wurde", "zum", "zur",
+)
+
+# Suchbegriffe ODER-verknuepft (sonst muesste eine Alert-Beschreibung komplett
+# vorkommen); 'simple' ohne Stemming, damit Hostnamen und Fehlercodes exakt bleiben
+_TSQUERY = f"""(
+    SELECT to_tsquery('simple', string_agg(quote_literal(word), ' | ')) AS query
+    FROM unnest(tsvector_to_array(to_tsvector('simple', $2))) AS word
+    WHERE length(word) >= 3 AND word <> ALL(ARRAY[{", ".join(f"'{w}'" for w in _STOPWORDS)}])
+) q"""
+
+
+def _hybrid_ctes(conditions: str, vector_param: str | None, min_rank: float | None = None) -> str:
+    """CTEs der hybriden Suche bis zur Reciprocal Rank Fusion (Tabelle `fused`).
+
+    Parameter: $2 Suchtext, $3 Kandidaten je Trefferliste, $4 RRF-Konstante k;
+    `vector_param` ist das Query-Embedding (None = nur Volltext). Mit `min_rank`
+    gilt ein Volltext-Treffer nur ab diesem ts_rank_cd als lexical.
+    """
+    and_conditions = f"AND {conditions}" if conditions else ""
+    ctes = f"""
+        WITH text_hits AS MATERIALIZED (
+            SELECT id, text_rank, row_number() OVER (ORDER BY text_rank DESC, id) AS rank
+            FROM (
+                SELECT e.id, ts_rank_cd(e.content_tsv, q.query) AS text_rank
+                FROM embeddings e, {_TSQUERY}
+                WHERE e.content_tsv @@ q.query {and_conditions}
+            ) matched
+            ORDER BY rank
+            LIMIT $3
+        )"""
+    lexical = "true" if min_rank is None else f"text_rank >= {float(min_rank)}"
+    hits = f"SELECT id, rank, {lexical} AS lexical FROM text_hits"
+    if vector_param:
+        where = f"WHERE {conditions}" if conditions else ""
+        ctes += f""",
+        vector_hits AS MATERIALIZED (
+            SELECT id, row_number() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT id, embedding <=> {vector_param} AS distance
+                FROM embeddings
+                {where}
+                ORDER BY distance
+                LIMIT $3
+            ) nearest
+        )"""
+        hits += " UNION ALL SELECT id, rank, false FROM vector_hits"
+    return ctes + f""",
+        fused AS (
+            SELECT id, sum(1.0 / ($4 + rank)) AS score, bool_or(lexical) AS lexical
+            FROM ({hits}) hits
+            GROUP BY id
+        )"""
+
+
+def _filter_clause(
+    args: list,
+    source_types: list[str] | None = None,
+    tenant_id: str | None = None,
+    host: str | None = None,
+    severity: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+) -> str:
+    """Metadaten-Filter als AND-verknuepfte Bedingung ("" = keine); Werte werden an `args` angehaengt."""
+    conditions = []
+
+    def param(value) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if source_types:
+        # idx_embeddings_source
+        conditions.append(f"source_type = ANY({param(list(source_types))}::varchar[])")
+    if tenant_id:
+        # idx_embeddings_tenant
+        conditions.append(f"tenant_id = {param(tenant_id)}::uuid")
+    if host:
+        conditions.append(f"metadata->>'host' = {param(host)}")
+    if severity:
+        conditions.append(f"metadata->>'severity' = {param(severity)}")
+    if created_after:
+        conditions.append(f"created_at >= {param(_as_utc(created_after))}")
+    if created_before:
+        conditions.append(f"created_at < {param(_as_utc(created_before))}")
+    return " AND ".join(conditions)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Zeitangaben ohne Zeitzone als UTC interpretieren (created_at ist TIMESTAMPTZ)."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# Standardwert von hnsw.ef_search im Server
+_HNSW_DEFAULT_EF_SEARCH = 40
+
+
+async def _configure_scan(conn: asyncpg.Connection, limit: int, filtered: bool) -> None:
+    """HNSW-Parameter fuer die laufende Transaktion setzen (set_config(..., true) = SET LOCAL)."""
+    if settings.rag_ef_search > 0 or limit > _HNSW_DEFAULT_EF_SEARCH:
+        # ef_search < limit wuerde die Trefferzahl begrenzen
+        await conn.execute(
+            "SELECT set_config('hnsw.ef_search', $1, true)", str(max(settings.rag_ef_search, limit)),
+        )
+    if filtered and settings.rag_iterative_scan in ("relaxed_order", "strict_order"):
+        await conn.execute("SELECT set_config('hnsw.iterative_scan', $1, true)", settings.rag_iterative_scan)
+
 
 class PgvectorService:
-    """Synchroner pgvector-Client mit Connection-Pool fuer RAG-Suche und Embedding-Speicherung."""
+    """Asynchroner pgvector-Client mit Connection-Pool fuer RAG-Suche und Embedding-Speicherung."""
 
     def __init__(self):
-        self._pool = None
+        self._pool: asyncpg.Pool | None = None
 
-    def connect(self):
+    @staticmethod
+    async def _init_connection(conn: asyncpg.Connection):
+        """JSONB transparent als dict lesen und schreiben, vector binaer (NumPy)."""
+        await conn.set_type_codec(
+            "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog",
+        )
+        await register_vector(conn)
+
+    async def connect(self):
         """Connection-Pool zu pgvector herstellen."""
+        # Jobs laufen nebenlaeufig — ein Slot pro Job plus Reserve
+        max_size = max(5, settings.worker_concurrency + 1)
         try:
-            self._pool = psycopg2.pool.SimpleConnectionPool(
-                minconn=1,
-                maxconn=5,
-                dsn=settings.pgvector_dsn,
+            self._pool = await asyncpg.create_pool(
+                settings.pgvector_dsn,
+                min_size=1,
+                max_size=max_size,
+                command_timeout=30,
+                init=self._init_connection,
             )
-            logger.info("pgvector Connection-Pool hergestellt (min=1, max=5)")
+            logger.info("pgvector Connection-Pool hergestellt (min=1, max=%d)", max_size)
         except Exception as e:
             logger.error("pgvector-Verbindung fehlgeschlagen: %s", e)
             self._pool = None
 
-    def _get_conn(self):
-        """Verbindung aus Pool holen und vector-Extension registrieren."""
-        if not self._pool:
-            return None
-        conn = None
-        try:
-            conn = self._pool.getconn()
-            conn.autocommit = True
-            register_vector(conn)  # Muss fuer jede Connection aufgerufen werden
-            return conn
-        except Exception as e:
-            logger.error("pgvector Pool-Verbindung fehlgeschlagen: %s", e)
-            if conn is not None:
-                try:
-                    self._pool.putconn(conn)
-                except Exception:
-                    pass
-            return None
-
-    def _put_conn(self, conn):
-        """Verbindung zurueck in Pool geben."""
-        if self._pool and conn:
-            try:
-                self._pool.putconn(conn)
-            except Exception:
-                pass
-
-    def close(self):
+    async def close(self):
         if self._pool:
-            self._pool.closeall()
+            await self._pool.close()
             self._pool = None
             logger.info("pgvector Connection-Pool geschlossen")
 
-    def health_check(self) -> bool:
-        conn = self._get_conn()
-        if not conn:
+    async def health_check(self) -> bool:
+        if not self._pool:
             return False
         try:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1")
+            async with self._pool.acquire() as conn:
+                await conn.fetchval("SELECT 1")
             return True
         except Exception:
             return False
-        finally:
-            self._put_conn(conn)
 
-    def search_similar(
+    async def search_similar(
         self,
         query_embedding: list[float],
         limit: int = 5,
+        *,
+        source_types: list[str] | None = None,
+        tenant_id: str | None = None,
+        host: str | None = None,
+        severity: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        min_similarity: float | None = None,
     ) -> list[dict]:
-        """Aehnliche Embeddings via Cosine-Distance suchen."""
-        conn = self._get_conn()
-        if not conn:
+        """Aehnliche Embeddings via Cosine-Distance suchen (Filter in SQL, HNSW-Iterative-Scan).
+
+        Die Distanz wird je Kandidat einmal berechnet; die Schwelle
+        (Standard: RAG_SIMILARITY_THRESHOLD) wirkt als Distanz-Grenze auf die
+        top-k Kandidaten, damit der Index-Scan nicht nach weiteren Treffern sucht.
+        """
+        if not self._pool:
             return []
 
+        if min_similarity is None:
+            min_similarity = settings.rag_similarity_threshold
+        args: list = [_as_vector(query_embedding), limit, 1 - min_similarity]
+        conditions = _filter_clause(
+            args, source_types, tenant_id, host, severity, created_after, created_before,
+        )
+        where = f"WHERE {conditions}" if conditions else ""
+
         try:
-            embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, content, metadata, source_type,
-                           1 - (embedding <=> %s::vector) AS similarity
-                    FROM embeddings
-                    ORDER BY embedding <=> %s::vector
-                    LIMIT %s
+            async with self._pool.acquire() as conn, conn.transaction():
+                await _configure_scan(conn, limit, bool(where))
+                rows = await conn.fetch(
+                    f"""
+                    WITH candidates AS MATERIALIZED (
+                        SELECT id, content, metadata, source_type, source_id,
+                               embedding <=> $1 AS distance
+                        FROM embeddings
+                        {where}
+                        ORDER BY distance
+                        LIMIT $2
+                    )
+                    SELECT id, content, metadata, source_type, source_id, 1 - distance AS similarity
+                    FROM candidates
+                    WHERE distance <= $3
+                    ORDER BY distance
                     """,
-                    (embedding_str, embedding_str, limit),
+                    *args,
                 )
-                rows = cur.fetchall()
                 return [
                     {
-                        "id": row[0],
-                        "content": row[1],
-                        "metadata": row[2],
-                        "source_type": row[3],
-                        "similarity": float(row[4]),
+                        "id": row["id"],
+                        "content": row["content"],
+                        "metadata": row["metadata"],
+                        "source_type": row["source_type"],
+                        "source_id": row["source_id"],
+                        "similarity": float(row["similarity"]),
                     }
                     for row in rows
-                    if float(row[4]) >= settings.rag_similarity_threshold
                 ]
         except Exception as e:
             logger.error("RAG-Suche fehlgeschlagen: %s", e, exc_info=True)
             return []
-        finally:
-            self._put_conn(conn)
 
-    def store_embedding(
+    async def search_hybrid(
+        self,
+        query_text: str,
+        query_embedding: list[float] | None,
+        limit: int = 5,
+        *,
+        source_types: list[str] | None = None,
+        tenant_id: str | None = None,
+        host: str | None = None,
+        severity: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        min_similarity: float | None = None,
+    ) -> list[dict]:
+        """Volltext- und Vektor-Suche per Reciprocal Rank Fusion (RAG_SEARCH_MODE=hybrid/lexical).
+
+        Volltext-Treffer ab RAG_LEXICAL_MIN_RANK (ts_rank_cd) bleiben unabhaengig
+        von der Aehnlichkeitsschwelle im Ergebnis; alle anderen muessen sie
+        erreichen. Ohne `query_embedding` nur diese Volltext-Treffer (similarity = 0).
+        """
+        if not self._pool:
+            return []
+
+        if min_similarity is None:
+            min_similarity = settings.rag_similarity_threshold
+        candidates = max(limit, settings.rag_hybrid_candidates)
+        args: list = [limit, query_text, candidates, settings.rag_rrf_k]
+        vector_param = bound_param = None
+        if query_embedding:
+            args.extend([_as_vector(query_embedding), 1 - min_similarity])
+            vector_param, bound_param = f"${len(args) - 1}", f"${len(args)}"
+        conditions = _filter_clause(
+            args, source_types, tenant_id, host, severity, created_after, created_before,
+        )
+        if vector_param:
+            ranked = f"""
+                SELECT * FROM (
+                    SELECT e.id, e.content, e.metadata, e.source_type,
+                           e.embedding <=> {vector_param} AS distance, f.score, f.lexical
+                    FROM fused f JOIN embeddings e ON e.id = f.id
+                ) ranked
+                WHERE lexical OR distance <= {bound_param}
+            """
+        else:
+            ranked = """
+                SELECT e.id, e.content, e.metadata, e.source_type, 1.0 AS distance, f.score, f.lexical
+                FROM fused f JOIN embeddings e ON e.id = f.id
+                WHERE f.lexical
+            """
+        query = _hybrid_ctes(conditions, vector_param, settings.rag_lexical_min_rank) + f"""
+            SELECT id, content, metadata, source_type, 1 - distance AS similarity, score, lexical
+            FROM ({ranked}) hits
+            ORDER BY score DESC
+            LIMIT $1
+        """
+
+        try:
+            async with self._pool.acquire() as conn, conn.transaction():
+                await _configure_scan(conn, candidates, bool(conditions))
+                rows = await conn.fetch(query, *args)
+                return [
+                    {
+                        "id": row["id"],
+                        "content": row["content"],
+                        "metadata": row["metadata"],
+                        "source_type": row["source_type"],
+                        "similarity": float(row["similarity"]),
+                        "score": float(row["score"]),
+                        "lexical": row["lexical"],
+                    }
+                    for row in rows
+                ]
+        except Exception as e:
+            logger.error("Hybride RAG-Suche fehlgeschlagen: %s", e, exc_info=True)
+            return []
+
+    async def store_embedding(
         self,
         content: str,
         embedding: list[float],
@@ -128,45 +366,89 @@ class PgvectorService:
         metadata: dict | None = None,
     ) -> int | None:
         """Embedding in pgvector speichern (mit Content-Hash-Deduplizierung)."""
-        conn = self._get_conn()
-        if not conn:
+        if not self._pool:
             return None
 
         content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
 
         try:
-            embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-            with conn.cursor() as cur:
-                cur.execute(
+            async with self._pool.acquire() as conn:
+                row_id = await conn.fetchval(
                     """
                     INSERT INTO embeddings
                         (content, content_hash, embedding, source_type, source_id, metadata)
-                    VALUES (%s, %s, %s::vector, %s, %s, %s::jsonb)
+                    VALUES ($1, $2, $3, $4, $5, $6)
                     ON CONFLICT (content_hash, source_type)
                         WHERE content_hash IS NOT NULL
                     DO NOTHING
                     RETURNING id
                     """,
-                    (
-                        content,
-                        content_hash,
-                        embedding_str,
-                        source_type,
-                        source_id,
-                        json.dumps(metadata or {}),
-                    ),
+                    content,
+                    content_hash,
+                    _as_vector(embedding),
+                    source_type,
+                    source_id,
+                    metadata or {},
                 )
-                row = cur.fetchone()
-                if row is None:
+                if row_id is None:
                     logger.info("Embedding-Duplikat uebersprungen (Hash: %s...)", content_hash[:12])
-                return row[0] if row else None
+                return row_id
         except Exception as e:
             logger.error("Embedding-Speicherung fehlgeschlagen: %s", e, exc_info=True)
             return None
-        finally:
-            self._put_conn(conn)
 
-    def log_analysis(
+    async def store_embeddings(self, items: list[dict]) -> list[int | None] | None:
+        """Mehrere Embeddings per COPY + Merge speichern (Content-Hash-Deduplizierung).
+
+        `items` enthaelt je Eintrag content, embedding und optional source_type,
+        source_id, metadata. Rueckgabe positionsgleich zu `items`: neue ID oder
+        None (Duplikat, auch innerhalb des Batches); None bei Datenbankfehler.
+        """
+        if not self._pool:
+            return None
+        if not items:
+            return []
+
+        records = []
+        positions: list[int | None] = []
+        seen: set[tuple[str, str]] = set()
+        for item in items:
+            source_type = item.get("source_type") or "analysis"
+            content_hash = hashlib.sha256(item["content"].encode("utf-8")).hexdigest()
+            if (content_hash, source_type) in seen:
+                positions.append(None)
+                continue
+            seen.add((content_hash, source_type))
+            positions.append(len(records))
+            records.append((
+                len(records),
+                item["content"],
+                content_hash,
+                _as_vector(item["embedding"]),
+                source_type,
+                item.get("source_id"),
+                json.dumps(item.get("metadata") or {}),
+            ))
+
+        try:
+            async with self._pool.acquire() as conn, conn.transaction():
+                await conn.execute(_STAGING_DDL)
+                await conn.copy_records_to_table(
+                    "embeddings_staging", records=records, columns=_STAGING_COLUMNS,
+                )
+                rows = await conn.fetch(_MERGE_SQL)
+        except Exception as e:
+            logger.error("Bulk-Speicherung von %d Embeddings fehlgeschlagen: %s", len(records), e, exc_info=True)
+            return None
+
+        ids = {row["ord"]: row["id"] for row in rows}
+        result = [None if pos is None else ids.get(pos) for pos in positions]
+        duplicates = result.count(None)
+        if duplicates:
+            logger.info("Bulk-Speicherung: %d/%d Duplikate uebersprungen", duplicates, len(items))
+        return result
+
+    async def log_analysis(
         self,
         event_source: str,
         event_data: dict,
@@ -177,33 +459,28 @@ class PgvectorService:
         processing_time_ms: int | None = None,
     ):
         """Analyse-Ergebnis im Audit-Log speichern."""
-        conn = self._get_conn()
-        if not conn:
+        if not self._pool:
             return
 
         try:
-            with conn.cursor() as cur:
-                cur.execute(
+            async with self._pool.acquire() as conn:
+                await conn.execute(
                     """
                     INSERT INTO analysis_log
                         (event_source, event_data, analysis_result, confidence_score,
                          ticket_id, model_used, processing_time_ms)
-                    VALUES (%s, %s::jsonb, %s::jsonb, %s, %s, %s, %s)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
                     """,
-                    (
-                        event_source,
-                        json.dumps(event_data),
-                        json.dumps(analysis_result),
-                        confidence_score,
-                        ticket_id,
-                        model_used,
-                        processing_time_ms,
-                    ),
+                    event_source,
+                    event_data,
+                    analysis_result,
+                    confidence_score,
+                    ticket_id,
+                    model_used,
+                    processing_time_ms,
                 )
         except Exception as e:
             logger.error("Analyse-Log fehlgeschlagen: %s", e)
-        finally:
-            self._put_conn(conn)
 
 
 pgvector_service = PgvectorService()
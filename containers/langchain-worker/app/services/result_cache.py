@@ -0,0 +1,164 @@
+"""MCP v7 — Ergebnis-Cache fuer Alert-Analysen (geteilt ueber die Queue-Redis).
+
+Die Deduplizierung im Gateway verwirft nur exakt gleiche Alerts innerhalb von
+DEDUP_TTL_SECONDS. Flappende Alerts kommen danach erneut — der Worker
+uebernimmt dann eine frische Analyse statt das LLM erneut zu befragen:
+
+    1. Exakter Treffer ueber den Fingerprint aus source, host, severity und der
+       normalisierten Beschreibung (Zeitstempel, UUIDs, Hex-IDs sowie Messwerte
+       mit Prozentzeichen oder Einheit werden durch Platzhalter ersetzt; IP-Adressen
+       und Versionsnummern bleiben erhalten)
+    2. Optional (RESULT_CACHE_SIMILARITY > 0): Cosine-Aehnlichkeit des
+       Beschreibungs-Embeddings gegen die letzten Analysen mit gleicher
+       Quelle, gleichem Host und gleicher Severity
+
+Eintraege verfallen nach RESULT_CACHE_TTL Sekunden (Frische-Fenster).
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import re
+import time
+
+import numpy as np
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.metrics import RESULT_CACHE
+
+logger = logging.getLogger("mcp-langchain-worker")
+
+ENTRY_PREFIX = "mcp:resultcache:"
+RECENT_PREFIX = "mcp:resultcache:recent:"
+
+_VOLATILE = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(:\d{2})?(\.\d+)?(z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}\b"), "<time>"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b(0x)?[0-9a-f]{12,}\b"), "<hex>"),
+    (re.compile(r"(?<![\w.])\d+(?:[.,]\d+)?\s*%"), "<pct>"),
+    # Nur Messwerte mit Einheit — Zahlen ohne Einheit koennen IPs, Ports oder Versionen sein
+    (re.compile(r"(?<![\w.])\d+(?:[.,]\d+)?\s*(?:[kmgt]i?b|b|ms|s|sec|min|h|°c)(?![\w.])"), "<num>"),
+]
+
+
+def normalize_description(description: str) -> str:
+    """Beschreibung von wechselnden Anteilen befreien (Kleinschreibung, Platzhalter, Leerraum)."""
+    text = description.lower()
+    for pattern, placeholder in _VOLATILE:
+        text = pattern.sub(placeholder, text)
+    return " ".join(text.split())
+
+
+def alert_fingerprint(job_data: dict) -> str:
+    """Fingerprint eines Alerts fuer den exakten Cache-Treffer."""
+    parts = (
+        job_data.get("source", ""),
+        job_data.get("host", ""),
+        job_data.get("severity", ""),
+        normalize_description(job_data.get("description", "")),
+    )
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Frische Analyse-Ergebnisse nach Fingerprint bzw. Embedding-Aehnlichkeit wiederverwenden."""
+
+    @property
+    def enabled(self) -> bool:
+        return settings.result_cache_ttl > 0
+
+    @property
+    def similarity_enabled(self) -> bool:
+        return self.enabled and settings.result_cache_similarity > 0
+
+    @staticmethod
+    def _recent_key(job_data: dict) -> str:
+        # Severity im Key: ein critical-Alert darf keine Analyse eines warning-Alerts erben
+        return (
+            f"{RECENT_PREFIX}{job_data.get('source', '')}:{job_data.get('host', '')}"
+            f":{job_data.get('severity', '')}"
+        )
+
+    async def get(self, r: aioredis.Redis, job_data: dict, embedding: list[float] | None = None) -> dict | None:
+        """Gecachten Eintrag liefern (analysis, model_used, job_id, ticket_id) oder None."""
+        if not self.enabled:
+            return None
+        try:
+            raw = await r.get(f"{ENTRY_PREFIX}{alert_fingerprint(job_data)}")
+            if raw:
+                RESULT_CACHE.labels(result="hit_exact").inc()
+                return json.loads(raw)
+            if embedding and self.similarity_enabled:
+                entry = await self._get_similar(r, job_data, embedding)
+                if entry is not None:
+                    RESULT_CACHE.labels(result="hit_similar").inc()
+                    return entry
+        except Exception as e:
+            logger.warning("Ergebnis-Cache nicht lesbar: %s", e)
+        RESULT_CACHE.labels(result="miss").inc()
+        return None
+
+    async def _get_similar(self, r: aioredis.Redis, job_data: dict, embedding: list[float]) -> dict | None:
+        recent_key = self._recent_key(job_data)
+        min_score = time.time() - settings.result_cache_ttl
+        fingerprints = await r.zrevrangebyscore(
+            recent_key, "+inf", min_score, start=0, num=settings.result_cache_similar_candidates,
+        )
+        if not fingerprints:
+            return None
+        raws = await r.mget([f"{ENTRY_PREFIX}{fp}" for fp in fingerprints])
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        best, best_similarity = None, settings.result_cache_similarity
+        for raw in raws:
+            if not raw:
+                continue
+            entry = json.loads(raw)
+            if not entry.get("embedding"):
+                continue
+            candidate = np.frombuffer(base64.b64decode(entry["embedding"]), dtype="<f4")
+            if candidate.shape != query.shape:
+                continue
+            similarity = float(query @ candidate / (np.linalg.norm(candidate) or 1.0))
+            if similarity >= best_similarity:
+                best, best_similarity = entry, similarity
+        if best is not None:
+            logger.info("Ergebnis-Cache: aehnliche Analyse %s (Aehnlichkeit %.3f)", best.get("job_id"), best_similarity)
+        return best
+
+    async def put(
+        self,
+        r: aioredis.Redis,
+        job_data: dict,
+        entry: dict,
+        embedding: list[float] | None = None,
+    ) -> None:
+        """Analyse-Ergebnis fuer RESULT_CACHE_TTL Sekunden ablegen."""
+        if not self.enabled:
+            return
+        fingerprint = alert_fingerprint(job_data)
+        if embedding and self.similarity_enabled:
+            entry = {
+                **entry,
+                "embedding": base64.b64encode(np.asarray(embedding, dtype="<f4").tobytes()).decode("ascii"),
+            }
+        now = time.time()
+        recent_key = self._recent_key(job_data)
+        try:
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.set(f"{ENTRY_PREFIX}{fingerprint}", json.dumps(entry, ensure_ascii=False),
+                         ex=settings.result_cache_ttl)
+                if self.similarity_enabled:
+                    pipe.zadd(recent_key, {fingerprint: now})
+                    pipe.zremrangebyscore(recent_key, "-inf", now - settings.result_cache_ttl)
+                    pipe.expire(recent_key, settings.result_cache_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Ergebnis-Cache nicht schreibbar: %s", e)
+
+
+result_cache = ResultCache()
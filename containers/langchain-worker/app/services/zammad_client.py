@@ -1,7 +1,7 @@
-"""MCP v7 — Zammad Ticket-Client (synchron, fuer den Worker) mit Retry."""
+"""MCP v7 — Zammad Ticket-Client (async, fuer den Worker) mit Retry."""
 
+import asyncio
 import logging
-import time
 
 import httpx
 
@@ -11,17 +11,17 @@ logger = logging.getLogger("mcp-langchain-worker")
 
 
 class ZammadClient:
-    """Synchroner Zammad-Client fuer Ticket-Erstellung mit Retry-Logik."""
+    """Asynchroner Zammad-Client fuer Ticket-Erstellung mit Retry-Logik."""
 
     def __init__(self):
-        self._client = httpx.Client(
+        self._client = httpx.AsyncClient(
             base_url=settings.zammad_url,
             timeout=15.0,
         )
 
-    def close(self):
+    async def close(self):
         """HTTP-Client schliessen."""
-        self._client.close()
+        await self._client.aclose()
 
     def _get_headers(self) -> dict:
         """Auth-Headers lazy erstellen (Token kann sich zur Laufzeit aendern)."""
@@ -30,7 +30,7 @@ class ZammadClient:
             "Content-Type": "application/json",
         }
 
-    def create_ticket(
+    async def create_ticket(
         self,
         title: str,
         body: str,
@@ -45,7 +45,7 @@ class ZammadClient:
 
         for attempt in range(3):
             try:
-                resp = self._client.post(
+                resp = await self._client.post(
                     "/api/v1/tickets",
                     headers=self._get_headers(),
                     json={
@@ -72,12 +72,12 @@ class ZammadClient:
                 if attempt == 2:
                     logger.error("Zammad-Ticket-Erstellung endgueltig fehlgeschlagen nach 3 Versuchen")
                     return None
-                time.sleep(wait)
+                await asyncio.sleep(wait)
             except httpx.HTTPStatusError as e:
                 if e.response.status_code >= 500 and attempt < 2:
                     wait = 2 ** (attempt + 1)
                     logger.warning("Zammad HTTP %d Versuch %d — Retry in %ds", e.response.status_code, attempt + 1, wait)
-                    time.sleep(wait)
+                    await asyncio.sleep(wait)
                     continue
                 logger.error("Zammad HTTP-Fehler %d: %s", e.response.status_code, e)
                 return None
@@ -0,0 +1,208 @@
+"""MCP v7 — Vorab-Triage: entscheidet vor der vollen LLM-Analyse, ob sie noetig ist.
+
+Entscheidungen (decision):
+    full     volle Analyse mit PRIMARY_MODEL (Standard)
+    reuse    Analyse des naechsten Nachbarn aus der RAG-Wissensbasis uebernehmen
+    summary  kurze Zusammenfassung ohne volle Analyse (Impact Gering, Confidence
+             Low — should_create_ticket legt dafuer kein Ticket an)
+
+Stufen, jeweils nur so weit noetig:
+    1. Regeln: Severity in TRIAGE_FULL_SEVERITIES → full. Severity in
+       TRIAGE_SUMMARY_SEVERITIES oder Quelle in TRIAGE_SUMMARY_SOURCES macht den
+       Alert zum Kandidaten fuer summary.
+    2. Nachbar (TRIAGE_REUSE_SIMILARITY > 0): fruehere Analyse mit gleichem Host,
+       gleicher Quelle und Severity und mindestens dieser Aehnlichkeit → reuse.
+       Analyse und Ticket stammen aus dem Job-Hash des frueheren Jobs (7 Tage
+       verfuegbar).
+    3. Kandidaten fuer summary: mit TRIAGE_MODEL bewertet ein kleines Modell den
+       Alert und kann ihn eskalieren (→ full), sonst regelbasierte Zusammenfassung.
+
+Die eingesparte LLM-Zeit wird gegen die mittlere Dauer der vollen Analysen
+dieses Workers geschaetzt (bis zum ersten Messwert TRIAGE_ASSUMED_ANALYSIS_SECONDS).
+"""
+
+import json
+import logging
+import time
+
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.json_stream import repair_json
+from app.metrics import TRIAGE, TRIAGE_SAVED_SECONDS
+from app.services.llm_client import llm_client
+from app.services.pgvector_service import pgvector_service
+
+logger = logging.getLogger("mcp-langchain-worker")
+
+TRIAGE_PROMPT = """Bewerte den folgenden Monitoring-Alert.
+Antworte nur mit JSON: {{"escalate": true oder false, "summary": "<ein Satz auf Deutsch>"}}
+escalate = true, wenn der Alert auf einen Ausfall, einen Sicherheitsvorfall oder
+Datenverlust hindeutet und eine ausfuehrliche Analyse braucht.
+
+Quelle: {source}
+Host: {host}
+Severity: {severity}
+Beschreibung: {description}"""
+
+_TRIAGE_KEYS = ("escalate", "summary")
+_TRIAGE_SCHEMA = {
+    "type": "object",
+    "properties": {"escalate": {"type": "boolean"}, "summary": {"type": "string"}},
+    "required": list(_TRIAGE_KEYS),
+    "additionalProperties": False,
+}
+
+# Nachbar-Kandidaten (gleicher Host) fuer die Pruefung der Quelle
+_NEIGHBOUR_CANDIDATES = 3
+
+# Gleitender Mittelwert der Dauer voller Analysen (Sekunden), Basis der Einsparung
+_ANALYSIS_SMOOTHING = 0.2
+_analysis_seconds: float | None = None
+
+
+def _split(value: str) -> set[str]:
+    return {item.strip().lower() for item in value.split(",") if item.strip()}
+
+
+def record_analysis(seconds: float) -> None:
+    """Dauer einer vollen LLM-Analyse in den gleitenden Mittelwert aufnehmen."""
+    global _analysis_seconds
+    if _analysis_seconds is None:
+        _analysis_seconds = seconds
+    else:
+        _analysis_seconds += _ANALYSIS_SMOOTHING * (seconds - _analysis_seconds)
+
+
+def _decide(decision: str, stage: str, started: float, **details) -> dict:
+    """Entscheidung zaehlen und bei reuse/summary die eingesparte LLM-Zeit verbuchen."""
+    TRIAGE.labels(decision=decision, stage=stage).inc()
+    if decision != "full":
+        expected = settings.triage_assumed_analysis_seconds if _analysis_seconds is None else _analysis_seconds
+        TRIAGE_SAVED_SECONDS.labels(decision=decision).inc(max(0.0, expected - (time.monotonic() - started)))
+    return {"decision": decision, "stage": stage, **details}
+
+
+def summary_analysis(job_data: dict, summary: str, reason: str) -> dict:
+    """Kurzes Ergebnis im Format der vollen Analyse (ohne Ticket)."""
+    description = job_data.get("description", "")
+    return {
+        "root_cause": summary or description[:300] or "Keine Beschreibung",
+        "impact": "Gering",
+        "affected_services": [],
+        "immediate_action": "Keine — nur zur Kenntnis",
+        "long_term_solution": "",
+        "confidence": "Low",
+        "confidence_reason": f"Vorab-Triage: {reason}",
+        "ticket_title": f"[AI] {description[:60] or 'Alert'}",
+        "ticket_priority": "1_low",
+    }
+
+
+async def _neighbour(r: aioredis.Redis, job_data: dict, query_embedding: list[float]) -> dict | None:
+    """Analyse des naechsten frueheren Alerts desselben Hosts und derselben Quelle oder None.
+
+    Nur so passen Ursache und referenziertes Ticket zum neuen Alert.
+    """
+    host = job_data.get("host")
+    if not host:
+        return None
+    neighbours = await pgvector_service.search_similar(
+        query_embedding,
+        limit=_NEIGHBOUR_CANDIDATES,
+        source_types=["analysis"],
+        host=host,
+        severity=job_data.get("severity") or None,
+        min_similarity=settings.triage_reuse_similarity,
+    )
+    # Die Quelle steht wie der Host in metadata; _filter_clause kennt dafuer keinen Filter
+    neighbour = next((
+        n for n in neighbours
+        if n.get("source_id") and (n.get("metadata") or {}).get("source") == job_data.get("source")
+    ), None)
+    if neighbour is None:
+        return None
+    source_job = neighbour["source_id"]
+    result, model_used, ticket_id = await r.hmget(
+        f"mcp:job:{source_job}", ["result", "model_used", "ticket_id"],
+    )
+    if not result:
+        return None
+    logger.info("Vorab-Triage: Analyse von Job %s uebernommen (Aehnlichkeit %.3f)",
+                source_job, neighbour["similarity"])
+    return {
+        "analysis": json.loads(result),
+        "model_used": model_used or "",
+        "ticket_id": ticket_id or "",
+        "source_job": source_job,
+    }
+
+
+async def _ask_model(job_data: dict) -> dict | None:
+    """Kleines Modell (TRIAGE_MODEL) urteilen lassen: {"escalate", "summary"} oder None."""
+    prompt = TRIAGE_PROMPT.format(
+        source=job_data.get("source", "unknown"),
+        host=job_data.get("host", "unknown"),
+        severity=job_data.get("severity", "warning"),
+        description=job_data.get("description", "")[:1000],
+    )
+    result = await llm_client.generate(
+        prompt,
+        json_keys=_TRIAGE_KEYS,
+        json_schema=_TRIAGE_SCHEMA if settings.llm_structured_output else None,
+        model=settings.triage_model,
+    )
+    verdict = result.get("parsed") or repair_json(result.get("response", ""))
+    return verdict if isinstance(verdict, dict) else None
+
+
+async def triage(
+    r: aioredis.Redis,
+    job_data: dict,
+    query_embedding: list[float],
+    rag_available: bool,
+) -> dict:
+    """Entscheidung fuer einen Analyse-Job: {"decision", "stage", ...}.
+
+    Bei reuse und summary zusaetzlich "analysis" und "model_used", bei reuse
+    "source_job" und "ticket_id" (Ticket wird referenziert, nicht neu angelegt).
+    Fehler fuehren zur vollen Analyse.
+    """
+    if not settings.triage_enabled:
+        return {"decision": "full", "stage": "disabled"}
+    started = time.monotonic()
+    severity = job_data.get("severity", "").lower()
+    source = job_data.get("source", "").lower()
+    if severity in _split(settings.triage_full_severities):
+        return _decide("full", "rules", started)
+
+    if settings.triage_reuse_similarity > 0 and rag_available and query_embedding:
+        try:
+            neighbour = await _neighbour(r, job_data, query_embedding)
+        except Exception as e:
+            logger.warning("Vorab-Triage: Nachbar-Suche fehlgeschlagen: %s", e)
+            neighbour = None
+        if neighbour is not None:
+            return _decide("reuse", "neighbour", started, **neighbour)
+
+    if severity not in _split(settings.triage_summary_severities) and \
+            source not in _split(settings.triage_summary_sources):
+        return _decide("full", "rules", started)
+
+    if not settings.triage_model:
+        analysis = summary_analysis(job_data, "", f"Severity {severity or '?'}, Quelle {source or '?'}")
+        return _decide("summary", "rules", started, analysis=analysis, model_used="")
+
+    try:
+        verdict = await _ask_model(job_data)
+    except Exception as e:
+        logger.warning("Vorab-Triage: %s nicht erreichbar, volle Analyse: %s", settings.triage_model, e)
+        return _decide("full", "model", started)
+    escalate = True if verdict is None else verdict.get("escalate", True)
+    if escalate is True or str(escalate).lower() == "true":
+        logger.info("Vorab-Triage: %s eskaliert den Alert", settings.triage_model)
+        return _decide("full", "model", started)
+    analysis = summary_analysis(
+        job_data, str(verdict.get("summary") or ""), f"{settings.triage_model} sieht keinen Handlungsbedarf",
+    )
+    return _decide("summary", "model", started, analysis=analysis, model_used=settings.triage_model)
@@ -3,29 +3,58 @@ MCP v7 — LangChain Worker
 Verarbeitet AI-Analyse-Jobs aus der Redis-Queue.
 
 Vollstaendige Pipeline:
-    1. Job aus mcp:queue:analyze poppen
-    2. RAG-Suche in pgvector fuer aehnliche Incidents
-    3. Professionellen Prompt laden und befuellen
-    4. LLM-Analyse via LiteLLM (Fallback: Ollama)
-    5. Zammad-Ticket erstellen (bei hoher Severity + Confidence)
-    6. ntfy-Benachrichtigung senden
-    7. Ergebnis in Redis speichern + Embedding fuer zukuenftige RAG
+    1. Job aus mcp:queue:analyze:<severity> holen (gewichtet fair, LMOVE in die
+       Processing-Liste des Workers)
+    2. Ergebnis-Cache: frische Analyse desselben Alert-Fingerprints (optional:
+       sehr aehnlicher Beschreibung) wiederverwenden, dann weiter mit 6.
+    3. Vorab-Triage (siehe app.triage): Regeln, RAG-Nachbar, optional kleines
+       Modell — Analyse eines frueheren Alerts uebernehmen oder kurze
+       Zusammenfassung (dann weiter mit 6.), sonst volle Analyse
+    4. RAG-Suche in pgvector fuer aehnliche Incidents, Prompt laden und befuellen
+    5. LLM-Analyse via LiteLLM (Fallback: Ollama), gestreamt mit Zwischenstand
+       (partial_response, ttft_ms) im Job-Hash
+    6. Zammad-Ticket erstellen (bei hoher Severity + Confidence)
+    7. ntfy-Benachrichtigung senden
+    8. Ergebnis in Redis speichern + Embedding fuer zukuenftige RAG
+
+Jobs mit type=ingest (POST /api/v1/ingest?background=true) werden statt
+dessen eingebettet und gespeichert (siehe app.ingest).
+
+Nebenlaeufigkeit: Bis zu WORKER_CONCURRENCY Jobs laufen gleichzeitig als
+asyncio-Tasks in einer Event-Loop. Neue Jobs werden erst aus der Queue geholt,
+wenn ein Slot frei ist — verbleibende Jobs bleiben in Redis und stehen anderen
+Workern zur Verfuegung. LLM- und Embedding-Aufrufe sind zusaetzlich im
+LLMClient auf LLM_MAX_CONCURRENCY bzw. EMBED_MAX_CONCURRENCY begrenzt.
+
+Zuverlaessigkeit: Jeder laufende Job haelt eine Lease (Visibility-Timeout),
+die per Heartbeat verlaengert wird. Ein Reaper stellt Jobs abgestuerzter
+Worker zurueck in die Queue (siehe app.services.job_queue).
 """
 
+import asyncio
 import json
 import logging
 import signal
 import sys
 import time
+from datetime import datetime, timedelta, timezone
 
 import redis
+import redis.asyncio as aioredis
 
 from app.config import settings
-from app.prompts import build_prompt
+from app.ingest import process_ingest_job
+from app.json_stream import repair_json
+from app.metrics import LLM_RESPONSES, PROMPT_TOKENS, WORKER_READY, start_metrics_server
+from app.prompts import build_prompt, estimate_tokens, format_keys, format_schema, system_prompt
+from app.services.embedding_cache import embedding_cache
+from app.services.job_queue import job_queue
 from app.services.llm_client import llm_client
 from app.services.ntfy_client import ntfy_client
 from app.services.pgvector_service import pgvector_service
+from app.services.result_cache import result_cache
 from app.services.zammad_client import zammad_client
+from app.triage import record_analysis, triage
 
 logging.basicConfig(
     level=logging.INFO,
@@ -36,20 +65,19 @@ logger = logging.getLogger("mcp-langchain-worker")
 # Graceful Shutdown
 _running = True
 
+# Aktueller Redis-Client; nach einem Reconnect ersetzt, damit Reaper und Heartbeats mitwechseln
+_redis: aioredis.Redis | None = None
 
-def signal_handler(_sig, _frame):
+
+def signal_handler():
     global _running
-    logger.info("Shutdown-Signal empfangen — beende aktuellen Job...")
+    logger.info("Shutdown-Signal empfangen — beende laufende Jobs...")
     _running = False
 
 
-signal.signal(signal.SIGTERM, signal_handler)
-signal.signal(signal.SIGINT, signal_handler)
-
-
-def get_redis() -> redis.Redis:
-    """Redis-Verbindung erstellen."""
-    return redis.Redis(
+def get_redis() -> aioredis.Redis:
+    """Async Redis-Verbindung erstellen."""
+    return aioredis.Redis(
         host=settings.redis_queue_host,
         port=settings.redis_queue_port,
         password=settings.redis_queue_password or None,
@@ -60,8 +88,12 @@ def get_redis() -> redis.Redis:
     )
 
 
-def parse_llm_response(response_text: str) -> dict:
-    """JSON aus LLM-Antwort extrahieren (mit Fallback)."""
+# Fallback-Ergebnisse werden nicht im Ergebnis-Cache abgelegt
+PARSE_FAILED_REASON = "JSON-Parsing fehlgeschlagen"
+
+
+def parse_llm_response(response_text: str, model: str = "") -> dict:
+    """JSON aus LLM-Antwort extrahieren (mit einem Reparaturversuch und Fallback)."""
     text = response_text.strip()
 
     # JSON aus Markdown-Codeblock extrahieren
@@ -70,9 +102,20 @@ def parse_llm_response(response_text: str) -> dict:
     elif "```" in text:
         text = text.split("```")[1].split("```")[0].strip()
 
+    outcome = "ok"
     try:
-        return json.loads(text)
+        analysis = json.loads(text)
     except json.JSONDecodeError:
+        analysis = None
+    if not isinstance(analysis, dict):
+        outcome = "repaired"
+        analysis = repair_json(response_text)
+    if analysis is None:
+        outcome = "failed"
+    _count_llm_response(model, outcome)
+
+    if analysis is None:
+        logger.warning("LLM-Antwort nicht als JSON lesbar — Fallback-Ergebnis")
         return {
             "root_cause": response_text[:300],
             "impact": "Mittel",
@@ -80,10 +123,22 @@ def parse_llm_response(response_text: str) -> dict:
             "immediate_action": "Manuelle Analyse erforderlich",
             "long_term_solution": "",
             "confidence": "Low",
-            "confidence_reason": "JSON-Parsing fehlgeschlagen",
+            "confidence_reason": PARSE_FAILED_REASON,
             "ticket_title": "[AI] Manuelle Analyse erforderlich",
             "ticket_priority": "2_normal",
         }
+    if outcome == "repaired":
+        logger.info("LLM-Antwort war kein gueltiges JSON — Reparatur erfolgreich")
+    return analysis
+
+
+def _count_llm_response(model: str, outcome: str) -> None:
+    """Parse-Ergebnis je Modell zaehlen (Basis fuer die Parse-Fehlerrate)."""
+    LLM_RESPONSES.labels(
+        model=model or settings.primary_model,
+        mode="schema" if settings.llm_structured_output else "prompt",
+        outcome=outcome,
+    ).inc()
 
 
 # Prioritaet-Mapping (konfigurierbar)
@@ -111,67 +166,194 @@ def should_create_ticket(analysis: dict, severity: str) -> bool:
     return high_confidence and high_severity
 
 
-def process_job(r: redis.Redis, job_id: str) -> None:
-    """Einen Analyse-Job vollstaendig verarbeiten."""
-    start_time = time.monotonic()
-    logger.info("Verarbeite Job: %s", job_id)
-
-    # 1. Job-Daten aus Redis holen
-    job_data = r.hgetall(f"mcp:job:{job_id}")
-    if not job_data:
-        logger.warning("Job %s nicht gefunden — ueberspringe", job_id)
-        return
-
-    # Status aktualisieren
-    r.hset(f"mcp:job:{job_id}", mapping={"status": "processing"})
-
-    # 2. RAG-Suche: aehnliche Incidents finden
+async def _analyze(
+    r: aioredis.Redis,
+    job_id: str,
+    job_data: dict,
+    query_embedding: list[float],
+    rag_available: bool,
+) -> tuple[dict, dict, list[dict]] | None:
+    """RAG-Kontext, Prompt und LLM-Analyse; None, wenn der Job als failed markiert wurde."""
+    # 4. RAG-Suche: aehnliche Incidents finden (RAG_SEARCH_MODE: vector, hybrid, lexical)
     rag_results = []
     try:
+        max_age = settings.rag_max_age_days
+        filters = {
+            "source_types": [t.strip() for t in settings.rag_source_types.split(",") if t.strip()],
+            "tenant_id": settings.rag_tenant_id or None,
+            "created_after": datetime.now(timezone.utc) - timedelta(days=max_age) if max_age else None,
+        }
         description = job_data.get("description", "")
-        if description and pgvector_service.health_check():
-            query_embedding = llm_client.embed(description)
-            if query_embedding:
-                rag_results = pgvector_service.search_similar(
-                    query_embedding, limit=settings.rag_top_k
-                )
-                if rag_results:
-                    logger.info(
-                        "RAG: %d aehnliche Incidents gefunden (beste Aehnlichkeit: %.2f)",
-                        len(rag_results),
-                        rag_results[0]["similarity"],
-                    )
+        if rag_available and description and settings.rag_search_mode in ("hybrid", "lexical"):
+            rag_results = await pgvector_service.search_hybrid(
+                description,
+                query_embedding if settings.rag_search_mode == "hybrid" else None,
+                limit=settings.rag_top_k,
+                **filters,
+            )
+        elif rag_available and query_embedding:
+            rag_results = await pgvector_service.search_similar(
+                query_embedding, limit=settings.rag_top_k, **filters,
+            )
+        if rag_results:
+            logger.info(
+                "RAG: %d aehnliche Incidents gefunden (beste Aehnlichkeit: %.2f)",
+                len(rag_results),
+                rag_results[0]["similarity"],
+            )
     except Exception as e:
         logger.warning("RAG-Suche fehlgeschlagen, fahre ohne Kontext fort: %s", e)
 
-    # 3. Professionellen Prompt laden und befuellen
+    # Professionellen Prompt laden und befuellen (Token-Budget: PROMPT_TOKEN_BUDGET)
     prompt = build_prompt(job_data, rag_results)
+    PROMPT_TOKENS.observe(estimate_tokens((system_prompt() or "") + prompt))
+
+    # 5. LLM-Analyse (LiteLLM-First, Ollama-Fallback), Zwischenstand im Job-Hash
+    async def report_progress(partial: str, ttft_ms: int) -> None:
+        try:
+            await r.hset(f"mcp:job:{job_id}", mapping={
+                "partial_response": partial,
+                "ttft_ms": str(ttft_ms),
+            })
+        except redis.RedisError as e:
+            logger.warning("Zwischenstand fuer Job %s nicht gespeichert: %s", job_id, e)
 
-    # 4. LLM-Analyse (LiteLLM-First, Ollama-Fallback)
     try:
-        llm_result = llm_client.generate(prompt)
+        llm_result = await llm_client.generate(
+            prompt,
+            system=system_prompt(),
+            on_progress=report_progress,
+            json_keys=format_keys(),
+            json_schema=format_schema() if settings.llm_structured_output else None,
+        )
         response_text = llm_result.get("response", "")
         model_used = llm_result.get("model", settings.primary_model)
         via = llm_result.get("via", "unknown")
-        logger.info("LLM-Antwort erhalten via %s (%s)", via, model_used)
+        logger.info(
+            "LLM-Antwort erhalten via %s (%s)%s", via, model_used,
+            " — Generierung nach vollstaendigem JSON beendet" if llm_result.get("parsed") else "",
+        )
     except Exception as e:
         logger.error("LLM-Analyse fehlgeschlagen: %s", e, exc_info=True)
-        r.hset(f"mcp:job:{job_id}", mapping={
-            "status": "failed",
+        await job_queue.set_status(r, job_id, "failed", {
             "error": str(e)[:500],
             "completed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         })
+        # Abgebrochener Zwischenstand gehoert nicht zum fehlgeschlagenen Job
+        await r.hdel(f"mcp:job:{job_id}", "partial_response")
+        return None
+
+    # 6. JSON aus Antwort parsen (bei vorzeitig beendeter Generierung bereits geparst)
+    if llm_result.get("parsed"):
+        analysis = llm_result["parsed"]
+        _count_llm_response(model_used, "ok")
+    else:
+        analysis = parse_llm_response(response_text, model_used)
+    return analysis, llm_result, rag_results
+
+
+async def _store_analysis(job_id: str, job_data: dict, analysis: dict, ticket_id: str | None) -> None:
+    """Zusammenfassung von Alert und Analyse einbetten und als RAG-Kontext speichern."""
+    summary = (
+        f"Alert von {job_data.get('source', 'unknown')} auf {job_data.get('host', 'unknown')}: "
+        f"{job_data.get('description', '')} — "
+        f"Ursache: {analysis.get('root_cause', 'N/A')} — "
+        f"Massnahme: {analysis.get('immediate_action', 'N/A')}"
+    )
+    embedding = await llm_client.embed(summary)
+    if embedding:
+        await pgvector_service.store_embedding(
+            content=summary,
+            embedding=embedding,
+            source_type="analysis",
+            source_id=job_id,
+            metadata={
+                "source": job_data.get("source"),
+                "host": job_data.get("host"),
+                "severity": job_data.get("severity", "warning"),
+                "impact": analysis.get("impact", "Mittel"),
+                "confidence": analysis.get("confidence"),
+                "ticket_id": ticket_id,
+            },
+        )
+
+
+async def process_job(r: aioredis.Redis, job_id: str) -> None:
+    """Einen Analyse-Job vollstaendig verarbeiten."""
+    start_time = time.monotonic()
+    logger.info("Verarbeite Job: %s", job_id)
+
+    # 1. Job-Daten aus Redis holen
+    job_data = await r.hgetall(f"mcp:job:{job_id}")
+    if not job_data:
+        logger.warning("Job %s nicht gefunden — ueberspringe", job_id)
+        return
+    if job_data.get("type") == "ingest":
+        try:
+            await process_ingest_job(r, job_id, job_data)
+        except Exception as e:
+            logger.error("Ingest-Job %s fehlgeschlagen: %s", job_id, e, exc_info=True)
+            await job_queue.set_status(r, job_id, "failed", {
+                "error": str(e)[:500],
+                "completed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            })
         return
 
-    # 5. JSON aus Antwort parsen
-    analysis = parse_llm_response(response_text)
+    # Status aktualisieren
+    await job_queue.set_status(r, job_id, "processing")
+
+    # Beschreibung einbetten (fuer RAG-Suche und Aehnlichkeits-Lookup im Ergebnis-Cache)
+    description = job_data.get("description", "")
+    query_embedding: list[float] = []
+    rag_available = await pgvector_service.health_check()
+    # Im Modus lexical brauchen nur der Aehnlichkeits-Lookup des Ergebnis-Caches und die
+    # Nachbar-Stufe der Vorab-Triage ein Embedding
+    needs_embedding = result_cache.similarity_enabled or (
+        rag_available and (settings.rag_search_mode != "lexical" or settings.triage_reuse_similarity > 0)
+    )
+    if description and needs_embedding:
+        try:
+            query_embedding = await llm_client.embed(description)
+        except Exception as e:
+            logger.warning("Embedding der Beschreibung fehlgeschlagen: %s", e)
+
+    # 2. Ergebnis-Cache: flappende Alerts kosten einen Lookup statt einer Inferenz
+    cached = await result_cache.get(r, job_data, query_embedding)
+    # 3. Vorab-Triage: volle Analyse, Analyse eines frueheren Alerts oder kurze Zusammenfassung
+    triaged = None if cached is not None else await triage(r, job_data, query_embedding, rag_available)
+    llm_result: dict = {}
+    rag_results: list[dict] = []
+    if cached is not None:
+        analysis = cached["analysis"]
+        model_used = cached.get("model_used") or settings.primary_model
+        logger.info("Analyse aus Ergebnis-Cache uebernommen (Job %s)", cached.get("job_id", "?"))
+    elif triaged["decision"] != "full":
+        analysis = triaged["analysis"]
+        model_used = triaged["model_used"]
+        logger.info("Vorab-Triage: %s (%s) — keine volle Analyse", triaged["decision"], triaged["stage"])
+    else:
+        analyzed = await _analyze(r, job_id, job_data, query_embedding, rag_available)
+        if analyzed is None:
+            return
+        analysis, llm_result, rag_results = analyzed
+        model_used = llm_result.get("model", settings.primary_model)
+        if llm_result.get("latency_ms"):
+            record_analysis(llm_result["latency_ms"] / 1000)
+    # Nur frische volle Analysen gehen in Ergebnis-Cache und Wissensbasis
+    analyzed_now = triaged is not None and triaged["decision"] == "full"
 
     elapsed_ms = int((time.monotonic() - start_time) * 1000)
 
-    # 6. Zammad-Ticket erstellen (bei hoher Severity + Confidence)
+    # 7. Zammad-Ticket erstellen (bei hoher Severity + Confidence)
     ticket_id = None
     severity = job_data.get("severity", "warning")
-    if should_create_ticket(analysis, severity):
+    if cached is not None:
+        # Ticket des urspruenglichen Jobs referenzieren statt ein Duplikat anzulegen
+        ticket_id = cached.get("ticket_id") or None
+    elif triaged["decision"] == "reuse":
+        # Gleicher Vorfall wie beim Nachbarn: dessen Ticket referenzieren
+        ticket_id = triaged.get("ticket_id") or None
+    elif should_create_ticket(analysis, severity):
         ticket_title = analysis.get("ticket_title", f"[AI] {job_data.get('description', 'Alert')[:60]}")
         ticket_body = (
             f"<h2>{ticket_title}</h2>"
@@ -184,7 +366,7 @@ def process_job(r: redis.Redis, job_id: str) -> None:
             f"Job: {job_id} — Modell: {model_used}</em></p>"
         )
         priority_id = map_priority(analysis.get("ticket_priority", "2_normal"))
-        ticket = zammad_client.create_ticket(
+        ticket = await zammad_client.create_ticket(
             title=ticket_title,
             body=ticket_body,
             priority_id=priority_id,
@@ -193,7 +375,7 @@ def process_job(r: redis.Redis, job_id: str) -> None:
         if ticket:
             ticket_id = str(ticket.get("id"))
 
-    # 7. ntfy-Benachrichtigung senden
+    # 8. ntfy-Benachrichtigung senden
     impact = analysis.get("impact", "Mittel")
     ntfy_title = analysis.get("ticket_title", f"MCP Alert: {job_data.get('host', 'unknown')}")
     ntfy_message = (
@@ -205,60 +387,56 @@ def process_job(r: redis.Redis, job_id: str) -> None:
     if ticket_id:
         ntfy_message += f"\nTicket: #{ticket_id}"
 
-    ntfy_client.send_notification(
+    await ntfy_client.send_notification(
         title=ntfy_title,
         message=ntfy_message[:settings.ntfy_max_message_length],
         severity=impact,
         tags=["warning", job_data.get("source", "mcp")],
     )
 
-    # 8. Ergebnis in Redis speichern
+    # 9. Ergebnis in Redis speichern
     result_data = {
-        "status": "completed",
         "result": json.dumps(analysis, ensure_ascii=False),
         "model_used": model_used,
         "processing_time_ms": str(elapsed_ms),
+        "ttft_ms": "" if llm_result.get("ttft_ms") is None else str(llm_result["ttft_ms"]),
         "rag_context_used": str(len(rag_results) > 0),
         "ticket_id": ticket_id or "",
+        "cached_from": cached.get("job_id", "") if cached is not None else triaged.get("source_job", ""),
+        "triage": triaged["decision"] if triaged is not None else "",
         "completed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
     }
-    r.hset(f"mcp:job:{job_id}", mapping=result_data)
-
-    # TTL setzen: Job-Daten nach 7 Tagen automatisch loeschen
-    r.expire(f"mcp:job:{job_id}", 604800)
-
-    # 9. Analyse-Ergebnis in pgvector speichern (fuer zukuenftige RAG-Suche)
+    await job_queue.set_status(r, job_id, "completed", result_data)
+
+    # Zwischenstand ist im Ergebnis enthalten; TTL setzen: Job-Daten nach 7 Tagen loeschen
+    await r.hdel(f"mcp:job:{job_id}", "partial_response")
+    await r.expire(f"mcp:job:{job_id}", 604800)
+
+    if analyzed_now and analysis.get("confidence_reason") != PARSE_FAILED_REASON:
+        await result_cache.put(r, job_data, {
+            "analysis": analysis,
+            "model_used": model_used,
+            "job_id": job_id,
+            "ticket_id": ticket_id or "",
+        }, query_embedding)
+
+    # 10. Analyse-Ergebnis in pgvector speichern: Embedding fuer zukuenftige RAG-Suche nur
+    # bei frischen Analysen, Audit-Log (analysis_log) fuer jeden abgeschlossenen Job
     try:
-        if pgvector_service.health_check():
-            summary = (
-                f"Alert von {job_data.get('source', 'unknown')} auf {job_data.get('host', 'unknown')}: "
-                f"{job_data.get('description', '')} — "
-                f"Ursache: {analysis.get('root_cause', 'N/A')} — "
-                f"Massnahme: {analysis.get('immediate_action', 'N/A')}"
-            )
-            embedding = llm_client.embed(summary)
-            if embedding:
-                pgvector_service.store_embedding(
-                    content=summary,
-                    embedding=embedding,
-                    source_type="analysis",
-                    source_id=job_id,
-                    metadata={
-                        "source": job_data.get("source"),
-                        "host": job_data.get("host"),
-                        "severity": severity,
-                        "impact": impact,
-                        "confidence": analysis.get("confidence"),
-                        "ticket_id": ticket_id,
-                    },
-                )
+        if await pgvector_service.health_check():
+            if analyzed_now:
+                await _store_analysis(job_id, job_data, analysis, ticket_id)
 
             confidence_score = {"High": 0.9, "Medium": 0.6, "Low": 0.3}.get(
                 analysis.get("confidence", "Low"), 0.3
             )
-            pgvector_service.log_analysis(
+            await pgvector_service.log_analysis(
                 event_source=job_data.get("source", "unknown"),
-                event_data=job_data,
+                event_data={
+                    **job_data,
+                    "cached_from": result_data["cached_from"],
+                    "triage": result_data["triage"],
+                },
                 analysis_result=analysis,
                 confidence_score=confidence_score,
                 ticket_id=ticket_id,
@@ -278,64 +456,201 @@ def process_job(r: redis.Redis, job_id: str) -> None:
     )
 
 
-def main():
+async def _heartbeat(job_id: str) -> None:
+    """Lease eines laufenden Jobs verlaengern, bis der Task abgebrochen wird."""
+    interval = max(1, settings.queue_visibility_timeout // 3)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job_queue.heartbeat(_redis, job_id)
+        except Exception as e:
+            logger.warning("Heartbeat fuer Job %s fehlgeschlagen: %s", job_id, e)
+
+
+async def _run_job(job_id: str, slots: asyncio.Semaphore) -> None:
+    """Job als Task ausfuehren, danach bestaetigen und Slot freigeben.
+
+    Heartbeat und Bestaetigung nutzen den aktuellen Client, auch nach einem Reconnect.
+    """
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        await process_job(_redis, job_id)
+    except Exception as e:
+        logger.error("Fehler bei Job-Verarbeitung %s: %s", job_id, e, exc_info=True)
+    finally:
+        heartbeat.cancel()
+        try:
+            await job_queue.ack(_redis, job_id)
+        except Exception as e:
+            logger.warning("Bestaetigung fuer Job %s fehlgeschlagen: %s", job_id, e)
+        slots.release()
+
+
+async def _reaper() -> None:
+    """Periodisch verwaiste Jobs zurueck in die Queue stellen (mit dem aktuellen Client)."""
+    while _running:
+        await asyncio.sleep(settings.queue_reaper_interval)
+        try:
+            await job_queue.register(_redis)
+            await job_queue.reap(_redis)
+            await job_queue.trim_indexes(_redis)
+        except Exception as e:
+            logger.warning("Reaper-Lauf fehlgeschlagen: %s", e)
+
+
+async def _retire_redis(old: aioredis.Redis, jobs: set[asyncio.Task]) -> None:
+    """Alten Client nach einem Reconnect schliessen, sobald die Jobs, die ihn noch nutzen, fertig sind."""
+    await asyncio.gather(*jobs, return_exceptions=True)
+    try:
+        await old.aclose()
+    except Exception as e:
+        logger.debug("Alter Redis-Client nicht sauber geschlossen: %s", e)
+
+
+async def _warm_up_until_ready() -> None:
+    """Warm-up im Hintergrund wiederholen, bis alle Modelle geladen sind — erst dann WORKER_READY."""
+    while _running:
+        if await llm_client.warm_up(system_prompt()):
+            WORKER_READY.set(1)
+            logger.info("Warm-up nachtraeglich abgeschlossen — Worker bereit")
+            return
+        await asyncio.sleep(settings.llm_warmup_retry_interval)
+
+
+async def run() -> None:
     """Hauptschleife — wartet auf Jobs in der Redis-Queue."""
+    global _redis
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, signal_handler)
+    loop.add_signal_handler(signal.SIGINT, signal_handler)
+
     logger.info("MCP LangChain Worker startet...")
+    start_metrics_server()
     logger.info("Redis: %s:%s", settings.redis_queue_host, settings.redis_queue_port)
     logger.info("LiteLLM: %s (Fallback: %s)", settings.litellm_host, settings.ollama_host)
     logger.info("pgvector: %s:%s", settings.pgvector_host, settings.pgvector_port)
+    logger.info(
+        "Nebenlaeufigkeit: %d Jobs (LLM: %d, Embedding: %d)",
+        settings.worker_concurrency, settings.llm_max_concurrency, settings.embed_max_concurrency,
+    )
 
     # Redis-Verbindung herstellen (mit konfigurierbarem Retry)
     r = None
     for attempt in range(settings.redis_max_connect_retries):
         try:
             r = get_redis()
-            r.ping()
+            await r.ping()
             logger.info("Redis-Queue verbunden")
             break
         except Exception:
+            r = None
             logger.info("Warte auf Redis... (Versuch %d/%d)", attempt + 1, settings.redis_max_connect_retries)
-            time.sleep(2)
+            await asyncio.sleep(2)
 
     if r is None:
         logger.error("Redis nicht erreichbar — beende")
         sys.exit(1)
 
+    _redis = r
+    if settings.embed_cache_redis:
+        embedding_cache.redis = r
+
     # pgvector-Verbindung herstellen (nicht-kritisch)
-    try:
-        pgvector_service.connect()
-    except Exception as e:
-        logger.warning("pgvector nicht erreichbar (Worker laeuft ohne RAG): %s", e)
+    await pgvector_service.connect()
+    if not await pgvector_service.health_check():
+        logger.warning("pgvector nicht erreichbar (Worker laeuft ohne RAG)")
+
+    # Warm-up: Modelle laden und System-Prompt vorab verarbeiten, bevor Jobs angenommen werden —
+    # sonst bezahlt der erste Alert nach einem Neustart die Ladezeit
+    # (als Task, damit ein Shutdown-Signal den Warm-up sofort abbricht)
+    warmed_up = not settings.llm_warmup
+    if settings.llm_warmup:
+        warm_up = asyncio.create_task(llm_client.warm_up(system_prompt()))
+        while _running and not warm_up.done():
+            await asyncio.wait({warm_up}, timeout=1)
+        if not warm_up.done():
+            warm_up.cancel()
+            await asyncio.gather(warm_up, return_exceptions=True)
+            logger.info("Warm-up wegen Shutdown abgebrochen")
+        elif not (warmed_up := warm_up.result()):
+            logger.warning("Warm-up nicht abgeschlossen — nehme trotzdem Jobs an, Warm-up laeuft weiter")
+
+    # Worker registrieren und Jobs aus einem vorherigen Lauf zurueckstellen
+    await job_queue.register(r)
+    await job_queue.recover(r)
+    reaper = asyncio.create_task(_reaper())
 
     # Hauptverarbeitungsschleife
-    logger.info("Worker bereit — warte auf Jobs...")
+    logger.info("Worker %s bereit — warte auf Jobs...", settings.worker_id)
+    # Bereit erst mit geladenen Modellen; sonst bleibt die Metrik bis zum Warm-up im Hintergrund 0
+    background_warm_up = None
+    if warmed_up:
+        WORKER_READY.set(1)
+    elif _running:
+        background_warm_up = asyncio.create_task(_warm_up_until_ready())
+    slots = asyncio.Semaphore(max(1, settings.worker_concurrency))
+    tasks: set[asyncio.Task] = set()
+    retiring: set[asyncio.Task] = set()
     reconnect_backoff = settings.redis_reconnect_delay
     while _running:
+        # Backpressure: erst poppen, wenn ein Slot frei ist
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=1)
+        except asyncio.TimeoutError:
+            continue
         try:
-            result = r.brpop("mcp:queue:analyze", timeout=5)
-            if result:
-                _, job_id = result
-                process_job(r, job_id)
+            job_id = await job_queue.dequeue(r, timeout=5)
+            if job_id:
+                task = asyncio.create_task(_run_job(job_id, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            else:
+                slots.release()
             reconnect_backoff = settings.redis_reconnect_delay
         except redis.ConnectionError:
+            slots.release()
             logger.warning("Redis-Verbindung verloren — Reconnect in %ds...", reconnect_backoff)
-            time.sleep(reconnect_backoff)
+            await asyncio.sleep(reconnect_backoff)
             reconnect_backoff = min(reconnect_backoff * 2, 60)
             try:
-                r = get_redis()
+                old, r = r, get_redis()
             except Exception:
-                pass
+                continue
+            # Reaper und Heartbeats lesen _redis und wechseln damit sofort auf den neuen Client
+            _redis = r
+            if settings.embed_cache_redis:
+                embedding_cache.redis = r
+            retire = asyncio.create_task(_retire_redis(old, set(tasks)))
+            retiring.add(retire)
+            retire.add_done_callback(retiring.discard)
         except Exception as e:
-            logger.error("Fehler bei Job-Verarbeitung: %s", e, exc_info=True)
-            time.sleep(1)
+            slots.release()
+            logger.error("Fehler beim Abholen eines Jobs: %s", e, exc_info=True)
+            await asyncio.sleep(1)
+
+    # Laufende Jobs zu Ende verarbeiten
+    if tasks:
+        logger.info("Warte auf %d laufende Jobs...", len(tasks))
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    await asyncio.gather(*retiring, return_exceptions=True)
 
     # Aufraumen
-    pgvector_service.close()
-    llm_client.close()
-    ntfy_client.close()
-    zammad_client.close()
+    reaper.cancel()
+    if background_warm_up is not None:
+        background_warm_up.cancel()
+    await pgvector_service.close()
+    await llm_client.close()
+    await ntfy_client.close()
+    await zammad_client.close()
+    await r.aclose()
     logger.info("Worker ordnungsgemaess beendet")
 
 
+def main():
+    """Einstiegspunkt: Event-Loop starten."""
+    asyncio.run(run())
+
+
 if __name__ == "__main__":
     main()
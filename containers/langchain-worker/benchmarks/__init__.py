@@ -0,0 +1 @@
+# MCP v7 — LangChain Worker Benchmarks
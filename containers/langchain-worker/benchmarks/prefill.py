@@ -0,0 +1,112 @@
+"""MCP v7 — Benchmark: Prefill-Zeit mit PROMPT_LAYOUT=classic vs. prefix.
+
+Schickt synthetische Alerts (wechselnde Hosts, Zeitstempel, Logs) in beiden
+Layouts an Ollama (/api/generate, num_predict=1) und wertet die von Ollama
+gemeldeten prompt_eval_count/prompt_eval_duration aus. Bei prefix ist der
+System-Prompt fuer alle Alerts identisch — Ollama verarbeitet dann nur den
+Alert-Teil neu; bei classic endet der gemeinsame Prefix schon beim Alert-Typ.
+
+Der jeweils erste Aufruf pro Layout laedt Modell bzw. Prefix und wird nicht
+gewertet. Nur gegen eine Instanz ohne weitere Last ausfuehren:
+
+    cd containers/langchain-worker
+    python -m benchmarks.prefill --ollama http://localhost:11434 --alerts 20 \\
+        --prompt-file ../../config/ai/prompts/alert-analysis.txt
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+
+def synthetic_alert(rng: random.Random, index: int) -> dict:
+    host = f"srv-{rng.randint(1, 40):02d}.mcp.local"
+    service = rng.choice(["nginx", "postgres", "redis", "zammad-rails", "ollama"])
+    logs = "\n".join(
+        f"2026-10-17T10:{minute:02d}:{rng.randint(0, 59):02d}Z {service}[{rng.randint(100, 9999)}]: "
+        f"{rng.choice(['connection refused', 'timeout after 30s', 'out of memory', 'slow query'])}"
+        for minute in range(10)
+    )
+    return {
+        "source": rng.choice(["zabbix", "wazuh", "crowdsec"]),
+        "host": host,
+        "severity": rng.choice(["critical", "high", "warning"]),
+        "created_at": f"2026-10-17T10:{index % 60:02d}:00Z",
+        "description": f"{service} auf {host}: {rng.choice(['CPU > 95%', 'Disk 91% belegt', 'Dienst nicht erreichbar'])}",
+        "metrics": json.dumps({"cpu": rng.randint(50, 100), "mem": rng.randint(40, 99)}),
+        "logs": logs,
+        "crowdsec_alerts": "keine",
+    }
+
+
+def run_layout(client, args, layout: str, alerts: list[dict]) -> list[dict]:
+    from app.config import settings
+    from app.prompts import build_prompt, system_prompt
+
+    settings.prompt_layout = layout
+    stats = []
+    for i, alert in enumerate(alerts):
+        payload = {
+            "model": args.model,
+            "prompt": build_prompt(alert, []),
+            "stream": False,
+            "keep_alive": "10m",
+            "options": {"temperature": 0, "num_predict": 1},
+        }
+        system = system_prompt()
+        if system:
+            payload["system"] = system
+        start = time.perf_counter()
+        resp = client.post("/api/generate", json=payload)
+        resp.raise_for_status()
+        data = resp.json()
+        if i == 0:
+            continue  # Modell/Prefix laden
+        stats.append({
+            "prompt_tokens": data.get("prompt_eval_count", 0),
+            "prefill_ms": data.get("prompt_eval_duration", 0) / 1e6,
+            "total_ms": (time.perf_counter() - start) * 1000,
+        })
+    return stats
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ollama", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"))
+    parser.add_argument("--model", default=os.getenv("PRIMARY_MODEL", "mistral:7b-instruct-v0.3-q4_K_M"))
+    parser.add_argument("--alerts", type=int, default=20)
+    parser.add_argument("--prompt-file", default="", help="Prompt-Template (Default: eingebauter Fallback)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Settings werden beim Import gelesen
+    os.environ["PROMPT_FILE"] = args.prompt_file or "/nonexistent"
+    os.environ["PROMPT_TOKEN_BUDGET"] = "0"
+    import httpx
+
+    rng = random.Random(args.seed)
+    alerts = [synthetic_alert(rng, i) for i in range(args.alerts + 1)]
+
+    print(f"\n{args.model}, {args.alerts} Alerts je Layout\n")
+    print(f"{'Layout':<10}{'Tokens (Prefill)':>18}{'Prefill p50 ms':>16}{'Prefill mean ms':>17}{'Gesamt mean ms':>16}")
+    with httpx.Client(base_url=args.ollama, timeout=600.0) as client:
+        for layout in ("classic", "prefix"):
+            try:
+                stats = run_layout(client, args, layout, alerts)
+            except httpx.HTTPError as e:
+                sys.exit(f"Ollama-Aufruf fehlgeschlagen: {e}")
+            print(
+                f"{layout:<10}"
+                f"{statistics.fmean(s['prompt_tokens'] for s in stats):>18.0f}"
+                f"{statistics.median(s['prefill_ms'] for s in stats):>16.1f}"
+                f"{statistics.fmean(s['prefill_ms'] for s in stats):>17.1f}"
+                f"{statistics.fmean(s['total_ms'] for s in stats):>16.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -38,12 +38,16 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-E
         source_id       VARCHAR(255),
         metadata        JSONB DEFAULT '{}',
         tenant_id       UUID DEFAULT '00000000-0000-0000-0000-000000000000',
-        created_at      TIMESTAMPTZ DEFAULT NOW()
+        created_at      TIMESTAMPTZ DEFAULT NOW(),
+        -- Volltext fuer die hybride Suche ('simple': ohne Stemming, Hostnamen/Fehlercodes bleiben exakt)
+        content_tsv     tsvector GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
     );
 
     -- HNSW-Index fuer schnelle Vektor-Aehnlichkeitssuche (Cosine Distance)
+    -- Neuaufbau mit anderen Parametern: python -m app.manage reindex (im Gateway)
     CREATE INDEX IF NOT EXISTS idx_embeddings_vector
-        ON embeddings USING hnsw (embedding vector_cosine_ops);
+        ON embeddings USING hnsw (embedding vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64);
 
     -- Index fuer Quell-Filterung
     CREATE INDEX IF NOT EXISTS idx_embeddings_source
@@ -56,6 +60,12 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-E
     -- Index fuer Tenant-Isolation
     CREATE INDEX IF NOT EXISTS idx_embeddings_tenant
         ON embeddings (tenant_id);
+
+    -- Indizes fuer gefilterte Suche (Host aus metadata, Zeitraum)
+    CREATE INDEX IF NOT EXISTS idx_embeddings_host
+        ON embeddings ((metadata->>'host'));
+    CREATE INDEX IF NOT EXISTS idx_embeddings_created
+        ON embeddings (created_at);
 EOSQL
 
 # ---------------------------------------------------------------------------
@@ -88,7 +98,7 @@ EOSQL
 # ---------------------------------------------------------------------------
 # 4. Migration: content_hash Spalte fuer bestehende Installationen
 # ---------------------------------------------------------------------------
-echo "[4/5] Pruefe Migration (content_hash)..."
+echo "[4/5] Pruefe Migrationen (content_hash, content_tsv)..."
 psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
     -- Migration: content_hash Spalte hinzufuegen (idempotent)
     DO \$\$
@@ -106,6 +116,13 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-E
     -- Index wird nur erstellt wenn er noch nicht existiert (IF NOT EXISTS)
     CREATE UNIQUE INDEX IF NOT EXISTS idx_embeddings_content_hash
         ON embeddings (content_hash, source_type) WHERE content_hash IS NOT NULL;
+
+    -- Migration: Volltext-Spalte fuer die hybride Suche (berechnet bestehende Zeilen einmalig);
+    -- der GIN-Index entsteht erst hier, nach der Spalte (auch bei Neuinstallationen)
+    ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS content_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED;
+    CREATE INDEX IF NOT EXISTS idx_embeddings_content_tsv
+        ON embeddings USING gin (content_tsv);
 EOSQL
 
 # ---------------------------------------------------------------------------
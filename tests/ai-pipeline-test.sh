@@ -147,7 +147,11 @@ if [ -n "${JOB_ID:-}" ]; then
 else
     # Fallback: allgemeine Suche
     jobs=$(docker exec -e REDISCLI_AUTH="${REDIS_QUEUE_PASSWORD:-changeme}" mcp-redis-queue redis-cli keys "mcp:job:*" 2>/dev/null | wc -l || echo "0")
-    queue_len=$(docker exec -e REDISCLI_AUTH="${REDIS_QUEUE_PASSWORD:-changeme}" mcp-redis-queue redis-cli llen "mcp:queue:analyze" 2>/dev/null || echo "0")
+    queue_len=0
+    for priority in critical high warning info; do
+        len=$(docker exec -e REDISCLI_AUTH="${REDIS_QUEUE_PASSWORD:-changeme}" mcp-redis-queue redis-cli llen "mcp:queue:analyze:${priority}" 2>/dev/null || echo "0")
+        queue_len=$((queue_len + ${len:-0}))
+    done
     dedup_keys=$(docker exec -e REDISCLI_AUTH="${REDIS_QUEUE_PASSWORD:-changeme}" mcp-redis-queue redis-cli keys "mcp:dedup:*" 2>/dev/null | wc -l || echo "0")
     total_keys=$((jobs + dedup_keys))
 